@@ -0,0 +1,32 @@
+"""Benchmark deriving variants of a large imposter, and pickling it for worker processes.
+
+Run with ``make benchmark``, or ``python benchmarks/bench_cloning.py [stubs]``.
+"""
+
+from __future__ import annotations
+
+import pickle
+import sys
+import timeit
+
+from bench_decoding import replayable_imposter
+
+
+def main(stubs: int) -> None:
+    imposter = replayable_imposter(stubs)
+    imposter.as_structure()
+    pickled = pickle.dumps(imposter)
+    benchmarks = {
+        "Imposter.clone": lambda: imposter.clone(port=4546),
+        "... and serialising": lambda: imposter.clone(port=4546).as_structure(),
+        "pickle.dumps": lambda: pickle.dumps(imposter),
+        "pickle.loads": lambda: pickle.loads(pickled),  # noqa: S301
+    }
+    print(f"{len(imposter.stubs)} stubs, {len(pickled) / 1e6:.1f}MB pickled")
+    for name, benchmark in benchmarks.items():
+        best = min(timeit.repeat(benchmark, number=1, repeat=5))
+        print(f"{name:30} {best * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
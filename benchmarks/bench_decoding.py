@@ -0,0 +1,65 @@
+"""Benchmark decoding of large imposters, as done by :meth:`Imposter.query_all_stubs` and :meth:`Imposter.from_file`.
+
+Run with ``make benchmark``, or ``python benchmarks/bench_decoding.py [stubs]``.
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from mbtest.imposters import Imposter, Predicate, Proxy, Response, Stub, TcpPredicate, TcpResponse
+from mbtest.imposters.responses import FaultResponse
+from mbtest.serialisation import dumps, loads
+
+
+def replayable_imposter(stubs: int) -> Imposter:
+    """An imposter like one saved after recording through a proxy - many stubs, with a mix of predicate kinds."""
+    return Imposter(
+        [
+            Stub(
+                [
+                    Predicate(path=f"/resource/{i}", method="GET", headers={"Accept": "application/json"})
+                    & Predicate(query={"page": str(i % 10)}, operator="deepEquals"),
+                    ~Predicate(body="ignored", operator="contains", case_sensitive=False),
+                ],
+                [
+                    Response(body={"id": i, "name": f"item {i}"}, headers={"Content-Type": "application/json"}),
+                    Response(status_code=404, repeat=2),
+                ],
+            )
+            for i in range(stubs)
+        ]
+        + [
+            Stub(TcpPredicate("ping"), TcpResponse("pong")),
+            Stub(Predicate(path="/fault"), FaultResponse(FaultResponse.Fault.CONNECTION_RESET_BY_PEER)),
+            Stub(Predicate(path="/proxy", operator="startsWith"), Proxy("http://example.com")),
+        ]
+    )
+
+
+def main(stubs: int) -> None:
+    imposter = replayable_imposter(stubs)
+    structure = imposter.as_structure()
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "imposter.json"
+        imposter.save(path)
+        size = path.stat().st_size
+        stubs_json = loads(path.read_bytes())["stubs"]
+        benchmarks = {
+            "Imposter.from_structure": lambda: Imposter.from_structure(structure),
+            "... decoding every stub": lambda: list(Imposter.from_structure(structure).stubs),
+            "Stub.from_structure x all": lambda: [Stub.from_structure(s) for s in stubs_json],
+            "Imposter.from_file": lambda: Imposter.from_file(path),
+            "... and re-serialising": lambda: dumps(Imposter.from_file(path).as_structure()),
+        }
+        print(f"{len(structure['stubs'])} stubs, {size / 1e6:.1f}MB saved")
+        for name, benchmark in benchmarks.items():
+            best = min(timeit.repeat(benchmark, number=1, repeat=5))
+            print(f"{name:30} {best * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,44 @@
+"""Benchmark the memory used by the object graph of a large imposter, compared to its decoded JSON.
+
+Run with ``make benchmark``, or ``python benchmarks/bench_memory.py [stubs]``.
+"""
+
+from __future__ import annotations
+
+import gc
+import sys
+import tracemalloc
+from typing import Any
+
+from bench_decoding import replayable_imposter
+
+from mbtest.imposters import Imposter
+from mbtest.serialisation import dumps, loads
+
+
+def allocated(build: Any) -> tuple[Any, int]:
+    """Build something, returning it and the memory still allocated for it."""
+    gc.collect()
+    tracemalloc.start()
+    built = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, size
+
+
+def main(stubs: int) -> None:
+    encoded = dumps(replayable_imposter(stubs).as_structure())
+    structure, structure_size = allocated(lambda: loads(encoded))
+    _, lazy_size = allocated(lambda: Imposter.from_structure(structure))
+    imposter, imposter_size = allocated(lambda: Imposter(list(Imposter.from_structure(structure).stubs)))
+    print(f"{len(imposter.stubs)} stubs, {len(encoded) / 1e6:.1f}MB of JSON")
+    print(f"{'Decoded JSON':30} {structure_size / 1e6:8.1f}MB")
+    print(f"{'Lazily decoded imposter':30} {lazy_size / 1e6:8.1f}MB")
+    print(
+        f"{'Imposter object graph':30} {imposter_size / 1e6:8.1f}MB ({imposter_size / len(imposter.stubs):.0f}B/stub)"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
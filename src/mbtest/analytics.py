@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from itertools import pairwise
+from typing import TYPE_CHECKING, Any, cast, overload
+
+from mbtest.imposters.imposters import HttpRequest
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Callable, Mapping
+
+    import numpy as np
+
+    from mbtest.imposters.imposters import Imposter, Request
+    from mbtest.server import MountebankServer
+
+
+class RequestLog(Sequence[HttpRequest]):
+    """A log of HTTP requests recorded by one or more imposters, with helpers for analysing it.
+
+    Use in tests as follows::
+
+        log = RequestLog.of(imposter)
+        columns = log.to_columns()
+        assert columns.count_by("path")["/test"] == 3
+
+    :param requests: The recorded requests. Any which aren't HTTP requests (sent emails, for instance) are ignored.
+    """
+
+    def __init__(self, requests: Iterable[Request]) -> None:
+        self._requests = [request for request in requests if isinstance(request, HttpRequest)]
+
+    @classmethod
+    def of(cls, source: Imposter | MountebankServer) -> RequestLog:
+        """Build a log from the requests recorded by an imposter, or by all of a server's imposters."""
+        return cls(source.iter_actual_requests())
+
+    @overload
+    def __getitem__(self, index: int) -> HttpRequest: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[HttpRequest]: ...
+
+    def __getitem__(self, index: int | slice) -> HttpRequest | Sequence[HttpRequest]:
+        return self._requests[index]
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._requests!r})"
+
+    def timestamps(self) -> list[float]:
+        """Arrival times of the requests, as POSIX timestamps, in order. Requests without timestamps are omitted."""
+        return sorted(time.timestamp() for request in self._requests if (time := request.time) is not None)
+
+    def inter_arrival_times(self) -> list[float]:
+        """Seconds between each request's arrival and the previous one's."""
+        timestamps = self.timestamps()
+        return [later - earlier for earlier, later in pairwise(timestamps)]
+
+    def requests_per_second(self, window: float = 1.0) -> list[float]:
+        """Request rate in consecutive, fixed windows, starting from the first request.
+
+        :param window: Window length, in seconds.
+        :returns: Rate, in requests per second, for each window.
+        """
+        timestamps = self.timestamps()
+        if not timestamps:
+            return []
+        counts = [0] * (int((timestamps[-1] - timestamps[0]) // window) + 1)
+        for timestamp in timestamps:
+            counts[int((timestamp - timestamps[0]) // window)] += 1
+        return [count / window for count in counts]
+
+    def peak_rate(self, window: float = 1.0) -> float:
+        """Highest request rate seen in any sliding window - useful for checking client-side rate limiting.
+
+        :param window: Window length, in seconds.
+        :returns: Peak rate, in requests per second.
+        """
+        return peak_rate(self.timestamps(), window)
+
+    def estimated_concurrency(self) -> int:
+        """Estimate the number of requests clients had in flight at once.
+
+        Mountebank records when requests arrive, but not when responses completed, so this is estimated from
+        connections: each distinct client address and port is taken to be a connection which is open from its first
+        request to its last, and the result is the greatest number of connections open at any one time.
+        """
+        spans: dict[str, list[float]] = {}
+        for request in self._requests:
+            if request.request_from and (time := request.time):
+                span = spans.setdefault(request.request_from, [time.timestamp(), time.timestamp()])
+                span[0], span[1] = min(span[0], time.timestamp()), max(span[1], time.timestamp())
+        events = sorted([(start, -1) for start, _ in spans.values()] + [(end, 1) for _, end in spans.values()])
+        open_connections = peak = 0
+        for _, change in events:
+            open_connections -= change
+            peak = max(peak, open_connections)
+        return peak
+
+    def by_client(self) -> dict[str | None, RequestLog]:
+        """Split the log by client address (ignoring port)."""
+        clients: dict[str | None, list[HttpRequest]] = {}
+        for request in self._requests:
+            clients.setdefault(request.client, []).append(request)
+        return {client: RequestLog(requests) for client, requests in clients.items()}
+
+    def to_columns(self, headers: Iterable[str] = ("Content-Type",)) -> RequestColumns:
+        """Convert the log into NumPy arrays, one per field, for fast vectorised analysis.
+
+        Requires `NumPy <https://numpy.org/>`_, which can be installed with the ``analytics`` extra:
+        ``pip install mbtest[analytics]``.
+
+        :param headers: Request headers to include as columns. Header names are matched case-insensitively.
+        :returns: Columns.
+        """
+        np = _import_numpy()
+        size = len(self._requests)
+        method_names: dict[str, int] = {}
+        path_names: dict[str, int] = {}
+        for request in self._requests:
+            method_names.setdefault(request.method, len(method_names))
+            path_names.setdefault(request.path, len(path_names))
+        lowered = [{name.lower(): value for name, value in request.headers.items()} for request in self._requests]
+        return RequestColumns(
+            method_names=tuple(method_names),
+            methods=np.fromiter((method_names[r.method] for r in self._requests), dtype=np.int32, count=size),
+            path_names=tuple(path_names),
+            paths=np.fromiter((path_names[r.path] for r in self._requests), dtype=np.int32, count=size),
+            body_lengths=np.fromiter((len(r.body or "") for r in self._requests), dtype=np.int64, count=size),
+            timestamps=np.fromiter(
+                (t.timestamp() if (t := r.time) else np.nan for r in self._requests), dtype=np.float64, count=size
+            ),
+            clients=_categorical(np, (r.client for r in self._requests), size),
+            headers={name: _categorical(np, (h.get(name.lower()) for h in lowered), size) for name in headers},
+        )
+
+
+def peak_rate(timestamps: Sequence[float], window: float = 1.0) -> float:
+    """Highest rate, in events per second, in any sliding window over sorted timestamps.
+
+    :param timestamps: Event times, in seconds, sorted.
+    :param window: Window length, in seconds.
+    """
+    start = peak = 0
+    for end, timestamp in enumerate(timestamps):
+        while timestamp - timestamps[start] >= window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak / window
+
+
+def _categorical(np: Any, values: Iterable[str | None], size: int) -> Column:
+    names: dict[str | None, int] = {}
+    codes = np.fromiter((names.setdefault(value, len(names)) for value in values), dtype=np.int32, count=size)
+    return Column(names=tuple(names), codes=codes)
+
+
+@dataclass(frozen=True)
+class Column:
+    """A categorical column: each row holds an integer code, indexing into `names`.
+
+    :param names: Distinct values, in order of first appearance. Missing values are represented by `None`.
+    :param codes: Array of codes, one per request.
+    """
+
+    names: tuple[str | None, ...]
+    codes: np.ndarray
+
+
+@dataclass(frozen=True)
+class RequestColumns:
+    """Columnar form of a :class:`RequestLog`, built by :meth:`RequestLog.to_columns`. Each array has one row per
+    request, in log order.
+
+    :param method_names: Distinct HTTP methods, indexed by the codes in `methods`.
+    :param methods: HTTP method code for each request.
+    :param path_names: Distinct paths, indexed by the ids in `paths`.
+    :param paths: Path id for each request.
+    :param body_lengths: Length of each request's body, in characters.
+    :param timestamps: Arrival time of each request, as a POSIX timestamp, or NaN if not recorded.
+    :param clients: Client address (without port) of each request.
+    :param headers: Categorical column for each requested header, keyed by header name.
+    """
+
+    method_names: tuple[str, ...]
+    methods: np.ndarray
+    path_names: tuple[str, ...]
+    paths: np.ndarray
+    body_lengths: np.ndarray
+    timestamps: np.ndarray
+    clients: Column
+    headers: Mapping[str, Column]
+
+    def __len__(self) -> int:
+        return len(self.methods)
+
+    def column(self, name: str) -> Column:
+        """Get a categorical column - ``"method"``, ``"path"``, ``"client"``, or the name of an included header."""
+        if name == "client":
+            return self.clients
+        if name == "method":
+            return Column(names=self.method_names, codes=self.methods)
+        if name == "path":
+            return Column(names=self.path_names, codes=self.paths)
+        return self.headers[name]
+
+    def count_by(self, *keys: str) -> dict[Any, int]:
+        """Count requests grouped by one or more categorical columns.
+
+        :param keys: Column names - see :meth:`column`.
+        :returns: Counts, keyed by value for a single key, or by tuple of values for several keys.
+        """
+        labels, inverse = self._group(keys)
+        np = _import_numpy()
+        counts = np.bincount(inverse, minlength=len(labels))
+        return dict(zip(labels, counts.tolist(), strict=True))
+
+    def percentile(self, values: np.ndarray, q: float, by: str | None = None) -> float | dict[Any, float]:
+        """Percentile of a numeric column, such as `body_lengths`, overall or per group.
+
+        :param values: Numeric array with one row per request.
+        :param q: Percentile to compute, between 0 and 100.
+        :param by: Optional categorical column to group by - see :meth:`column`.
+        :returns: Percentile, or percentiles keyed by group value.
+        """
+        np = _import_numpy()
+        if by is None:
+            return float(np.percentile(values, q))
+        return self.aggregate(values, by, lambda group: float(np.percentile(group, q)))
+
+    def aggregate(self, values: np.ndarray, by: str, function: Callable[[np.ndarray], float]) -> dict[Any, float]:
+        """Apply a reducing function to a numeric column, per group.
+
+        Rows are sorted by group once, so each group is a contiguous slice, and `function` is called once per group.
+
+        :param values: Numeric array with one row per request.
+        :param by: Categorical column to group by - see :meth:`column`.
+        :param function: Reducer, called with each group's values, e.g. :func:`numpy.mean`.
+        :returns: Results keyed by group value.
+        """
+        np = _import_numpy()
+        labels, inverse = self._group((by,))
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(labels) + 1))
+        sorted_values = values[order]
+        return {
+            label: function(sorted_values[bounds[i] : bounds[i + 1]])
+            for i, label in enumerate(labels)
+            if bounds[i] < bounds[i + 1]
+        }
+
+    def requests_per_second(self, by: str | None = None, window: float = 1.0) -> np.ndarray | dict[Any, np.ndarray]:
+        """Request counts per second in consecutive, fixed windows, overall or per group - for example,
+        ``columns.requests_per_second(by="path")``.
+
+        :param by: Optional categorical column to group by - see :meth:`column`.
+        :param window: Window length, in seconds.
+        :returns: Rates, one per window from the first request to the last, or the same keyed by group value.
+        """
+        np = _import_numpy()
+        recorded = ~np.isnan(self.timestamps)
+        timestamps = self.timestamps[recorded]
+        if not len(timestamps):
+            return np.zeros(0) if by is None else {}
+        buckets = ((timestamps - timestamps.min()) // window).astype(np.int64)
+        size = int(buckets.max()) + 1
+        if by is None:
+            return np.bincount(buckets, minlength=size) / window
+        labels, inverse = self._group((by,))
+        counts = np.zeros((len(labels), size), dtype=np.int64)
+        np.add.at(counts, (inverse[recorded], buckets), 1)
+        return {label: counts[i] / window for i, label in enumerate(labels) if counts[i].any()}
+
+    def _group(self, keys: Sequence[str]) -> tuple[list[Any], np.ndarray]:
+        np = _import_numpy()
+        columns = [self.column(key) for key in keys]
+        if len(columns) == 1:
+            return list(columns[0].names), columns[0].codes
+        combined = np.ravel_multi_index([c.codes for c in columns], [max(len(c.names), 1) for c in columns])
+        unique, inverse = np.unique(combined, return_inverse=True)
+        indices = np.unravel_index(unique, [max(len(c.names), 1) for c in columns])
+        labels = [
+            tuple(c.names[i] for c, i in zip(columns, row, strict=True))
+            for row in zip(*(index.tolist() for index in indices), strict=True)
+        ]
+        return labels, inverse.ravel()
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy as np  # noqa: PLC0415
+    except ImportError as e:  # pragma: no cover
+        msg = "Columnar request analytics require NumPy - install mbtest[analytics]."
+        raise ImportError(msg) from e
+    return cast("Any", np)
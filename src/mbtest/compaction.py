@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, cast
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Mapping
+
+    from mbtest.imposters.base import JsonObject, JsonValue
+
+# What Mountebank gives HTTP responses fields they leave out, unless the imposter's default response says otherwise.
+_HTTP_DEFAULTS: Mapping[str, JsonValue] = {"statusCode": 200, "_mode": "text"}
+_OPERATORS = frozenset(("equals", "deepEquals", "contains", "startsWith", "endsWith", "matches", "exists"))
+# Predicate keys which only modify how the fields an operator names are compared.
+_MODIFIERS = frozenset(("caseSensitive", "keyCaseSensitive", "except", "xpath", "jsonpath"))
+
+
+def compact_imposter(structure: JsonObject, *, merge_stubs: bool = False) -> JsonObject:
+    """Compact an imposter's structure, leaving out what makes no difference to Mountebank, so that less is posted,
+    and less held in Mountebank's memory:
+
+    * Empty ``_behaviors``, and response fields with the values Mountebank would default them to.
+    * Predicates without fields, such as the one a :class:`~mbtest.imposters.Stub` is given by default, which match
+      every request.
+    * Runs of identical responses, which are folded into one, with a ``repeat`` behavior - or, if a stub only ever
+      gives the one response, into one without.
+
+    The stubs are left as they were, one for one, so their positions - used by
+    :meth:`~mbtest.imposters.Imposter.add_stub` for instance - still hold. Structures are copied where they change,
+    never modified, so any cached by the objects they came from stay valid.
+
+    :param structure: Imposter structure.
+    :param merge_stubs: Also merge consecutive stubs which give the same single response, combining their predicates
+        with ``or``, so that each distinct response body is sent once. This changes stubs' positions, and which stub
+        Mountebank records a request as matching.
+    :returns: The compacted structure.
+    """
+    if "stubs" not in structure:
+        return structure
+    defaults = _response_defaults(structure)
+    stubs = [compact_stub(stub, defaults) for stub in cast("list[JsonObject]", structure["stubs"])]
+    return {**structure, "stubs": cast("list[JsonValue]", _merged(stubs) if merge_stubs else stubs)}
+
+
+def compact_stub(structure: JsonObject, response_defaults: Mapping[str, JsonValue] | None = None) -> JsonObject:
+    """Compact a stub's structure - see :func:`compact_imposter`.
+
+    :param structure: Stub structure.
+    :param response_defaults: Values Mountebank gives any fields responses leave out - for an HTTP imposter without
+        a default response, its status code and mode. Fields with these values are left out.
+    :returns: The compacted structure.
+    """
+    defaults = response_defaults or {}
+    compacted = {key: value for key, value in structure.items() if key not in ("predicates", "responses")}
+    if predicates := [
+        predicate for predicate in cast("list[JsonObject]", structure.get("predicates") or []) if not _no_op(predicate)
+    ]:
+        compacted["predicates"] = cast("list[JsonValue]", predicates)
+    responses = [
+        _compact_response(response, defaults) for response in cast("list[JsonObject]", structure.get("responses") or [])
+    ]
+    # A stub without responses gives Mountebank's default one.
+    if (responses := _folded(responses)) and responses != [{"is": {}}]:
+        compacted["responses"] = cast("list[JsonValue]", responses)
+    return compacted
+
+
+def _response_defaults(structure: JsonObject) -> Mapping[str, JsonValue]:
+    if structure.get("protocol", "http") not in ("http", "https"):
+        return {}
+    overridden = cast("JsonObject", structure.get("defaultResponse") or {})
+    return {name: value for name, value in _HTTP_DEFAULTS.items() if name not in overridden}
+
+
+def _no_op(predicate: JsonObject) -> bool:
+    """Whether a predicate is an operator, naming no fields, so matching every request."""
+    operators = predicate.keys() & _OPERATORS
+    return len(operators) == 1 and predicate[next(iter(operators))] == {} and predicate.keys() - operators <= _MODIFIERS
+
+
+def _compact_response(response: JsonObject, defaults: Mapping[str, JsonValue]) -> tuple[JsonObject, int | None]:
+    """A compacted response, without any ``repeat`` behavior, and how often it's repeated - or `None`, if it can't
+    be, not being an ``is`` response with its behaviors given as an object."""
+    compacted = {key: value for key, value in response.items() if key != "_behaviors"}
+    behaviors = response.get("_behaviors")
+    if "is" not in response or not isinstance(behaviors, dict | None):
+        if behaviors:
+            compacted["_behaviors"] = behaviors
+        return compacted, None
+    fields = cast("JsonObject", response["is"])
+    compacted["is"] = {name: value for name, value in fields.items() if name not in defaults or value != defaults[name]}
+    if not behaviors:
+        return compacted, 1
+    if remaining := {key: value for key, value in behaviors.items() if key != "repeat"}:
+        compacted["_behaviors"] = remaining
+    return compacted, cast("int", behaviors.get("repeat") or 1)
+
+
+def _folded(responses: list[tuple[JsonObject, int | None]]) -> list[JsonObject]:
+    """Fold runs of responses, identical but for how often they're repeated, into one, repeated as often as the run -
+    or, if there's only one run, into a single response, as Mountebank cycles through a stub's responses."""
+    runs: list[tuple[JsonObject, int | None]] = []
+    for response, repeat in responses:
+        previous, count = runs[-1] if runs else (None, None)
+        if repeat is not None and count is not None and previous == response:
+            runs[-1] = (response, count + repeat)
+        else:
+            runs.append((response, repeat))
+    if len(runs) == 1:
+        return [runs[0][0]]
+    return [response if count in (None, 1) else _with_repeat(response, cast("int", count)) for response, count in runs]
+
+
+def _with_repeat(response: JsonObject, repeat: int) -> JsonObject:
+    return {**response, "_behaviors": {**cast("JsonObject", response.get("_behaviors", {})), "repeat": repeat}}
+
+
+def _merged(stubs: list[JsonObject]) -> list[JsonObject]:
+    """Merge consecutive stubs giving the same single response, combining their predicates with ``or``."""
+    merged: list[JsonObject] = []
+    for stub in stubs:
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and _mergeable(previous)
+            and _mergeable(stub)
+            and previous["responses"] == stub["responses"]
+        ):
+            merged[-1] = _either(previous, stub)
+        else:
+            merged.append(stub)
+    return merged
+
+
+def _mergeable(stub: JsonObject) -> bool:
+    """Whether a stub only has predicates and a single response, which it always gives - so it has no state."""
+    responses = cast("list[JsonObject]", stub.get("responses") or [])
+    if stub.keys() - {"predicates", "responses"} or len(responses) != 1:
+        return False
+    behaviors = responses[0].get("_behaviors", {})
+    return isinstance(behaviors, dict) and "repeat" not in behaviors
+
+
+def _either(first: JsonObject, second: JsonObject) -> JsonObject:
+    if "predicates" not in first or "predicates" not in second:
+        # One of them matches every request, so the two together do too.
+        return {"responses": first["responses"]}
+    alternatives = [*_alternatives(first), *_alternatives(second)]
+    return {"predicates": [{"or": cast("list[JsonValue]", alternatives)}], "responses": first["responses"]}
+
+
+def _alternatives(stub: JsonObject) -> list[JsonObject]:
+    predicates = cast("list[JsonObject]", stub["predicates"])
+    if len(predicates) == 1 and "or" in predicates[0]:
+        return cast("list[JsonObject]", predicates[0]["or"])
+    return [predicates[0]] if len(predicates) == 1 else [{"and": cast("list[JsonValue]", predicates)}]
@@ -0,0 +1,12 @@
+from .emulator import EmulatedMountebankServer, emulated_mock_server
+from .explain import Explanation, StubEvaluator
+from .server import LocalMountebankServer, local_mock_server
+
+__all__ = [
+    "EmulatedMountebankServer",
+    "Explanation",
+    "LocalMountebankServer",
+    "StubEvaluator",
+    "emulated_mock_server",
+    "local_mock_server",
+]
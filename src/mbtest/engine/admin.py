@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import logging
+from http import HTTPStatus
+from itertools import count
+from typing import TYPE_CHECKING, Any, ClassVar, TypeAlias, cast
+
+from mbtest import store
+from mbtest.engine import http, smtp, tcp
+from mbtest.engine.imposters import LocalImposter
+from mbtest.engine.matching import UnsupportedFeature
+from mbtest.serialisation import loads
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+    from collections.abc import Awaitable, Callable, Mapping
+
+    from mbtest.engine.http import RawRequest, RawResponse
+    from mbtest.imposters.base import JsonObject, JsonValue
+
+logger = logging.getLogger(__name__)
+
+# Starts serving an imposter on a host and port - any free port, if it's 0.
+Listener: TypeAlias = "Callable[[LocalImposter, str, int], Awaitable[asyncio.Server]]"
+
+
+async def _listen_http(imposter: LocalImposter, host: str, port: int) -> asyncio.Server:
+    return await http.serve(http.imposter_handler(imposter), host, port)
+
+
+# Listener for each protocol the engine supports.
+LISTENERS: dict[str, Listener] = {"http": _listen_http, "smtp": smtp.serve, "tcp": tcp.serve}
+
+# Where imposters which aren't listening on sockets are given ports, if they don't specify one.
+_FIRST_ALLOCATED_PORT = 49152
+
+
+class NoSuchResource(Exception):
+    """An admin API request refers to an imposter or stub which doesn't exist."""
+
+
+class AdminApi:
+    """The local engine's implementation of the `Mountebank admin API <http://localhost:2525/docs/api/overview>`_,
+    holding its imposters in memory.
+
+    :param host: Host address imposters listen on.
+    :param listen: Serve imposters on sockets. If not, they are only held in memory - with ports allocated in turn,
+        where not given - to be served some other way, such as by :class:`mbtest.engine.emulator.EmulatorTransport`.
+    :param debug: Record the requests each stub matches, as Mountebank does in debug mode.
+    """
+
+    def __init__(self, host: str, *, listen: bool = True, debug: bool = False) -> None:
+        self.host = host
+        self.listen = listen
+        self.debug = debug
+        self.url = ""
+        self.imposters: dict[int, LocalImposter] = {}
+        self._servers: dict[int, asyncio.Server] = {}
+        self._free_ports = count(_FIRST_ALLOCATED_PORT)
+
+    async def handle(self, request: RawRequest) -> RawResponse:
+        """Handle an admin API request - see :func:`mbtest.engine.http.serve`."""
+        try:
+            return await self._route(request)
+        except NoSuchResource as e:
+            return _error(HTTPStatus.NOT_FOUND, "no such resource", str(e))
+        except (UnsupportedFeature, ValueError, KeyError, TypeError) as e:
+            return _error(HTTPStatus.BAD_REQUEST, "bad data", str(e))
+        except OSError as e:
+            return _error(HTTPStatus.BAD_REQUEST, "resource conflict", str(e))
+
+    async def _route(self, request: RawRequest) -> RawResponse:
+        segments = [segment for segment in request.path.split("/") if segment]
+        if segments[:1] != ["imposters"]:
+            msg = f"Unknown path {request.path}."
+            raise NoSuchResource(msg)
+        if len(segments) == 1:
+            imposters_handler = self._IMPOSTERS_ROUTES.get(request.method)
+            return await imposters_handler(self, request) if imposters_handler else _method_not_allowed(request)
+        imposter = self.imposters.get(int(segments[1]))
+        if imposter is None:
+            msg = f"No imposter on port {segments[1]}."
+            raise NoSuchResource(msg)
+        # Resources below an imposter, with any stub index wildcarded - "", "stubs", "stubs/*" or "savedRequests".
+        rest = segments[2:]
+        imposter_handler = self._IMPOSTER_ROUTES.get((request.method, "/".join(rest[:1] + ["*"] * len(rest[1:]))))
+        if imposter_handler is None:
+            return _method_not_allowed(request)
+        return await imposter_handler(self, request, imposter, rest)
+
+    async def _post_imposters(self, request: RawRequest) -> RawResponse:
+        imposter = await self.add(cast("JsonObject", loads(request.body)))
+        return http.RawResponse.json(self._imposter_structure(imposter), HTTPStatus.CREATED)
+
+    async def _get_imposters(self, request: RawRequest) -> RawResponse:
+        if _replayable(request):
+            return http.RawResponse.json(
+                {"imposters": [imposter.as_replayable() for imposter in self.imposters.values()]}
+            )
+        return http.RawResponse.json({"imposters": [self._summary(imposter) for imposter in self.imposters.values()]})
+
+    async def _put_imposters(self, request: RawRequest) -> RawResponse:
+        structures = cast("list[JsonObject]", cast("JsonObject", loads(request.body))["imposters"])
+        await self.close()
+        imposters = [await self.add(structure) for structure in structures]
+        return http.RawResponse.json({"imposters": [self._summary(imposter) for imposter in imposters]})
+
+    async def _delete_imposters(self, request: RawRequest) -> RawResponse:
+        deleted: list[JsonValue] = [
+            imposter.as_replayable() if _replayable(request) else self._imposter_structure(imposter)
+            for imposter in self.imposters.values()
+        ]
+        await self.close()
+        return http.RawResponse.json({"imposters": deleted})
+
+    async def _get_imposter(self, request: RawRequest, imposter: LocalImposter, _: list[str]) -> RawResponse:
+        # The local engine has no proxies, so there are never any to remove.
+        if _replayable(request):
+            return http.RawResponse.json(imposter.as_replayable())
+        return http.RawResponse.json(self._imposter_structure(imposter))
+
+    async def _delete_imposter(self, request: RawRequest, imposter: LocalImposter, _: list[str]) -> RawResponse:
+        structure = imposter.as_replayable() if _replayable(request) else self._imposter_structure(imposter)
+        await self.delete(imposter.port)
+        return http.RawResponse.json(structure)
+
+    async def _delete_saved_requests(self, _: RawRequest, imposter: LocalImposter, __: list[str]) -> RawResponse:
+        imposter.clear_requests()
+        return http.RawResponse.json(self._imposter_structure(imposter))
+
+    async def _post_stub(self, request: RawRequest, imposter: LocalImposter, _: list[str]) -> RawResponse:
+        body = cast("JsonObject", loads(request.body))
+        stub = imposter.compile_stub(cast("JsonObject", body["stub"]))
+        index = cast("int | None", body.get("index"))
+        imposter.stubs.insert(len(imposter.stubs) if index is None else index, stub)
+        return http.RawResponse.json(self._imposter_structure(imposter))
+
+    async def _put_stubs(self, request: RawRequest, imposter: LocalImposter, _: list[str]) -> RawResponse:
+        structures = cast("list[JsonObject]", cast("JsonObject", loads(request.body))["stubs"])
+        imposter.stubs = [imposter.compile_stub(structure) for structure in structures]
+        return http.RawResponse.json(self._imposter_structure(imposter))
+
+    async def _put_stub(self, request: RawRequest, imposter: LocalImposter, rest: list[str]) -> RawResponse:
+        imposter.stubs[_stub_index(imposter, rest[1])] = imposter.compile_stub(cast("JsonObject", loads(request.body)))
+        return http.RawResponse.json(self._imposter_structure(imposter))
+
+    async def _delete_stub(self, _: RawRequest, imposter: LocalImposter, rest: list[str]) -> RawResponse:
+        del imposter.stubs[_stub_index(imposter, rest[1])]
+        return http.RawResponse.json(self._imposter_structure(imposter))
+
+    async def add(self, structure: JsonObject) -> LocalImposter:
+        """Create an imposter, and start serving it.
+
+        :param structure: Imposter structure.
+        :raises UnsupportedFeature: If the imposter uses features the local engine doesn't implement.
+        """
+        protocol = cast("str", structure.get("protocol", "http"))
+        if (listener := LISTENERS.get(protocol)) is None:
+            msg = f"The {protocol} protocol isn't supported by the local engine."
+            raise UnsupportedFeature(msg)
+        port = cast("int", structure.get("port") or 0)
+        if port in self.imposters:
+            msg = f"Port {port} is already in use."
+            raise ValueError(msg)
+        imposter = LocalImposter(structure, port, debug=self.debug)
+        imposter.port = await self._bind(imposter, listener)
+        self.imposters[imposter.port] = imposter
+        if imposter.mail_store is not None:
+            store.attach_mail_store(f"{self.url}/{imposter.port}", imposter.mail_store)
+        logger.debug("Local %s imposter on port %s.", protocol, imposter.port)
+        return imposter
+
+    async def _bind(self, imposter: LocalImposter, listener: Listener) -> int:
+        """Start serving an imposter, if listening on sockets, returning the port it's on."""
+        if not self.listen:
+            return imposter.port or next(free for free in self._free_ports if free not in self.imposters)
+        server = await listener(imposter, self.host, imposter.port)
+        port = cast("int", server.sockets[0].getsockname()[1])
+        self._servers[port] = server
+        return port
+
+    async def delete(self, port: int) -> None:
+        """Stop serving an imposter, and remove it."""
+        del self.imposters[port]
+        store.detach_mail_store(f"{self.url}/{port}")
+        if (server := self._servers.pop(port, None)) is None:
+            return
+        server.close()
+        # Waiting for clients to close kept-alive connections could take forever, so close them, where possible.
+        if (close_clients := getattr(server, "close_clients", None)) is not None:  # pragma: no cover - Python 3.13+.
+            close_clients()
+
+    async def close(self) -> None:
+        """Remove all imposters."""
+        for port in list(self.imposters):
+            await self.delete(port)
+
+    # Handlers are plain functions here, taking the API as their first argument.
+    _IMPOSTERS_ROUTES: ClassVar[Mapping[str, Callable[[Any, RawRequest], Awaitable[RawResponse]]]] = {
+        "POST": _post_imposters,
+        "GET": _get_imposters,
+        "PUT": _put_imposters,
+        "DELETE": _delete_imposters,
+    }
+
+    _IMPOSTER_ROUTES: ClassVar[
+        Mapping[tuple[str, str], Callable[[Any, RawRequest, LocalImposter, list[str]], Awaitable[RawResponse]]]
+    ] = {
+        ("GET", ""): _get_imposter,
+        ("DELETE", ""): _delete_imposter,
+        ("DELETE", "savedRequests"): _delete_saved_requests,
+        ("POST", "stubs"): _post_stub,
+        ("PUT", "stubs"): _put_stubs,
+        ("PUT", "stubs/*"): _put_stub,
+        ("DELETE", "stubs/*"): _delete_stub,
+    }
+
+    def _imposter_structure(self, imposter: LocalImposter) -> JsonObject:
+        return imposter.as_structure(f"{self.url}/{imposter.port}")
+
+    def _summary(self, imposter: LocalImposter) -> JsonObject:
+        return {
+            "protocol": imposter.protocol,
+            "port": imposter.port,
+            "numberOfRequests": imposter.number_of_requests,
+            "_links": {"self": {"href": f"{self.url}/{imposter.port}"}},
+        }
+
+
+def _replayable(request: RawRequest) -> bool:
+    return request.query.get("replayable") == "true"
+
+
+def _stub_index(imposter: LocalImposter, segment: str) -> int:
+    index = int(segment)
+    if not 0 <= index < len(imposter.stubs):
+        msg = f"No stub {index} on imposter {imposter.port}."
+        raise NoSuchResource(msg)
+    return index
+
+
+def _error(status: int, code: str, message: str) -> RawResponse:
+    return http.RawResponse.json({"errors": [{"code": code, "message": message}]}, status)
+
+
+def _method_not_allowed(request: RawRequest) -> RawResponse:
+    return _error(HTTPStatus.METHOD_NOT_ALLOWED, "bad data", f"{request.method} {request.path} isn't supported.")
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, TypeVar
+
+import httpx2 as httpx
+
+from mbtest.engine import http
+from mbtest.engine.admin import AdminApi
+from mbtest.server import MountebankServer
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Coroutine
+    from concurrent.futures import Future
+
+    from _pytest.fixtures import FixtureRequest
+
+_T = TypeVar("_T")
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# Emulated requests don't come from anywhere.
+_CLIENT = ("127.0.0.1", 0)
+_FAULT_ERRORS: dict[str, type[httpx.TransportError]] = {
+    "CONNECTION_RESET_BY_PEER": httpx.ReadError,
+    "RANDOM_DATA_THEN_CLOSE": httpx.RemoteProtocolError,
+}
+
+
+def emulated_mock_server(
+    request: FixtureRequest, port: int = 2525, host: str = "localhost"
+) -> EmulatedMountebankServer:
+    """`Pytest fixture <https://docs.pytest.org/en/latest/fixture.html>`_, making available an emulated mock server -
+    a drop-in replacement for :func:`mbtest.server.mock_server` which serves its admin API and imposters in memory,
+    without sockets.
+
+    Use in a pytest conftest.py fixture as follows::
+
+        @pytest.fixture
+        def mock_server(request):
+            return emulator.emulated_mock_server(request)
+
+    :param request: Request for a fixture from a test or fixture function.
+    :param port: Admin API port.
+    :param host: Host name the admin API and imposters are addressed by.
+    :returns: Mock server.
+    """
+    server = EmulatedMountebankServer(port=port, host=host)
+    request.addfinalizer(server.close)
+    return server
+
+
+class EmulatedMountebankServer(MountebankServer):
+    """An emulated Mountebank server, holding its imposters in memory, and serving them and its admin API through an
+    `httpx transport <https://www.python-httpx.org/advanced/transports/>`_ rather than over sockets. Nothing is
+    started, so creating one takes microseconds, and suites which make many admin API calls run deterministically,
+    in milliseconds.
+
+    The admin API covers the endpoints :class:`mbtest.server.MountebankServer` uses - creating, replacing, querying
+    and deleting imposters, with or without ``replayable``, adding, replacing and deleting their stubs, and deleting
+    their saved requests. Imposters support the same features as :class:`mbtest.engine.LocalMountebankServer`'s.
+
+    The server, and the imposters added to it, are reached through its :attr:`client`, which serves requests in
+    memory - as does any client mounting its :attr:`transport`, as ``httpx.Client(transport=...)``::
+
+        def test_an_imposter():
+            mb = EmulatedMountebankServer()
+            imposter = Imposter(Stub(Predicate(path='/test'), Response(body='sausages')))
+
+            with mb(imposter):
+                r = mb.client.get(f"{imposter.url}/test")
+
+                assert_that(r, is_response().with_status_code(200).and_body("sausages"))
+
+            mb.close()
+
+    Consider using the :func:`emulated_mock_server` pytest fixture, which will take care of closing it for you.
+
+    :param port: Admin API port.
+    :param host: Host name the admin API and imposters are addressed by.
+    :param imposters_path: Imposters path, if not `imposters`.
+    :param debug: Record the requests each stub matches, as Mountebank does in debug mode.
+    """
+
+    def __init__(
+        self, port: int = 2525, host: str = "localhost", imposters_path: str = "imposters", *, debug: bool = True
+    ) -> None:
+        self.admin = AdminApi(host, listen=False, debug=debug)
+        self.transport = EmulatorTransport(self.admin, port)
+        super().__init__(port, host=host, imposters_path=imposters_path, client=httpx.Client(transport=self.transport))
+        self.admin.url = str(self.server_url)
+
+    def close(self) -> None:
+        """Discard all imposters, and close the client."""
+        self.client.close()
+        self.transport.shutdown()
+
+
+class EmulatorTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """An httpx transport serving an in-memory admin API and its imposters, whatever host requests are addressed to.
+    Requests to the admin API's port go to it, requests to an imposter's port to that imposter, and requests to any
+    other port fail with :class:`httpx.ConnectError`.
+
+    :param admin: Admin API, which must not listen on sockets.
+    :param port: Admin API port.
+    """
+
+    def __init__(self, admin: AdminApi, port: int) -> None:
+        self.admin = admin
+        self.port = port
+        # All requests, synchronous or not, are served on a private event loop's thread, so that the admin API and its
+        # imposters are only ever touched there, and behaviors such as wait still work.
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name="mbtest-emulator", daemon=True)
+        self._thread.start()
+        self._lock = Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        raw = _raw_request(request, request.read())
+        return _response(request, self._run(self._dispatch(request, raw)).result())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        raw = _raw_request(request, await request.aread())
+        return _response(request, await asyncio.wrap_future(self._run(self._dispatch(request, raw))))
+
+    def shutdown(self) -> None:
+        """Discard all imposters, and stop the event loop. Closing a client using the transport leaves it open."""
+        with self._lock:
+            if self._loop.is_closed():
+                return
+            asyncio.run_coroutine_threadsafe(self.admin.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def _run(self, coroutine: Coroutine[object, object, _T]) -> Future[_T]:
+        with self._lock:
+            if self._loop.is_closed():
+                coroutine.close()
+                msg = "The emulator has been shut down."
+                raise httpx.ConnectError(msg)
+            return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _dispatch(self, request: httpx.Request, raw: http.RawRequest) -> http.RawResponse:
+        port = _port(request)
+        if port == self.port:
+            return await self.admin.handle(raw)
+        if (imposter := self.admin.imposters.get(port)) is None:
+            msg = f"Nothing is emulated on port {port}."
+            raise httpx.ConnectError(msg, request=request)
+        return await http.imposter_handler(imposter)(raw)
+
+
+def _port(request: httpx.Request) -> int:
+    return request.url.port or _DEFAULT_PORTS.get(request.url.scheme, 0)
+
+
+def _raw_request(request: httpx.Request, body: bytes) -> http.RawRequest:
+    headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in request.headers.raw]
+    return http.RawRequest(request.method, request.url.raw_path.decode("ascii"), headers, body, _CLIENT)
+
+
+def _response(request: httpx.Request, response: http.RawResponse) -> httpx.Response:
+    if response.fault:
+        msg = f"Emulated {response.fault} fault."
+        raise _FAULT_ERRORS.get(response.fault, httpx.ReadError)(msg, request=request)
+    headers = [(name, value) for name, value in response.headers if name.lower() not in http.MANAGED_HEADERS]
+    headers.append(("Content-Length", str(len(response.body))))
+    content = b"" if request.method == "HEAD" else response.body
+    return httpx.Response(response.status, headers=headers, stream=httpx.ByteStream(content), request=request)
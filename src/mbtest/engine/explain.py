@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from base64 import b64decode
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl
+
+from mbtest.engine.matching import compile_predicates
+from mbtest.imposters.imposters import HttpRequest, TcpRequest
+from mbtest.imposters.responses import Response
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Iterable, Iterator, Mapping, Sequence
+
+    from mbtest.engine.matching import CompiledPredicate, PredicateTrace
+    from mbtest.imposters.base import JsonObject
+    from mbtest.imposters.imposters import Imposter, Request
+    from mbtest.imposters.stubs import Stub
+
+
+@dataclass(frozen=True, slots=True)
+class StubTrace:
+    """How a request fared against one stub's predicates.
+
+    :param index: Stub's position in the imposter.
+    :param stub: The stub.
+    :param matched: Whether the request matched all the stub's predicates.
+    :param predicates: Trace of each of the stub's predicates.
+    """
+
+    index: int
+    stub: Stub
+    matched: bool
+    predicates: Sequence[PredicateTrace]
+
+    def describe(self) -> str:
+        """A readable account of the trace."""
+        outcome = "matched" if self.matched else "didn't match"
+        lines = [f"stub {self.index} - {outcome}"]
+        lines.extend(predicate.describe(1) for predicate in self.predicates)
+        return "\n".join(lines)
+
+
+@dataclass(frozen=True, slots=True)
+class Explanation:
+    """Which stub serves a request, and, if traced, why.
+
+    :param request: The request.
+    :param index: Position of the first stub the request matches, or `None` if it gets the default response.
+    :param stub: The first stub the request matches, or `None`.
+    :param traces: If traced, how the request fared against each stub evaluated - every stub before the one it
+        matches, or all of them if it matches none.
+    """
+
+    request: Request
+    index: int | None
+    stub: Stub | None
+    traces: Sequence[StubTrace] = ()
+
+    @property
+    def matched(self) -> bool:
+        """Whether the request matches a stub, rather than getting the default response."""
+        return self.index is not None
+
+    def describe(self) -> str:
+        """A readable account of the explanation, including its traces."""
+        outcome = f"served by stub {self.index}" if self.matched else "served the default response"
+        return "\n".join([f"{self.request} - {outcome}", *(trace.describe() for trace in self.traces)])
+
+
+class StubEvaluator:
+    """Evaluates an imposter's stubs against requests offline, as Mountebank would, to explain which stub serves each
+    request and why - without replaying requests against Mountebank and reading its logs::
+
+        evaluator = StubEvaluator(imposter)
+        explanation = evaluator.explain(request)
+        if not explanation.matched:
+            print(explanation.describe())
+
+    Predicates are compiled once, when the evaluator is built, following the local engine's matching rules - see
+    :func:`mbtest.engine.matching.compile_predicates`. Whole recorded logs can then be evaluated in a batch with
+    :meth:`explain_all`. Stubs are evaluated in order, but their responses aren't - behaviors such as ``repeat``
+    don't affect which stub a request matches.
+
+    :param imposter: Imposter whose stubs are evaluated.
+    :raises UnsupportedFeature: If a stub's predicates can't be evaluated locally, such as injected ones.
+    """
+
+    def __init__(self, imposter: Imposter) -> None:
+        self.imposter = imposter
+        self.binary = imposter.mode == Response.Mode.BINARY
+        structures = [[predicate.as_structure() for predicate in stub.predicates] for stub in imposter.stubs]
+        self._stubs = [compile_predicates(predicates, binary=self.binary) for predicates in structures]
+        # Each of a stub's predicates is also compiled separately, so that all of them can be traced.
+        self._predicates: list[list[CompiledPredicate]] = [
+            [compile_predicates([predicate], binary=self.binary) for predicate in predicates]
+            for predicates in structures
+        ]
+
+    def first_match(self, request: Request) -> int | None:
+        """Position of the first stub a request matches, or `None` if it gets the default response."""
+        structure = request_structure(request, binary=self.binary)
+        for index, matches in enumerate(self._stubs):
+            if matches(structure):
+                return index
+        return None
+
+    def explain(self, request: Request, *, trace: bool = True) -> Explanation:
+        """Explain which stub serves a request.
+
+        :param request: The request.
+        :param trace: Trace how the request fared against each stub evaluated. Without traces, requests are
+            evaluated much more quickly.
+        """
+        if not trace:
+            index = self.first_match(request)
+            return Explanation(request, index, self.imposter.stubs[index] if index is not None else None)
+        structure = request_structure(request, binary=self.binary)
+        traces = []
+        for index, (stub, predicates) in enumerate(zip(self.imposter.stubs, self._predicates, strict=True)):
+            predicate_traces = tuple(predicate.explain(structure) for predicate in predicates)
+            matched = all(predicate_trace.matched for predicate_trace in predicate_traces)
+            traces.append(StubTrace(index, stub, matched, predicate_traces))
+            if matched:
+                return Explanation(request, index, stub, tuple(traces))
+        return Explanation(request, None, None, tuple(traces))
+
+    def explain_all(self, requests: Iterable[Request], *, trace: bool = False) -> Iterator[Explanation]:
+        """Explain which stub serves each of a sequence of requests - a recorded log, say.
+
+        :param requests: The requests.
+        :param trace: Trace how each request fared against each stub evaluated - see :meth:`explain`.
+        """
+        for request in requests:
+            yield self.explain(request, trace=trace)
+
+
+def request_structure(request: Request, *, binary: bool = False) -> JsonObject:
+    """Convert a recorded request to a structure, as predicates are matched against it - see
+    :func:`mbtest.engine.matching.compile_predicates`.
+
+    :param request: An HTTP or TCP request.
+    :param binary: The request was recorded by a binary mode TCP imposter, so its data is base64 encoded.
+    :raises TypeError: For other kinds of request.
+    """
+    if isinstance(request, HttpRequest):
+        return _http_structure(request)
+    if isinstance(request, TcpRequest):
+        return {"data": b64decode(request.data).decode("latin-1") if binary else request.data}
+    msg = f"Stubs can't be evaluated against {type(request).__name__} requests."
+    raise TypeError(msg)
+
+
+def _http_structure(request: HttpRequest) -> JsonObject:
+    structure: JsonObject = {
+        "method": request.method,
+        "path": request.path,
+        "query": dict(request.query),
+        "headers": dict(request.headers),
+        "body": request.body or "",
+    }
+    if _content_type(request.headers).startswith("application/x-www-form-urlencoded"):
+        structure["form"] = dict(parse_qsl(request.body or "", keep_blank_values=True))
+    return structure
+
+
+def _content_type(headers: Mapping[str, str]) -> str:
+    return next((value for name, value in headers.items() if name.lower() == "content-type"), "")
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import binascii
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from http import HTTPStatus
+from typing import TYPE_CHECKING, cast
+from urllib.parse import parse_qsl
+
+from mbtest.engine.imposters import behaviors, timestamp
+from mbtest.serialisation import dumps
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Awaitable, Callable
+
+    from mbtest.engine.imposters import LocalImposter
+    from mbtest.imposters.base import JsonObject, JsonValue
+
+_HEAD_LIMIT = 1 << 16
+_NO_BODY_STATUSES = frozenset((*range(100, 200), 204, 304))
+# Headers set when a response is sent, rather than taken from its definition.
+MANAGED_HEADERS = frozenset(("content-length", "transfer-encoding", "connection"))
+
+
+class BadRequest(Exception):
+    """A malformed HTTP request."""
+
+
+@dataclass(slots=True)
+class RawRequest:
+    """An HTTP request, as received.
+
+    :param method: Method.
+    :param target: Request target - the path and query string.
+    :param headers: Headers, in the order received.
+    :param body: Body.
+    :param client: Client address and port.
+    :param version: HTTP version.
+    """
+
+    method: str
+    target: str
+    headers: list[tuple[str, str]] = field(default_factory=list)
+    body: bytes = b""
+    client: tuple[str, int] = ("", 0)
+    version: str = "HTTP/1.1"
+
+    @property
+    def path(self) -> str:
+        return self.target.partition("?")[0]
+
+    @property
+    def query(self) -> dict[str, JsonValue]:
+        """Query parameters. Repeated parameters are gathered into lists, as Mountebank does."""
+        query: dict[str, JsonValue] = {}
+        for name, value in parse_qsl(self.target.partition("?")[2], keep_blank_values=True):
+            if name not in query:
+                query[name] = value
+            elif isinstance(existing := query[name], list):
+                existing.append(value)
+            else:
+                query[name] = [cast("str", existing), value]
+        return query
+
+    def header(self, name: str) -> str | None:
+        lowered = name.lower()
+        return next((value for key, value in self.headers if key.lower() == lowered), None)
+
+
+@dataclass(slots=True)
+class RawResponse:
+    """An HTTP response, to be sent.
+
+    :param status: Status code.
+    :param headers: Headers. Content-Length and Connection are set when it's sent.
+    :param body: Body.
+    :param fault: Instead of responding, simulate this `fault <http://localhost:2525/docs/api/faults>`_.
+    """
+
+    status: int = HTTPStatus.OK
+    headers: list[tuple[str, str]] = field(default_factory=list)
+    body: bytes = b""
+    fault: str | None = None
+
+    @classmethod
+    def json(cls, structure: JsonValue, status: int = HTTPStatus.OK) -> RawResponse:
+        return cls(status, [("Content-Type", "application/json")], dumps(structure, indent=True))
+
+
+async def serve(handler: Callable[[RawRequest], Awaitable[RawResponse]], host: str, port: int) -> asyncio.Server:
+    """Serve HTTP/1.1, with keep-alive, passing each request to a handler.
+
+    :param handler: Coroutine function producing the response to a request.
+    :param host: Host address to listen on.
+    :param port: Port to listen on, or 0 for any free port.
+    :returns: The running server.
+    """
+    return await asyncio.start_server(partial(_serve_connection, handler), host, port, limit=_HEAD_LIMIT)
+
+
+async def _serve_connection(
+    handler: Callable[[RawRequest], Awaitable[RawResponse]],
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    client = cast("tuple[str, int]", writer.get_extra_info("peername"))[:2]
+    try:
+        while (request := await _read_request(reader, writer, client)) is not None:
+            if not await _respond(writer, request, await handler(request)):
+                break
+    except BadRequest:
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.CancelledError):
+        # Connections still open are cancelled when the engine is closed.
+        return
+    finally:
+        writer.close()
+
+
+async def _respond(writer: asyncio.StreamWriter, request: RawRequest, response: RawResponse) -> bool:
+    """Send a response, returning whether to keep the connection open for another request."""
+    if response.fault:
+        fault(writer, response.fault)
+        return False
+    keep_alive = _keep_alive(request)
+    writer.write(_encode_response(request, response, keep_alive=keep_alive))
+    await writer.drain()
+    return keep_alive
+
+
+async def _read_request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, client: tuple[str, int]
+) -> RawRequest | None:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise
+        return None  # Connection closed between requests.
+    try:
+        request = _parse_head(head, client)
+        request.body = await _read_body(reader, writer, request)
+    except ValueError as e:
+        raise BadRequest from e
+    return request
+
+
+def _parse_head(head: bytes, client: tuple[str, int]) -> RawRequest:
+    request_line, *header_lines = head[:-4].decode("latin-1").split("\r\n")
+    method, target, version = request_line.split(" ", 2)
+    headers = [(name.strip(), value.strip()) for name, _, value in (line.partition(":") for line in header_lines)]
+    return RawRequest(method, target, headers, client=client, version=version)
+
+
+async def _read_body(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: RawRequest) -> bytes:
+    if request.header("Expect") == "100-continue":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+    if (request.header("Transfer-Encoding") or "").lower() == "chunked":
+        return await _read_chunked(reader)
+    if length := request.header("Content-Length"):
+        return await reader.readexactly(int(length))
+    return b""
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    chunks = []
+    while size := int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16):
+        chunks.append((await reader.readexactly(size + 2))[:-2])
+    while (await reader.readuntil(b"\r\n")) != b"\r\n":  # Trailers
+        pass
+    return b"".join(chunks)
+
+
+def _keep_alive(request: RawRequest) -> bool:
+    connection = (request.header("Connection") or "").lower()
+    return connection == "keep-alive" if request.version == "HTTP/1.0" else connection != "close"
+
+
+def _encode_response(request: RawRequest, response: RawResponse, *, keep_alive: bool) -> bytes:
+    try:
+        reason = HTTPStatus(response.status).phrase
+    except ValueError:
+        reason = "Unknown"
+    lines = [f"HTTP/1.1 {response.status} {reason}"]
+    lines += [f"{name}: {value}" for name, value in response.headers if name.lower() not in MANAGED_HEADERS]
+    if response.status not in _NO_BODY_STATUSES:
+        lines.append(f"Content-Length: {len(response.body)}")
+    if not keep_alive:
+        lines.append("Connection: close")
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+    if request.method == "HEAD" or response.status in _NO_BODY_STATUSES:
+        return head
+    return head + response.body
+
+
+def fault(writer: asyncio.StreamWriter, name: str) -> None:
+    """Simulate a `fault <http://localhost:2525/docs/api/faults>`_ on a connection, closing it."""
+    if name == "RANDOM_DATA_THEN_CLOSE":
+        writer.write(os.urandom(1024))
+        writer.close()
+    else:
+        writer.transport.abort()
+
+
+def request_structure(request: RawRequest) -> JsonObject:
+    """Convert a request to a structure, as Mountebank records it, and as predicates are matched against.
+
+    :param request: HTTP request.
+    """
+    headers: dict[str, JsonValue] = {}
+    for name, value in request.headers:
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+    structure: JsonObject = {
+        "requestFrom": f"{request.client[0]}:{request.client[1]}",
+        "method": request.method,
+        "path": request.path,
+        "query": request.query,
+        "headers": headers,
+        "body": request.body.decode("utf-8", errors="replace"),
+        "ip": request.client[0],
+        "timestamp": timestamp(),
+    }
+    if (request.header("Content-Type") or "").startswith("application/x-www-form-urlencoded"):
+        structure["form"] = dict(parse_qsl(cast("str", structure["body"]), keep_blank_values=True))
+    return structure
+
+
+def imposter_handler(imposter: LocalImposter) -> Callable[[RawRequest], Awaitable[RawResponse]]:
+    """Handler serving a local HTTP imposter - see :func:`serve`."""
+
+    async def handle(request: RawRequest) -> RawResponse:
+        response = imposter.respond(request_structure(request))
+        if wait := behaviors(response).get("wait"):
+            await asyncio.sleep(cast("int", wait) / 1000)
+        if "fault" in response:
+            return RawResponse(fault=cast("str", response["fault"]))
+        return render(cast("JsonObject", response["is"]), imposter.default_response)
+
+    return handle
+
+
+def render(fields: JsonObject, default_response: JsonObject) -> RawResponse:
+    """Render an ``is`` response structure. Any fields it doesn't set are taken from the imposter's default response,
+    as Mountebank does."""
+    fields = {**default_response, **fields}
+    body = fields.get("body", "")
+    headers = [(name, str(value)) for name, value in cast("JsonObject", fields.get("headers") or {}).items()]
+    if isinstance(body, str):
+        content = binascii.a2b_base64(body) if fields.get("_mode") == "binary" else body.encode("utf-8")
+    else:
+        content = dumps(body)
+        if not any(name.lower() == "content-type" for name, _ in headers):
+            headers.append(("Content-Type", "application/json"))
+    return RawResponse(int(cast("int | str", fields.get("statusCode", HTTPStatus.OK))), headers, content)
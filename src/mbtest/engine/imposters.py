@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, cast
+
+from mbtest.engine.matching import UnsupportedFeature, compile_predicates
+from mbtest.store import MailStore
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Callable
+
+    from mbtest.imposters.base import JsonObject, JsonValue
+
+_SUPPORTED_BEHAVIORS = frozenset(("wait", "repeat"))
+_STATE_KEYS = frozenset(("port", "stubs", "requests", "numberOfRequests", "_links"))
+
+
+class LocalStub:
+    """A stub served by the local engine - its structure, compiled predicates, position in its responses, and the
+    requests it's matched, if they're recorded.
+
+    :param structure: Stub structure, as posted to Mountebank.
+    :param binary: Predicates are for a binary mode TCP imposter - see
+        :func:`mbtest.engine.matching.compile_predicates`.
+    :raises UnsupportedFeature: If the stub uses features the local engine doesn't implement.
+    """
+
+    __slots__ = ("_index", "_repeats", "matches", "recorded_matches", "responses", "structure")
+
+    def __init__(self, structure: JsonObject, *, binary: bool = False) -> None:
+        self.structure = structure
+        self.matches: Callable[[JsonObject], bool] = compile_predicates(
+            cast("list[JsonObject]", structure.get("predicates", [])), binary=binary
+        )
+        self.responses = cast("list[JsonObject]", structure.get("responses")) or [{"is": {}}]
+        for response in self.responses:
+            _check_response(response)
+        self.recorded_matches: list[JsonObject] = []
+        self._index = 0
+        self._repeats = 0
+
+    def as_structure(self) -> JsonObject:
+        """The stub's structure, with the requests it's matched, as Mountebank returns it in debug mode."""
+        if not self.recorded_matches:
+            return self.structure
+        return {**self.structure, "matches": cast("list[JsonValue]", self.recorded_matches)}
+
+    def next_response(self) -> JsonObject:
+        """The response to send for the next matching request. Responses are used in turn, each repeated as its
+        ``repeat`` behavior asks, and cycle back to the first when exhausted."""
+        response = self.responses[self._index]
+        self._repeats += 1
+        if self._repeats >= cast("int", behaviors(response).get("repeat", 1)):
+            self._index = (self._index + 1) % len(self.responses)
+            self._repeats = 0
+        return response
+
+
+class LocalImposter:
+    """An imposter served by the local engine.
+
+    :param structure: Imposter structure, as posted to Mountebank.
+    :param port: Port it's served on.
+    :param debug: Record the requests each stub matches, as Mountebank does in debug mode.
+    :raises UnsupportedFeature: If the imposter uses features the local engine doesn't implement.
+    """
+
+    def __init__(self, structure: JsonObject, port: int, *, debug: bool = False) -> None:
+        self.port = port
+        self.debug = debug
+        self.protocol = cast("str", structure.get("protocol", "http"))
+        self.record_requests = bool(structure.get("recordRequests", False))
+        self.binary = structure.get("mode") == "binary"
+        self.default_response = cast("JsonObject", structure.get("defaultResponse", {}))
+        self.definition: JsonObject = {key: value for key, value in structure.items() if key not in _STATE_KEYS}
+        self.stubs = [self.compile_stub(stub) for stub in cast("list[JsonObject]", structure.get("stubs", []))]
+        self.requests: list[JsonObject] = []
+        self.number_of_requests = 0
+        # Email sent to an SMTP imposter, decoded as it's received, for querying directly.
+        self.mail_store = MailStore() if self.protocol == "smtp" else None
+
+    def compile_stub(self, structure: JsonObject) -> LocalStub:
+        """Compile a stub structure for this imposter."""
+        return LocalStub(structure, binary=self.binary)
+
+    def respond(self, request: JsonObject, matched: JsonObject | None = None) -> JsonObject:
+        """Record a request, if recording, and choose the response to it - from the first stub with matching
+        predicates, or the default response.
+
+        :param request: Request structure, as Mountebank records it.
+        :param matched: Request structure predicates are matched against, if not the recorded one.
+        :returns: Response structure, such as ``{"is": {...}}``.
+        """
+        self.number_of_requests += 1
+        if self.record_requests:
+            self.requests.append(request)
+        matched = request if matched is None else matched
+        for stub in self.stubs:
+            if stub.matches(matched):
+                response = stub.next_response()
+                if self.debug:
+                    stub.recorded_matches.append({"timestamp": timestamp(), "request": request, "response": response})
+                return response
+        return {"is": {}}
+
+    def clear_requests(self) -> None:
+        """Forget recorded requests, and email."""
+        self.requests.clear()
+        if self.mail_store is not None:
+            self.mail_store.clear()
+
+    def as_structure(self, url: str) -> JsonObject:
+        """The imposter's structure, including its recorded requests, as Mountebank returns it.
+
+        :param url: The imposter's admin URL.
+        """
+        return {
+            **self.definition,
+            "port": self.port,
+            "numberOfRequests": self.number_of_requests,
+            "requests": cast("list[JsonValue]", self.requests),
+            "stubs": cast("list[JsonValue]", [stub.as_structure() for stub in self.stubs]),
+            "_links": {"self": {"href": url}, "stubs": {"href": f"{url}/stubs"}},
+        }
+
+    def as_replayable(self) -> JsonObject:
+        """The imposter's definition, without its recorded requests or links, as Mountebank returns it with
+        ``replayable=true`` - ready to be posted again."""
+        return {**self.definition, "port": self.port, "stubs": [stub.structure for stub in self.stubs]}
+
+
+def behaviors(response: JsonObject) -> JsonObject:
+    """A response's behaviors, which may be given as an object, or a list of them."""
+    value = response.get("_behaviors") or {}
+    if isinstance(value, list):
+        return {key: item for behavior in cast("list[JsonObject]", value) for key, item in behavior.items()}
+    return cast("JsonObject", value)
+
+
+def timestamp() -> str:
+    """The current time, formatted as Mountebank records it."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _check_response(response: JsonObject) -> None:
+    if "is" not in response and "fault" not in response:
+        kind = next(iter(response), "empty")
+        msg = f"{kind} responses aren't supported by the local engine."
+        raise UnsupportedFeature(msg)
+    for name, value in behaviors(response).items():
+        if name not in _SUPPORTED_BEHAVIORS or not isinstance(value, int | None):
+            msg = f"The {name} behavior {_describe(value)}isn't supported by the local engine."
+            raise UnsupportedFeature(msg)
+
+
+def _describe(value: JsonValue) -> str:
+    return "given as a function " if isinstance(value, str) else ""
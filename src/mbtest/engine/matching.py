@@ -0,0 +1,497 @@
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from base64 import b64decode
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, cast
+from xml.etree import ElementTree as ET
+
+from mbtest.serialisation import loads
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Callable
+
+    from mbtest.imposters.base import JsonObject, JsonValue
+
+_OPERATORS = frozenset(("equals", "deepEquals", "contains", "startsWith", "endsWith", "matches", "exists"))
+_UNSUPPORTED = ("inject", "except")
+
+
+class UnsupportedFeature(ValueError):
+    """An imposter uses a Mountebank feature which the local engine doesn't implement."""
+
+
+def compile_predicates(predicates: Sequence[JsonObject], *, binary: bool = False) -> CompiledPredicate:
+    """Compile a stub's predicates, as Mountebank structures, to a function which tells whether a request matches
+    them all, following `Mountebank's matching rules <http://localhost:2525/docs/api/predicates>`_.
+
+    Values are compared case-insensitively unless ``caseSensitive`` is set, and object keys (such as header names)
+    unless ``keyCaseSensitive`` is set. Expected objects match if each of their members does - for ``deepEquals``,
+    with no others - and a string holding JSON can be matched against an object. An expected scalar matches an array
+    (a repeated query parameter, say) if any of its items does.
+
+    An ``xpath`` or ``jsonpath`` selector picks the values compared out of the request fields the predicate names,
+    usually the body. Nothing selected is treated as a missing value, one value as a string, and several as an array.
+    Regular expressions and selectors are compiled once, here. xpath selectors are limited to what
+    :mod:`xml.etree.ElementTree` supports, and a trailing ``/text()`` or ``/@attribute``. jsonpath selectors are
+    limited to child, recursive descent, wildcard and index steps.
+
+    For a binary mode TCP imposter, the ``data`` predicates give are base64 encoded. They are matched, byte for byte,
+    against request data decoded as latin-1 text.
+
+    :param predicates: Predicate structures.
+    :param binary: Predicates are for a binary mode TCP imposter.
+    :returns: Compiled predicate, taking a request structure, as Mountebank records it.
+    :raises UnsupportedFeature: If a predicate can't be evaluated locally.
+    """
+    if binary:
+        predicates = [_binary_as_text(predicate) for predicate in predicates]
+    if len(predicates) == 1:
+        return compile_predicate(predicates[0])
+    return _AllOf({"and": cast("list[JsonValue]", predicates)}, [compile_predicate(item) for item in predicates])
+
+
+def compile_predicate(predicate: JsonObject) -> CompiledPredicate:
+    """Compile a single predicate structure - see :func:`compile_predicates`."""
+    for key, combinator in _COMBINATORS.items():
+        if key in predicate:
+            return combinator(predicate)
+    operator = _operator(predicate)
+    comparison = _Comparison(
+        operator,
+        case_sensitive=bool(predicate.get("caseSensitive", False)),
+        keys_case_sensitive=bool(predicate.get("keyCaseSensitive", False)),
+    )
+    expected = cast("JsonObject", predicate[operator])
+    if operator == "matches":
+        expected = _compile_patterns(expected, 0 if comparison.case_sensitive else re.IGNORECASE)
+    return _Operation(predicate, comparison, expected, _selector(predicate, comparison))
+
+
+@dataclass(frozen=True, slots=True)
+class PredicateTrace:
+    """How a request fared against a predicate, and against each part of it.
+
+    :param predicate: Predicate structure.
+    :param matched: Whether the request matched the predicate.
+    :param fields: For an operator predicate, whether each request field it names matched.
+    :param children: For an ``and``, ``or`` or ``not`` predicate, traces of the predicates it combines - up to the
+        one which decided the outcome, as they're evaluated lazily.
+    """
+
+    predicate: JsonObject
+    matched: bool
+    fields: Mapping[str, bool] = field(default_factory=dict)
+    children: Sequence[PredicateTrace] = ()
+
+    def describe(self, indent: int = 0) -> str:
+        """A readable, indented, account of the trace, one predicate per line."""
+        outcome = "matched" if self.matched else "didn't match"
+        if self.fields:
+            label = ", ".join(f"{name} {'ok' if ok else 'failed'}" for name, ok in self.fields.items())
+            label = f"{next(key for key in self.predicate if key in _OPERATORS)}: {label}"
+        else:
+            label = next((key for key in _COMBINATORS if key in self.predicate), "predicate")
+        lines = [f"{'  ' * indent}{label} - {outcome}"]
+        lines.extend(child.describe(indent + 1) for child in self.children)
+        return "\n".join(lines)
+
+
+class CompiledPredicate(ABC):
+    """A compiled predicate - call it with a request structure to tell whether it matches, or :meth:`explain` how.
+
+    :param structure: Predicate structure it was compiled from.
+    """
+
+    __slots__ = ("structure",)
+
+    def __init__(self, structure: JsonObject) -> None:
+        self.structure = structure
+
+    @abstractmethod
+    def __call__(self, request: JsonObject) -> bool:
+        """Whether the predicate matches a request."""
+
+    @abstractmethod
+    def explain(self, request: JsonObject) -> PredicateTrace:
+        """Evaluate the predicate against a request, recording how each part of it fared."""
+
+
+class _Operation(CompiledPredicate):
+    __slots__ = ("comparison", "fields", "select")
+
+    def __init__(
+        self,
+        structure: JsonObject,
+        comparison: _Comparison,
+        expected: Mapping[str, Any],
+        select: Callable[[str], JsonValue] | None,
+    ) -> None:
+        super().__init__(structure)
+        self.comparison = comparison
+        # Each field's name, expected value, and - for a scalar compared as text - its text, prepared for comparison.
+        self.fields = tuple((name, value, comparison.prepared(value)) for name, value in expected.items())
+        self.select = select
+
+    def __call__(self, request: JsonObject) -> bool:
+        for name, expected, prepared in self.fields:
+            if not self._field_matches(request.get(name), expected, prepared):
+                return False
+        return True
+
+    def explain(self, request: JsonObject) -> PredicateTrace:
+        fields = {
+            name: self._field_matches(request.get(name), expected, prepared) for name, expected, prepared in self.fields
+        }
+        return PredicateTrace(self.structure, all(fields.values()), fields)
+
+    def _field_matches(self, actual: JsonValue, expected: Any, prepared: str | None) -> bool:
+        if self.select is not None and isinstance(actual, str):
+            actual = self.select(actual)
+        if prepared is not None and type(actual) is str:
+            return self.comparison.compare_text(prepared, actual)
+        return self.comparison.compare(expected, actual)
+
+
+class _AllOf(CompiledPredicate):
+    __slots__ = ("predicates",)
+
+    def __init__(self, structure: JsonObject, predicates: Sequence[CompiledPredicate]) -> None:
+        super().__init__(structure)
+        self.predicates = predicates
+
+    def __call__(self, request: JsonObject) -> bool:
+        return all(predicate(request) for predicate in self.predicates)
+
+    def explain(self, request: JsonObject) -> PredicateTrace:
+        return _explain_until(self.structure, self.predicates, request, decided_by=False)
+
+
+class _AnyOf(_AllOf):
+    __slots__ = ()
+
+    def __call__(self, request: JsonObject) -> bool:
+        return any(predicate(request) for predicate in self.predicates)
+
+    def explain(self, request: JsonObject) -> PredicateTrace:
+        return _explain_until(self.structure, self.predicates, request, decided_by=True)
+
+
+class _Inverse(CompiledPredicate):
+    __slots__ = ("predicate",)
+
+    def __init__(self, structure: JsonObject, predicate: CompiledPredicate) -> None:
+        super().__init__(structure)
+        self.predicate = predicate
+
+    def __call__(self, request: JsonObject) -> bool:
+        return not self.predicate(request)
+
+    def explain(self, request: JsonObject) -> PredicateTrace:
+        trace = self.predicate.explain(request)
+        return PredicateTrace(self.structure, not trace.matched, children=(trace,))
+
+
+def _explain_until(
+    structure: JsonObject, predicates: Sequence[CompiledPredicate], request: JsonObject, *, decided_by: bool
+) -> PredicateTrace:
+    """Trace predicates in turn until one matches (or fails to, if ``decided_by`` is false), as evaluation stops."""
+    children = []
+    for predicate in predicates:
+        children.append(trace := predicate.explain(request))
+        if trace.matched is decided_by:
+            return PredicateTrace(structure, decided_by, children=tuple(children))
+    return PredicateTrace(structure, not decided_by, children=tuple(children))
+
+
+def _all_of(structure: JsonObject) -> CompiledPredicate:
+    predicates = cast("list[JsonObject]", structure["and"])
+    return _AllOf(structure, [compile_predicate(predicate) for predicate in predicates])
+
+
+def _any_of(structure: JsonObject) -> CompiledPredicate:
+    predicates = cast("list[JsonObject]", structure["or"])
+    return _AnyOf(structure, [compile_predicate(predicate) for predicate in predicates])
+
+
+def _inverse_of(structure: JsonObject) -> CompiledPredicate:
+    return _Inverse(structure, compile_predicate(cast("JsonObject", structure["not"])))
+
+
+_COMBINATORS: Mapping[str, Callable[[JsonObject], CompiledPredicate]] = {
+    "and": _all_of,
+    "or": _any_of,
+    "not": _inverse_of,
+}
+
+
+def _binary_as_text(predicate: JsonObject) -> JsonObject:
+    rewritten: JsonObject = {**predicate, "caseSensitive": True}
+    for key, value in predicate.items():
+        if key in ("and", "or"):
+            rewritten[key] = [_binary_as_text(item) for item in cast("list[JsonObject]", value)]
+        elif key == "not":
+            rewritten[key] = _binary_as_text(cast("JsonObject", value))
+        elif key in _OPERATORS and key != "exists" and isinstance(value, Mapping) and "data" in value:
+            rewritten[key] = {**value, "data": b64decode(cast("str", value["data"])).decode("latin-1")}
+    return rewritten
+
+
+def _operator(predicate: JsonObject) -> str:
+    for feature in _UNSUPPORTED:
+        if feature in predicate:
+            msg = f"{feature} predicates aren't supported by the local engine."
+            raise UnsupportedFeature(msg)
+    operators = [key for key in predicate if key in _OPERATORS]
+    if len(operators) != 1:
+        msg = f"Each predicate must define exactly one operator: {predicate}"
+        raise UnsupportedFeature(msg)
+    return operators[0]
+
+
+def _selector(predicate: JsonObject, comparison: _Comparison) -> Callable[[str], JsonValue] | None:
+    if "xpath" in predicate:
+        return _XPath(cast("JsonObject", predicate["xpath"]), case_sensitive=comparison.case_sensitive).select
+    if "jsonpath" in predicate:
+        selector = cast("str", cast("JsonObject", predicate["jsonpath"])["selector"])
+        return _JsonPath(selector, keys_case_sensitive=comparison.keys_case_sensitive).select
+    return None
+
+
+class _XPath:
+    """An xpath selector. As in Mountebank, unless matching is case sensitive, the selector and document are both
+    lowercased before selection."""
+
+    __slots__ = ("attribute", "case_sensitive", "namespaces", "path")
+
+    def __init__(self, selector: JsonObject, *, case_sensitive: bool) -> None:
+        path = cast("str", selector["selector"])
+        namespaces = cast("Mapping[str, str]", selector.get("ns") or {})
+        if not case_sensitive:
+            path = path.lower()
+            namespaces = {prefix.lower(): uri.lower() for prefix, uri in namespaces.items()}
+        value = _XPATH_VALUE.search(path)
+        self.attribute = value.group(1) if value else None
+        path = path[: value.start()] if value else path
+        # Paths are evaluated against a wrapper around the document's root element.
+        self.path = f".{path}" if path.startswith("/") else f"./{path}"
+        self.namespaces = dict(namespaces)
+        self.case_sensitive = case_sensitive
+        try:
+            ET.Element("document").findall(self.path, self.namespaces)
+        except (SyntaxError, KeyError) as e:
+            msg = f"The xpath selector {selector['selector']} isn't supported by the local engine."
+            raise UnsupportedFeature(msg) from e
+
+    def select(self, text: str) -> JsonValue:
+        document = _parse_xml(text if self.case_sensitive else text.lower())
+        if document is None:
+            return None
+        return _selected([self._value(node) for node in document.iterfind(self.path, self.namespaces)])
+
+    def _value(self, node: ET.Element) -> JsonValue:
+        if self.attribute is not None:
+            return node.get(self.attribute)
+        return node.text or ""
+
+
+class _JsonPath:
+    """A jsonpath selector, such as ``$.items[0].id`` or ``$..id``, compiled to a list of steps."""
+
+    __slots__ = ("steps",)
+
+    def __init__(self, selector: str, *, keys_case_sensitive: bool) -> None:
+        if not selector.startswith("$"):
+            msg = f"The jsonpath selector {selector} isn't supported by the local engine."
+            raise UnsupportedFeature(msg)
+        self.steps = []
+        position = 1
+        while position < len(selector):
+            step = _JSONPATH_STEP.match(selector, position)
+            if step is None or not (step["dots"] or step["bracket"]):
+                msg = f"The jsonpath selector {selector} isn't supported by the local engine."
+                raise UnsupportedFeature(msg)
+            self.steps.append(_JsonPathStep(step, keys_case_sensitive=keys_case_sensitive))
+            position = step.end()
+
+    def select(self, text: str) -> JsonValue:
+        document = _parse_json(text)
+        if document is _INVALID:
+            return None
+        nodes = [cast("JsonValue", document)]
+        for step in self.steps:
+            nodes = [found for node in nodes for found in step(node)]
+        return _selected(nodes)
+
+
+class _JsonPathStep:
+    __slots__ = ("descend", "index", "key", "keys_case_sensitive")
+
+    def __init__(self, step: re.Match[str], *, keys_case_sensitive: bool) -> None:
+        self.descend = step["dots"] == ".."
+        self.key = step["name"] or step["quoted"] or step["double_quoted"]
+        self.index = int(step["index"]) if step["index"] else None
+        self.keys_case_sensitive = keys_case_sensitive
+
+    def __call__(self, node: JsonValue) -> list[JsonValue]:
+        nodes = _descendants(node) if self.descend else [node]
+        return [found for candidate in nodes for found in self._children(candidate)]
+
+    def _children(self, node: JsonValue) -> list[JsonValue]:
+        if isinstance(node, list):
+            if self.index is not None:
+                return [node[self.index]] if -len(node) <= self.index < len(node) else []
+            return node if self.key is None else []
+        if isinstance(node, Mapping) and self.index is None:
+            if self.key is None:
+                return list(node.values())
+            return [value for name, value in node.items() if self._same_key(name)]
+        return []
+
+    def _same_key(self, name: str) -> bool:
+        key = cast("str", self.key)
+        return name == key if self.keys_case_sensitive else name.lower() == key.lower()
+
+
+def _descendants(node: JsonValue) -> list[JsonValue]:
+    """A node and, depth first, all the values within it."""
+    found = [node]
+    children = node.values() if isinstance(node, Mapping) else node if isinstance(node, list) else ()
+    for child in children:
+        found.extend(_descendants(child))
+    return found
+
+
+def _selected(values: list[JsonValue]) -> JsonValue:
+    """Selected values as Mountebank compares them: missing if there are none, a single value, or an array."""
+    if not values:
+        return None
+    return values[0] if len(values) == 1 else values
+
+
+@lru_cache(maxsize=32)
+def _parse_xml(text: str) -> ET.Element | None:
+    """Parse an XML document, wrapped so that absolute paths can select its root element. Each request's body is
+    typically selected from by many predicates, so recent documents are cached - they mustn't be modified."""
+    try:
+        root = ET.fromstring(text)  # noqa: S314 - Parsing requests sent to a test double.
+    except ET.ParseError:
+        return None
+    document = ET.Element("document")
+    document.append(root)
+    return document
+
+
+@lru_cache(maxsize=32)
+def _parse_json(text: str) -> JsonValue | object:
+    """Parse a JSON document, or :data:`_INVALID`. Recent documents are cached, as for :func:`_parse_xml`."""
+    try:
+        return cast("JsonValue", loads(text))
+    except ValueError:
+        return _INVALID
+
+
+_INVALID = object()
+_XPATH_VALUE = re.compile(r"/(?:text\(\)|@([\w:.-]+))$")
+_JSONPATH_STEP = re.compile(
+    r"""(?P<dots>\.\.?)?(?:\*|(?P<name>[\w$-]+)"""
+    r"""|(?P<bracket>\[\s*(?:\*|(?P<index>-?\d+)|'(?P<quoted>[^']*)'|"(?P<double_quoted>[^"]*)")\s*\]))"""
+)
+
+
+def _compile_patterns(value: Any, flags: int) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _compile_patterns(item, flags) for key, item in value.items()}
+    return re.compile(str(value), flags)
+
+
+class _Comparison:
+    __slots__ = ("case_sensitive", "keys_case_sensitive", "operator", "text_test")
+
+    def __init__(self, operator: str, *, case_sensitive: bool, keys_case_sensitive: bool) -> None:
+        self.operator = operator
+        self.case_sensitive = case_sensitive
+        self.keys_case_sensitive = keys_case_sensitive
+        self.text_test = _TEXT_TESTS.get(operator)
+
+    def prepared(self, expected: Any) -> str | None:
+        """An expected scalar's text, ready for :meth:`compare_text`, or `None` if it's not compared as text."""
+        if self.text_test is None or isinstance(expected, Mapping | list):
+            return None
+        return self._case(_text(expected))
+
+    def compare_text(self, prepared: str, actual: str) -> bool:
+        """Compare actual text with an expectation from :meth:`prepared` - quicker than :meth:`compare`."""
+        # Only called with prepared text, so there's a text test.
+        text_test = cast("Callable[[str, str], bool]", self.text_test)
+        return text_test(prepared, self._case(actual))
+
+    def compare(self, expected: Any, actual: JsonValue) -> bool:
+        if isinstance(expected, Mapping):
+            return self._compare_object(expected, actual)
+        if self.operator == "exists":
+            return (actual is not None and actual not in ("", [], {})) == bool(expected)
+        if isinstance(expected, list):
+            return self._compare_array(expected, actual)
+        if isinstance(actual, list):
+            return self.operator != "deepEquals" and any(self.compare(expected, item) for item in actual)
+        return self._compare_scalar(expected, actual)
+
+    def _compare_array(self, expected: list[Any], actual: JsonValue) -> bool:
+        actual = _structured(actual)
+        if not isinstance(actual, list) or (self.operator == "deepEquals" and len(actual) != len(expected)):
+            return False
+        return all(any(self.compare(item, candidate) for candidate in actual) for item in expected)
+
+    def _compare_scalar(self, expected: Any, actual: JsonValue) -> bool:
+        if isinstance(actual, Mapping):
+            return False
+        if self.text_test is None:  # matches
+            return cast("re.Pattern[str]", expected).search(_text(actual)) is not None
+        return self.text_test(self._case(_text(expected)), self._case(_text(actual)))
+
+    def _compare_object(self, expected: Mapping[str, Any], actual: JsonValue) -> bool:
+        actual = _structured(actual)
+        if not isinstance(actual, Mapping):
+            # Nothing exists in a missing object.
+            return self.operator == "exists" and not any(expected.values())
+        if self.operator == "deepEquals" and len(actual) != len(expected):
+            return False
+        return all(self.compare(value, self._lookup(actual, key)) for key, value in expected.items())
+
+    def _lookup(self, actual: Mapping[str, JsonValue], key: str) -> JsonValue:
+        if key in actual or self.keys_case_sensitive:
+            return actual.get(key)
+        lowered = key.lower()
+        return next((value for name, value in actual.items() if name.lower() == lowered), None)
+
+    def _case(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+
+def _text(value: JsonValue) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value if isinstance(value, str) else str(value)
+
+
+def _structured(value: JsonValue) -> JsonValue:
+    """Parse a string which holds JSON, for comparison with a structured expectation."""
+    if isinstance(value, str):
+        parsed = _parse_json(value)
+        return None if parsed is _INVALID else cast("JsonValue", parsed)
+    return value
+
+
+_TEXT_TESTS: Mapping[str, Callable[[str, str], bool]] = {
+    "equals": str.__eq__,
+    "deepEquals": str.__eq__,
+    "contains": lambda expected, actual: expected in actual,
+    "startsWith": lambda expected, actual: actual.startswith(expected),
+    "endsWith": lambda expected, actual: actual.endswith(expected),
+}
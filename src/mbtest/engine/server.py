@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from threading import Thread
+from typing import TYPE_CHECKING, TypeVar
+
+from mbtest.engine import http
+from mbtest.engine.admin import AdminApi
+from mbtest.server import MountebankServer
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Coroutine
+
+    from _pytest.fixtures import FixtureRequest
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+def local_mock_server(request: FixtureRequest, port: int = 0, host: str = "127.0.0.1") -> LocalMountebankServer:
+    """`Pytest fixture <https://docs.pytest.org/en/latest/fixture.html>`_, making available a local mock server - a
+    drop-in replacement for :func:`mbtest.server.mock_server` which doesn't need Mountebank installed.
+
+    Use in a pytest conftest.py fixture as follows::
+
+        @pytest.fixture(scope="session")
+        def mock_server(request):
+            return engine.local_mock_server(request)
+
+    :param request: Request for a fixture from a test or fixture function.
+    :param port: Admin API port. By default, any free port is used.
+    :param host: Host address to listen on.
+    :returns: Mock server.
+    """
+    server = LocalMountebankServer(port=port, host=host)
+    request.addfinalizer(server.close)
+    return server
+
+
+class LocalMountebankServer(MountebankServer):
+    """An in-process replacement for a Mountebank server, serving HTTP, SMTP and TCP imposters from a background thread
+    with `asyncio <https://docs.python.org/3/library/asyncio.html>`_ (using
+    `uvloop <https://pypi.org/project/uvloop/>`_ if it's installed - ``pip install mbtest[engine]``).
+
+    It starts in milliseconds, and needs no Node.js or Mountebank install. Imposters, stubs, predicates and responses
+    are defined in the usual way, and requests are recorded, so :func:`mbtest.matchers.had_request` works as usual::
+
+        def test_an_imposter():
+            mb = LocalMountebankServer()
+            imposter = Imposter(Stub(Predicate(path='/test'), Response(body='sausages')))
+
+            with mb(imposter):
+                r = httpx.get(f"{imposter.url}/test")
+
+                assert_that(r, is_response().with_status_code(200).and_body("sausages"))
+                assert_that(imposter, had_request().with_path("/test").and_method("GET"))
+
+            mb.close()
+
+    Only Mountebank's core features are implemented - predicates without ``inject`` or ``except`` (and with the
+    ``xpath`` and ``jsonpath`` selectors described in :func:`mbtest.engine.matching.compile_predicates`), ``is`` and
+    fault responses, and the ``wait`` and ``repeat`` behaviors. Imposters using anything else are rejected with a
+    ``400 Bad Request`` when they are added, as Mountebank rejects invalid imposters.
+
+    TCP imposters may be text or binary mode, and can frame requests with a
+    :class:`~mbtest.imposters.framing.DelimitedFraming` or :class:`~mbtest.imposters.framing.LengthPrefixedFraming`
+    end of request resolver - see :mod:`mbtest.imposters.framing`.
+
+    SMTP imposters accept any email. Each is decoded once, as it's received, into a
+    :class:`~mbtest.store.MailStore` indexed by recipient and subject, which :func:`mbtest.matchers.email_sent`
+    queries in-process rather than fetching and decoding every recorded email.
+
+    The server must be closed when it's finished with. Consider using the :func:`local_mock_server` pytest fixture,
+    which will take care of this for you.
+
+    :param port: Admin API port. By default, any free port is used.
+    :param host: Host address to listen on, for the admin API and for imposters.
+    :param imposters_path: Imposters path, if not `imposters`.
+    :param debug: Record the requests each stub matches, as Mountebank does in debug mode - see
+        :meth:`mbtest.imposters.Imposter.query_stub_hits`.
+    """
+
+    def __init__(
+        self, port: int = 0, host: str = "127.0.0.1", imposters_path: str = "imposters", *, debug: bool = True
+    ) -> None:
+        super().__init__(port, host=host, imposters_path=imposters_path)
+        self.admin = AdminApi(host, debug=debug)
+        self._loop = _new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name="mbtest-engine", daemon=True)
+        self._thread.start()
+        self._admin_server = self._run(http.serve(self.admin.handle, host, port))
+        self.server_port = self._admin_server.sockets[0].getsockname()[1]
+        self.admin.url = str(self.server_url)
+        logger.info("Local engine listening on port %s.", self.server_port)
+
+    def close(self) -> None:
+        """Remove all imposters, and stop the server."""
+        if not self._loop.is_running():
+            return
+        self._run(self.admin.close())
+        self._admin_server.close()
+        self._run(_cancel_connections())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        logger.info("Local engine on port %s closed.", self.server_port)
+
+    def _run(self, coroutine: Coroutine[object, object, _T]) -> _T:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+
+async def _cancel_connections() -> None:
+    """Stop serving connections clients have left open, so that they're closed before the loop is."""
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _new_event_loop() -> asyncio.AbstractEventLoop:
+    try:
+        import uvloop  # type: ignore[import-not-found]  # noqa: PLC0415 - optional, from the engine extra.
+    except ImportError:
+        return asyncio.new_event_loop()
+    return uvloop.new_event_loop()  # pragma: no cover
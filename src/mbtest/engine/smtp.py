@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import email
+from email.header import decode_header, make_header
+from email.utils import getaddresses
+from functools import partial
+from typing import TYPE_CHECKING, cast
+
+from mbtest.engine.imposters import timestamp
+from mbtest.imposters.imposters import SentEmail
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Awaitable, Callable, Mapping
+    from email.message import Message
+
+    from mbtest.engine.imposters import LocalImposter
+    from mbtest.imposters.base import JsonObject, JsonValue
+
+# Messages are read whole, so allow for large ones.
+_MESSAGE_LIMIT = 1 << 25
+
+
+async def serve(imposter: LocalImposter, host: str, port: int) -> asyncio.Server:
+    """Serve a local SMTP imposter - a sink, accepting any email, and recording it if the imposter records requests.
+
+    Recorded email is decoded once, as it's received, into the imposter's mail store as well as its requests - see
+    :class:`mbtest.store.MailStore`.
+
+    :param imposter: Imposter to serve.
+    :param host: Host address to listen on.
+    :param port: Port to listen on, or 0 for any free port.
+    :returns: The running server.
+    """
+    return await asyncio.start_server(partial(_serve_connection, imposter), host, port, limit=_MESSAGE_LIMIT)
+
+
+class _Session:
+    __slots__ = ("client", "envelope_from", "envelope_to", "imposter", "reader", "writer")
+
+    def __init__(self, imposter: LocalImposter, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.imposter = imposter
+        self.reader = reader
+        self.writer = writer
+        self.client = cast("tuple[str, int]", writer.get_extra_info("peername"))[:2]
+        self.envelope_from = ""
+        self.envelope_to: list[str] = []
+
+    async def hello(self, _: str) -> bool:
+        self.writer.write(b"250 mbtest\r\n")
+        return True
+
+    async def extended_hello(self, _: str) -> bool:
+        self.writer.write(b"250-mbtest\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+        return True
+
+    async def mail(self, argument: str) -> bool:
+        self.envelope_from = _path(argument)
+        self.envelope_to = []
+        self.writer.write(b"250 OK\r\n")
+        return True
+
+    async def recipient(self, argument: str) -> bool:
+        self.envelope_to.append(_path(argument))
+        self.writer.write(b"250 OK\r\n")
+        return True
+
+    async def data(self, _: str) -> bool:
+        self.writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+        message = await _read_message(self.reader)
+        self.imposter.number_of_requests += 1
+        if self.imposter.record_requests:
+            self._record(message)
+        self.envelope_to = []
+        self.writer.write(b"250 OK: message queued\r\n")
+        return True
+
+    async def reset(self, _: str) -> bool:
+        self.envelope_from = ""
+        self.envelope_to = []
+        self.writer.write(b"250 OK\r\n")
+        return True
+
+    async def noop(self, _: str) -> bool:
+        self.writer.write(b"250 OK\r\n")
+        return True
+
+    async def quit(self, _: str) -> bool:
+        self.writer.write(b"221 Bye\r\n")
+        return False
+
+    def _record(self, message: bytes) -> None:
+        structure = email_structure(message, self.envelope_from, self.envelope_to, self.client)
+        self.imposter.requests.append(structure)
+        if self.imposter.mail_store is not None:
+            self.imposter.mail_store.add(SentEmail.from_json(structure))
+
+
+_COMMANDS: Mapping[str, Callable[[_Session, str], Awaitable[bool]]] = {
+    "HELO": _Session.hello,
+    "EHLO": _Session.extended_hello,
+    "MAIL": _Session.mail,
+    "RCPT": _Session.recipient,
+    "DATA": _Session.data,
+    "RSET": _Session.reset,
+    "NOOP": _Session.noop,
+    "QUIT": _Session.quit,
+}
+
+
+async def _serve_connection(
+    imposter: LocalImposter, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    session = _Session(imposter, reader, writer)
+    writer.write(b"220 mbtest ESMTP\r\n")
+    try:
+        while line := await reader.readline():
+            verb, _, argument = line.decode("utf-8", errors="replace").strip().partition(" ")
+            command = _COMMANDS.get(verb.upper())
+            if command is None:
+                writer.write(b"502 Command not implemented\r\n")
+            elif not await command(session, argument):
+                break
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.CancelledError):
+        # Connections still open are cancelled when the engine is closed.
+        return
+    finally:
+        writer.close()
+
+
+async def _read_message(reader: asyncio.StreamReader) -> bytes:
+    """Read a message, up to the line holding just a full stop which ends it, undoing dot-stuffing."""
+    message = b""
+    while True:
+        message += await reader.readuntil(b".\r\n")
+        if message == b".\r\n" or message.endswith(b"\r\n.\r\n"):
+            break
+    return message[:-3].replace(b"\r\n..", b"\r\n.").removeprefix(b".")
+
+
+def _path(argument: str) -> str:
+    """The address from a MAIL FROM or RCPT TO argument, such as ``FROM:<someone@example.com> SIZE=1024``."""
+    return argument.partition(":")[2].strip().partition(" ")[0].strip("<>")
+
+
+def email_structure(message: bytes, envelope_from: str, envelope_to: list[str], client: tuple[str, int]) -> JsonObject:
+    """Convert an email to a structure, as Mountebank records it.
+
+    Recipients in the envelope, but not in the To or Cc headers, are taken to be Bcc recipients.
+    """
+    parsed = email.message_from_bytes(message)
+    to, cc = _addresses(parsed, "To"), _addresses(parsed, "Cc")
+    named = {cast("str", address["address"]).lower() for address in (*to, *cc)}
+    bcc: list[JsonObject] = _addresses(parsed, "Bcc") or [
+        {"address": address, "name": ""} for address in envelope_to if address.lower() not in named
+    ]
+    return {
+        "requestFrom": f"{client[0]}:{client[1]}",
+        "envelopeFrom": envelope_from,
+        "envelopeTo": cast("list[JsonValue]", envelope_to),
+        "from": next(iter(_addresses(parsed, "From")), {"address": "", "name": ""}),
+        "to": cast("list[JsonValue]", to),
+        "cc": cast("list[JsonValue]", cc),
+        "bcc": cast("list[JsonValue]", bcc),
+        "subject": _decoded_header(parsed, "Subject"),
+        "text": _text(parsed),
+        "ip": client[0],
+        "timestamp": timestamp(),
+    }
+
+
+def _addresses(message: Message, header: str) -> list[JsonObject]:
+    if header not in message:
+        return []
+    addresses = getaddresses([_decoded_header(message, header)])
+    return [{"address": address, "name": name} for name, address in addresses if address]
+
+
+def _decoded_header(message: Message, header: str) -> str:
+    value = message.get(header)
+    return str(make_header(decode_header(value))) if value is not None else ""
+
+
+def _text(message: Message) -> str:
+    part = next((part for part in message.walk() if part.get_content_type() == "text/plain"), None)
+    if part is None:
+        return ""
+    payload = cast("bytes", part.get_payload(decode=True))
+    text = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+    return text.replace("\r\n", "\n").removesuffix("\n")
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from base64 import b64decode, b64encode
+from functools import partial
+from typing import TYPE_CHECKING, cast
+
+from mbtest.engine import http
+from mbtest.engine.imposters import behaviors, timestamp
+from mbtest.engine.matching import UnsupportedFeature
+from mbtest.imposters.framing import Framing, InjectedFraming
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mbtest.engine.imposters import LocalImposter
+    from mbtest.imposters.base import JsonObject
+
+_READ_SIZE = 1 << 16
+
+
+async def serve(imposter: LocalImposter, host: str, port: int) -> asyncio.Server:
+    """Serve a local TCP imposter.
+
+    Without an end of request resolver, each packet received is a request, as Mountebank treats it. With one declared
+    by a :class:`~mbtest.imposters.framing.Framing`, data is split into requests natively, so that requests split
+    across packets, or sent several to a packet, are each answered once.
+
+    :param imposter: Imposter to serve.
+    :param host: Host address to listen on.
+    :param port: Port to listen on, or 0 for any free port.
+    :returns: The running server.
+    :raises UnsupportedFeature: If the imposter's end of request resolver isn't declared by a framing.
+    """
+    return await asyncio.start_server(partial(_serve_connection, imposter, _framing(imposter)), host, port)
+
+
+def _framing(imposter: LocalImposter) -> Framing | None:
+    resolver = cast("JsonObject | None", imposter.definition.get("endOfRequestResolver"))
+    if resolver is None:
+        return None
+    framing = Framing.from_structure(resolver)
+    if isinstance(framing, InjectedFraming):
+        msg = "End of request resolvers not declared by a framing aren't supported by the local engine."
+        raise UnsupportedFeature(msg)
+    return framing
+
+
+async def _serve_connection(
+    imposter: LocalImposter, framing: Framing | None, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    client = cast("tuple[str, int]", writer.get_extra_info("peername"))[:2]
+    pending = b""
+    try:
+        while data := await reader.read(_READ_SIZE):
+            requests, pending = framing.split(pending + data) if framing else ([data], b"")
+            for request in requests:
+                if not await _respond(imposter, writer, client, request):
+                    return
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        # Connections still open are cancelled when the engine is closed.
+        return
+    finally:
+        writer.close()
+
+
+async def _respond(imposter: LocalImposter, writer: asyncio.StreamWriter, client: tuple[str, int], data: bytes) -> bool:
+    """Respond to a request, returning whether to keep the connection open for another."""
+    matched: JsonObject | None = {"data": data.decode("latin-1")} if imposter.binary else None
+    response = imposter.respond(request_structure(data, client, binary=imposter.binary), matched)
+    if wait := behaviors(response).get("wait"):
+        await asyncio.sleep(cast("int", wait) / 1000)
+    if "fault" in response:
+        http.fault(writer, cast("str", response["fault"]))
+        return False
+    writer.write(render(cast("JsonObject", response["is"]), imposter.default_response, binary=imposter.binary))
+    return True
+
+
+def request_structure(data: bytes, client: tuple[str, int], *, binary: bool) -> JsonObject:
+    """Convert a TCP request to a structure, as Mountebank records it. Binary data is base64 encoded."""
+    return {
+        "requestFrom": f"{client[0]}:{client[1]}",
+        "data": b64encode(data).decode("ascii") if binary else data.decode("utf-8", errors="replace"),
+        "ip": client[0],
+        "timestamp": timestamp(),
+    }
+
+
+def render(fields: JsonObject, default_response: JsonObject, *, binary: bool) -> bytes:
+    """Render an ``is`` response structure's data - taken from the imposter's default response, if it has none."""
+    data = cast("str", {**default_response, **fields}.get("data", ""))
+    return b64decode(data) if binary else data.encode("utf-8")
@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import re
+from copy import deepcopy
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, TypeAlias, cast
+
+from mbtest.engine.matching import compile_predicates
+from mbtest.imposters.base import shared_structure
+from mbtest.imposters.behaviors import Key, Lookup, UsingRegex
+from mbtest.imposters.responses import HttpResponse
+from mbtest.imposters.stubs import LazyStubs, Stub
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Iterator, Mapping, Sequence
+
+    from mbtest.imposters.base import JsonObject, JsonValue
+    from mbtest.imposters.imposters import Imposter
+
+# Token the rows looked up are inserted into responses as.
+_INTO = "${row}"
+_KEY_COLUMN = "key"
+# Characters with special meanings in both Python and JavaScript regular expressions.
+_SPECIAL = re.compile(r"[\\^$.|?*+()[\]{}]")
+_DEFAULT_REQUEST: JsonObject = {"method": "GET", "path": "/", "query": {}, "headers": {}, "body": ""}
+
+_Path: TypeAlias = tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class StubFamily:
+    """A run of stubs, found by :func:`find_stub_families`, which differ only in the value one request field must
+    equal - a path segment, say, or a query parameter - and in the text of their responses. The same requests can
+    be served the same responses by a single stub, which matches any of the values with a regular expression, and
+    looks the response text up in a CSV data source.
+
+    :param start: Position of the first stub in the run.
+    :param request_field: The field whose value differs, such as ``("path",)`` or ``("query", "id")``.
+    :param pattern: Regular expression matching exactly the values, capturing the part of them which differs - the
+        key each stub's response text is looked up by.
+    :param predicate: The predicate all the stubs share, with the field whose value differs removed, if any is left.
+    :param template: Response structure, with the text which differs replaced by tokens for the columns it's
+        looked up from.
+    :param columns: Names of the data source's columns, the first holding the keys.
+    :param rows: Data source rows, one per stub - its key, and the text for each of the other columns.
+    """
+
+    start: int
+    request_field: _Path
+    pattern: str
+    predicate: JsonObject | None
+    template: JsonObject
+    columns: tuple[str, ...]
+    rows: tuple[tuple[str, ...], ...]
+
+    @property
+    def end(self) -> int:
+        """Position after the last stub in the run."""
+        return self.start + len(self.rows)
+
+    @property
+    def datasource_name(self) -> str:
+        """A file name for the data source, unique to its content."""
+        digest = hashlib.sha256(json.dumps([self.pattern, self.rows]).encode()).hexdigest()
+        return f"stubs-{digest[:16]}.csv"
+
+    def write_datasource(self, path: str | Path) -> None:
+        """Write the data source, as CSV with a header row.
+
+        :param path: File path - which Mountebank must be able to read, at the same path.
+        """
+        with Path(path).open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            writer.writerows(self.rows)
+
+    def stub(self, datasource_path: str | Path) -> Stub:
+        """The single stub serving the family's requests.
+
+        :param datasource_path: Path to the data source - see :meth:`write_datasource`.
+        """
+        name = self.request_field[-1]
+        from_: str | JsonObject = name if len(self.request_field) == 1 else {self.request_field[0]: name}
+        lookup = Lookup(Key(from_, UsingRegex(self.pattern), index=1), datasource_path, _KEY_COLUMN, _INTO)
+        matches = {"matches": _nested(self.request_field, self.pattern), "caseSensitive": True}
+        return Stub.from_structure(
+            {
+                "predicates": [self.predicate, matches] if self.predicate else [matches],
+                "responses": [{"is": self.template, "_behaviors": {"lookup": [lookup.as_structure()]}}],
+            }
+        )
+
+
+def find_stub_families(stubs: Sequence[Stub], *, min_size: int = 10) -> list[StubFamily]:
+    """Find runs of stubs which could be replaced by a single stub with a lookup - see :class:`StubFamily`.
+
+    Data driven tests often generate hundreds of stubs differing only in, say, an item ID in the path, and the body
+    returned. Mountebank evaluates them one by one, where a single stub matching the path with a regular
+    expression finds the body in a CSV data source much more quickly.
+
+    Stubs in a family have a single case sensitive ``equals`` predicate, naming the same fields, and all but one of
+    them - the path, or a query parameter - with the same values. They have a single ``is`` response, without
+    behaviors, whose fields are the same but for text. Families are only found among consecutive stubs, so
+    replacing them doesn't change which stub serves any request.
+
+    :param stubs: Stubs, in order.
+    :param min_size: The fewest stubs worth replacing.
+    :returns: Families, in order.
+    """
+    members = [_Member.of(structure) for structure in _structures(stubs)]
+    families = []
+    start = 0
+    while start < len(members):
+        end = _run_end(members, start)
+        if end - start >= min_size:
+            families.append(_family(members, start, end))
+        start = end
+    return families
+
+
+def verify_stub_family(family: StubFamily, stubs: Sequence[Stub], datasource_path: str | Path) -> list[int]:
+    """Check that a family's single stub would serve each of its stubs' requests the same response, reading the
+    data source back from its file - a round trip through everything Mountebank is sent.
+
+    The stub's lookup is resolved as Mountebank resolves it: the key is selected from the request field with the
+    stub's regular expression, and tokens for each column of the matching row are replaced with its text throughout
+    the response.
+
+    :param family: The family.
+    :param stubs: The stubs the family was found in.
+    :param datasource_path: Path the family's data source was written to.
+    :returns: Positions of any stubs whose requests wouldn't be served the same - none, if all is well.
+    """
+    resolver = _LookupResolver(family.stub(datasource_path))
+    structures = _structures(stubs)
+    return [
+        position
+        for position in range(family.start, family.end)
+        if not resolver.serves(_Member.of(structures[position]), family.request_field)
+    ]
+
+
+def collapse_stub_families(imposter: Imposter, directory: str | Path, *, min_size: int = 10) -> list[StubFamily]:
+    """Replace each family of an imposter's stubs with a single stub, looking their response text up in a CSV data
+    source - see :func:`find_stub_families`. Every replacement is checked with :func:`verify_stub_family` before
+    any data source is written or stub replaced, so if one fails, nothing is changed.
+
+    Mountebank reads data sources when requests are served, so the directory must be readable by Mountebank at the
+    same path. The local engine doesn't support lookups.
+
+    :param imposter: Imposter, whose definition is modified.
+    :param directory: Directory to write data sources to.
+    :param min_size: The fewest stubs worth replacing.
+    :returns: The families replaced.
+    :raises ValueError: If a replacement wouldn't serve a stub's requests the same response.
+    """
+    families = find_stub_families(imposter.stubs, min_size=min_size)
+    with TemporaryDirectory() as scratch:
+        for family in families:
+            if mismatched := verify_stub_family(family, imposter.stubs, _written(family, Path(scratch))):
+                msg = f"A lookup wouldn't serve the requests stubs {mismatched} match the same responses."
+                raise ValueError(msg)
+    directory = Path(directory).resolve()
+    for family in reversed(families):
+        imposter.stubs[family.start : family.end] = [family.stub(_written(family, directory))]
+    return families
+
+
+def _written(family: StubFamily, directory: Path) -> Path:
+    """Write a family's data source to a directory, returning its path."""
+    path = directory / family.datasource_name
+    family.write_datasource(path)
+    return path
+
+
+class _LookupResolver:
+    """Resolves a family's single stub's lookup, as Mountebank would, reading its data source."""
+
+    def __init__(self, stub: Stub) -> None:
+        self.matches = compile_predicates([predicate.as_structure() for predicate in stub.predicates])
+        self.response = stub.responses[0].as_structure()
+        behaviors = cast("JsonObject", self.response["_behaviors"])
+        self.lookup = Lookup.from_structure(cast("list[JsonObject]", behaviors["lookup"])[0])
+        with Path(self.lookup.datasource_path).open(encoding="utf-8", newline="") as f:
+            self.rows = {row[self.lookup.datasource_key_column]: row for row in csv.DictReader(f)}
+
+    def serves(self, member: _Member | None, request_field: _Path) -> bool:
+        """Whether the stub serves the request a family member matches the member's response."""
+        if member is None:
+            return False
+        request = {**_DEFAULT_REQUEST, **cast("JsonObject", member.predicate["equals"])}
+        if not self.matches(request):
+            return False
+        found = re.search(self.lookup.key.using.selector, cast("str", _get(request, request_field)))
+        row = self.rows.get(found.group(self.lookup.key.index), {}) if found else {}
+        return _substitute(self.response["is"], self.lookup.into, row) == _normalised(member.response)
+
+
+@dataclass(frozen=True, slots=True)
+class _Member:
+    """A stub which could be in a family, with its predicate's fields and its response flattened."""
+
+    predicate: JsonObject
+    fields: dict[_Path, JsonValue]
+    response: JsonObject
+    response_fields: dict[_Path, JsonValue]
+
+    @classmethod
+    def of(cls, structure: JsonObject) -> _Member | None:
+        predicates = cast("list[JsonObject]", structure.get("predicates") or [])
+        responses = cast("list[JsonObject]", structure.get("responses") or [])
+        if len(predicates) != 1 or len(responses) != 1:
+            return None
+        predicate, response = predicates[0], responses[0]
+        if predicate.keys() != {"equals", "caseSensitive"} or predicate["caseSensitive"] is not True:
+            return None
+        if response.keys() - {"is", "_behaviors"} or response.get("_behaviors") or "is" not in response:
+            return None
+        response_fields = dict(_flattened(response["is"], ()))
+        if any(isinstance(value, str) and _INTO in value for value in response_fields.values()):
+            return None
+        return cls(predicate, dict(_flattened(predicate["equals"], ())), response, response_fields)
+
+    def varying_field(self, other: _Member) -> _Path | None:
+        """The only field, the path or a query parameter, whose value differs from another's, if there is one."""
+        if self.fields.keys() != other.fields.keys():
+            return None
+        differing = [name for name, value in self.fields.items() if other.fields[name] != value]
+        if len(differing) != 1 or not isinstance(self.fields[differing[0]], str):
+            return None
+        name = differing[0]
+        if not isinstance(other.fields[name], str):
+            return None
+        return name if name == ("path",) or (name[0] == "query" and len(name[1:]) == 1) else None
+
+    def joins(self, other: _Member | None, request_field: _Path, seen: set[str]) -> bool:
+        """Whether another stub can join this one's family - differing only in a new value for the same field, and
+        its response text."""
+        if other is None or self.varying_field(other) != request_field or other.fields[request_field] in seen:
+            return False
+        if self.response_fields.keys() != other.response_fields.keys():
+            return False
+        return all(
+            value == other.response_fields[name]
+            or (isinstance(value, str) and isinstance(other.response_fields[name], str))
+            for name, value in self.response_fields.items()
+        )
+
+
+def _run_end(members: Sequence[_Member | None], start: int) -> int:
+    """Position after the last stub which can join the family of the one at the start, if any."""
+    first = members[start]
+    if first is None or start + 1 == len(members) or members[start + 1] is None:
+        return start + 1
+    request_field = first.varying_field(cast("_Member", members[start + 1]))
+    if request_field is None:
+        return start + 1
+    seen = {cast("str", first.fields[request_field])}
+    end = start + 1
+    while end < len(members) and first.joins(members[end], request_field, seen):
+        seen.add(cast("str", cast("_Member", members[end]).fields[request_field]))
+        end += 1
+    return end
+
+
+def _family(members: Sequence[_Member | None], start: int, end: int) -> StubFamily:
+    run = cast("list[_Member]", members[start:end])
+    first = run[0]
+    request_field = cast("_Path", first.varying_field(run[1]))
+    values = [cast("str", member.fields[request_field]) for member in run]
+    prefix = _common_prefix(values)
+    suffix = _common_prefix([value[len(prefix) :][::-1] for value in values])[::-1]
+    keys = [value[len(prefix) : len(value) - len(suffix)] for value in values]
+    pattern = f"^{_escape(prefix)}({'|'.join(_escape(key) for key in keys)}){_escape(suffix)}$"
+    varying = [
+        name for name, value in first.response_fields.items() if any(m.response_fields[name] != value for m in run)
+    ]
+    columns = (_KEY_COLUMN, *(".".join(name) for name in varying))
+    template = deepcopy(cast("JsonObject", first.response["is"]))
+    for name, column in zip(varying, columns[1:], strict=True):
+        _set(template, name, f'{_INTO}["{column}"]')
+    shared = deepcopy(cast("JsonObject", first.predicate["equals"]))
+    _remove(shared, request_field)
+    return StubFamily(
+        start=start,
+        request_field=request_field,
+        pattern=pattern,
+        predicate={"equals": shared, "caseSensitive": True} if shared else None,
+        template=template,
+        columns=columns,
+        rows=tuple(
+            (key, *(cast("str", member.response_fields[name]) for name in varying))
+            for key, member in zip(keys, run, strict=True)
+        ),
+    )
+
+
+def _flattened(value: JsonValue, name: _Path) -> Iterator[tuple[_Path, JsonValue]]:
+    """Members of an object, and of any objects it holds, with the names leading to them."""
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            yield from _flattened(item, (*name, key))
+    else:
+        yield name, value
+
+
+def _nested(name: _Path, value: JsonValue) -> JsonObject:
+    for key in reversed(name[1:]):
+        value = {key: value}
+    return {name[0]: value}
+
+
+def _get(structure: JsonObject, name: _Path) -> JsonValue:
+    value: JsonValue = structure
+    for key in name:
+        value = cast("JsonObject", value).get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _set(structure: JsonObject, name: _Path, value: JsonValue) -> None:
+    for key in name[:-1]:
+        structure = cast("JsonObject", structure[key])
+    structure[name[-1]] = value
+
+
+def _remove(structure: JsonObject, name: _Path) -> None:
+    """Remove a member of an object, and any objects holding it left empty."""
+    key, rest = name[0], name[1:]
+    if rest:
+        _remove(cast("JsonObject", structure[key]), rest)
+    if not rest or not structure[key]:
+        del structure[key]
+
+
+def _substitute(value: JsonValue, into: str, row: Mapping[str, str]) -> JsonValue:
+    """Replace tokens for a row's columns with their text, throughout a response structure, as Mountebank does."""
+    if isinstance(value, dict):
+        return {key: _substitute(item, into, row) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_substitute(item, into, row) for item in value]
+    return _replace_tokens(value, into, row) if isinstance(value, str) else value
+
+
+def _replace_tokens(text: str, into: str, row: Mapping[str, str]) -> str:
+    for column, value in row.items():
+        for token in (f'{into}["{column}"]', f"{into}['{column}']", f"{into}[{column}]"):
+            text = text.replace(token, value)
+    return text
+
+
+def _normalised(response: JsonObject) -> JsonObject:
+    """A response's ``is`` structure, as the objects it decodes to encode it."""
+    return HttpResponse.from_structure(cast("JsonObject", response["is"])).as_structure()
+
+
+def _common_prefix(values: Sequence[str]) -> str:
+    end = next((i for i, chars in enumerate(zip(*values, strict=False)) if len(set(chars)) > 1), min(map(len, values)))
+    return values[0][:end]
+
+
+def _escape(text: str) -> str:
+    return _SPECIAL.sub(lambda match: f"\\{match.group()}", text)
+
+
+def _structures(stubs: Sequence[Stub]) -> list[JsonObject]:
+    return stubs.item_structures() if isinstance(stubs, LazyStubs) else [shared_structure(stub) for stub in stubs]
@@ -1,4 +1,5 @@
 from .behaviors import Copy, Key, Lookup, UsingJsonpath, UsingRegex, UsingXpath
+from .framing import DelimitedFraming, InjectedFraming, LengthPrefixedFraming
 from .imposters import Imposter, smtp_imposter
 from .predicates import InjectionPredicate, Predicate, TcpPredicate
 from .responses import InjectionResponse, Proxy, Response, TcpResponse
@@ -6,10 +7,13 @@ from .stubs import Stub
 
 __all__ = [
     "Copy",
+    "DelimitedFraming",
     "Imposter",
+    "InjectedFraming",
     "InjectionPredicate",
     "InjectionResponse",
     "Key",
+    "LengthPrefixedFraming",
     "Lookup",
     "Predicate",
     "Proxy",
@@ -1,22 +1,64 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from collections.abc import Iterable, MutableMapping, MutableSequence, Sequence
-from dataclasses import dataclass
-from typing import Any, TypeAlias, TypeVar, cast
+from collections.abc import Callable, Iterable, Iterator, MutableMapping, MutableSequence, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import deepcopy
+from dataclasses import dataclass, fields
+from functools import wraps
+from operator import is_
+from typing import Any, ClassVar, SupportsIndex, TypeAlias, TypeVar, cast, overload
+from xml.etree import ElementTree as ET  # nosec - Only used to copy elements.
 
 _T = TypeVar("_T")
+_S = TypeVar("_S", bound="JsonSerializable")
+_L = TypeVar("_L", bound="TrackedList[Any]")
 
 JsonObject: TypeAlias = MutableMapping[str, "JsonValue"]
 JsonValue: TypeAlias = str | int | float | bool | None | MutableSequence["JsonValue"] | JsonObject
 
+# Bumped on every change to any model object, so that when nothing at all has changed, cached structures can be
+# reused without checking their dependencies.
+_generation = [0]
+
+# Whether structures are being built for streaming - see streaming_structures().
+_streaming: ContextVar[bool] = ContextVar("_streaming", default=False)
+
+# Whether cached structures are returned as they are, rather than copied - see shared_structure().
+_sharing: ContextVar[bool] = ContextVar("_sharing", default=False)
+
+# Ids of the immutable, shared default instances - see shared_default(). These are never freed, so ids can't be reused.
+_shared_defaults: set[int] = set()
+
 
 @dataclass
 class JsonSerializable(ABC):
     """Object capable of being converted to a JSON serializable structure (using :py:meth:`as_structure`)
     or from such a structure ((using :py:meth:`from_structure`).
+
+    Implementations of :py:meth:`as_structure` decorated with :func:`cached_structure` are memoised. Assigning to any
+    attribute invalidates the object's cached structure, so subclasses which hold other JSON serializable objects must
+    name the attributes holding them (directly, or in lists) in `_structure_dependencies`, so that changes to those
+    are noticed too.
+
+    Subclasses are slotted, to keep large imposters compact in memory.
     """
 
+    __slots__ = ("_structure_cache",)
+
+    _structure_dependencies: ClassVar[tuple[str, ...]] = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if id(self) in _shared_defaults:
+            msg = f"Shared default {type(self).__name__} can't be modified - replace it with a new instance."
+            raise AttributeError(msg)
+        if type(value) is list and name in self._structure_dependencies:
+            value = TrackedList(value)
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "_structure_cache", None)
+        _generation[0] += 1
+
     @abstractmethod
     def as_structure(self) -> JsonObject:  # pragma: no cover
         """Convert to a JSON serializable structure.
@@ -56,10 +98,300 @@ class JsonSerializable(ABC):
         """Narrow a JsonValue value to a JsonObject (dict[str, JsonValue])."""
         return cast("JsonObject", value)
 
+    def clone(self: _S, **overrides: Any) -> _S:
+        """Copy this object, for deriving variations without changing the original.
 
-@dataclass
+        JSON serializable objects held by this one are cloned too, and mutable values, such as header dicts, are
+        copied, but other values are shared. Cached structures are shared as well, so serialising an unchanged clone is
+        cheap.
+
+        :param overrides: Attributes to set on the clone.
+        :returns: The clone.
+        """
+        if id(self) in _shared_defaults and not overrides:
+            return self
+        clone = object.__new__(type(self))
+        for name in _plain_field_names(type(self)):
+            object.__setattr__(clone, name, _copied(getattr(self, name)))
+        for name in self._structure_dependencies:
+            object.__setattr__(clone, name, _clone(getattr(self, name)))
+        object.__setattr__(clone, "_structure_cache", getattr(self, "_structure_cache", None))
+        for name, value in overrides.items():
+            setattr(clone, name, value)
+        return clone
+
+    def streams_body(self) -> bool:
+        """Whether this object's own structure holds a streaming body - see :func:`streaming_structures`."""
+        return False
+
+    def __copy__(self: _S) -> _S:
+        # Defined, like __deepcopy__, so that copies are made attribute by attribute, even where objects are pickled as
+        # their structures.
+        copy = object.__new__(type(self))
+        for name, value in _attributes(self).items():
+            object.__setattr__(copy, name, value)
+        return copy
+
+    def __deepcopy__(self: _S, memo: dict[int, Any]) -> _S:
+        copy = object.__new__(type(self))
+        memo[id(self)] = copy
+        for name, value in _attributes(self).items():
+            # Cached structures are read-only, so can be shared.
+            object.__setattr__(copy, name, value if name == "_structure_cache" else deepcopy(value, memo))
+        return copy
+
+    def _dependency_structures(self) -> list[JsonObject]:
+        structures: list[JsonObject] = []
+        for name in self._structure_dependencies:
+            value = getattr(self, name)
+            if isinstance(value, JsonSerializable):
+                structures.append(value.as_structure())
+            elif hasattr(value, "item_structures"):
+                structures += value.item_structures()
+            elif value is not None:
+                structures += [item.as_structure() for item in iter_shared(value)]
+        return structures
+
+
+_field_names: dict[type, tuple[str, ...]] = {}
+# Mutable values held by model objects, which are copied when they're cloned.
+_MUTABLE = (dict, list, bytearray, ET.Element)
+
+
+def _plain_field_names(cls: type[JsonSerializable]) -> tuple[str, ...]:
+    """Names of a class's fields, other than its structure dependencies."""
+    if (names := _field_names.get(cls)) is None:
+        names = _field_names[cls] = tuple(f.name for f in fields(cls) if f.name not in cls._structure_dependencies)
+    return names
+
+
+def _attributes(value: JsonSerializable) -> dict[str, Any]:
+    attributes = {f.name: getattr(value, f.name) for f in fields(value)}
+    attributes.update(getattr(value, "__dict__", {}))
+    attributes["_structure_cache"] = getattr(value, "_structure_cache", None)
+    return attributes
+
+
+def _copied(value: _T) -> _T:
+    return deepcopy(value) if isinstance(value, _MUTABLE) else value
+
+
+def _unshared(value: _S) -> _S:
+    """A modifiable copy of a shared default, and of any shared defaults it holds."""
+    cls = type(value)
+    copy = object.__new__(cls)
+    for name in _plain_field_names(cls):
+        object.__setattr__(copy, name, getattr(value, name))
+    for name in cls._structure_dependencies:
+        dependency = getattr(value, name)
+        object.__setattr__(copy, name, _unshared(dependency) if id(dependency) in _shared_defaults else dependency)
+    object.__setattr__(copy, "_structure_cache", getattr(value, "_structure_cache", None))
+    return copy
+
+
+def _clone(value: Any) -> Any:
+    if isinstance(value, list):
+        return TrackedList([item.clone() for item in value])
+    return value.clone() if value is not None else None
+
+
+def cached_structure(as_structure: Callable[[_S], JsonObject]) -> Callable[[_S], JsonObject]:
+    """Memoise an implementation of :py:meth:`JsonSerializable.as_structure`.
+
+    The cached structure is reused until an attribute of the object is assigned to, or until the structure of any of
+    its dependencies changes - including dependencies being added to, removed from, or replaced in a list. This makes
+    repeated serialisation of large, unchanged imposters cheap.
+
+    Changes made in place to other mutable values, such as a header dict or an XML element body, are *not* noticed -
+    assign a new value instead. Callers get a copy of the cached structure, which they may modify - or, through
+    :func:`shared_structure`, the cached structure itself, which they may only read.
+    """
+
+    @wraps(as_structure)
+    def wrapper(self: _S) -> JsonObject:
+        if _sharing.get():
+            return cached(self)
+        return cast("JsonObject", _copied_structure(shared_structure(self)))
+
+    def cached(self: _S) -> JsonObject:
+        # Structures built for streaming (see streaming_structures()) are cached apart from plain ones.
+        stamp = _generation[0] << 1 | _streaming.get()
+        cache = cast("tuple[int, list[JsonObject], JsonObject] | None", getattr(self, "_structure_cache", None))
+        if cache is not None and cache[0] == stamp:
+            return cache[2]
+        dependencies = self._dependency_structures()
+        structure = (
+            cache[2] if cache is not None and _reusable(self, cache, stamp, dependencies) else as_structure(self)
+        )
+        object.__setattr__(self, "_structure_cache", (stamp, dependencies, structure))
+        return structure
+
+    return wrapper
+
+
+def shared_structure(value: JsonSerializable) -> JsonObject:
+    """An object's structure, shared with its cache (see :func:`cached_structure`) and with the structures of
+    objects holding it, rather than copied - quicker, for reading only, as when encoding it.
+
+    :param value: Object.
+    :returns: Read-only structure.
+    """
+    token = _sharing.set(True)
+    try:
+        return value.as_structure()
+    finally:
+        _sharing.reset(token)
+
+
+def _copied_structure(value: JsonValue) -> JsonValue:
+    if isinstance(value, dict):
+        return {key: _copied_structure(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copied_structure(item) for item in value]
+    return value
+
+
+def _reusable(
+    value: JsonSerializable, cache: tuple[int, list[JsonObject], JsonObject], stamp: int, dependencies: list[JsonObject]
+) -> bool:
+    """Whether a cached structure is still valid - its dependencies' structures being unchanged, and it not holding a
+    streaming body, or having been built for streaming or not as it's now needed."""
+    if (cache[0] ^ stamp) & 1 and value.streams_body():
+        return False
+    return len(cache[1]) == len(dependencies) and all(map(is_, cache[1], dependencies))
+
+
+def streaming() -> bool:
+    """Whether structures are being built for streaming - see :func:`streaming_structures`."""
+    return _streaming.get()
+
+
+@contextmanager
+def streaming_structures() -> Iterator[None]:
+    """Within this context, :meth:`JsonSerializable.as_structure` leaves the content of streaming response bodies
+    (see :class:`~mbtest.imposters.bodies.StreamingBody`) out of structures, as placeholders which
+    :func:`~mbtest.serialisation.iter_dumps` and :func:`~mbtest.serialisation.dump_file` stream the content into as
+    they encode the structure. Such structures can only be encoded by these functions.
+
+    Elsewhere, streaming bodies are read into structures whole, so that they are plain JSON.
+    """
+    token = _streaming.set(True)
+    try:
+        yield
+    finally:
+        _streaming.reset(token)
+
+
+def shared_default(instance: _S) -> _S:
+    """Register an instance as a shared default, used in place of identical new instances to save memory.
+
+    Shared defaults can't be modified, since that would change them everywhere they are used. Held in a
+    :class:`TrackedList`, though, they're copied when they're accessed, so they can be modified through the list.
+
+    :param instance: Instance to share. Any JSON serializable objects it holds must also be shared defaults.
+    :returns: The instance.
+    """
+    _shared_defaults.add(id(instance))
+    return instance
+
+
+def iter_shared(items: Iterable[_T]) -> Iterator[_T]:
+    """Iterate over items, leaving any shared defaults in a :class:`TrackedList` shared, rather than copying them -
+    for reading only."""
+    return list.__iter__(items) if isinstance(items, TrackedList) else iter(items)
+
+
+class TrackedList(list[_T]):
+    """A list which invalidates cached structures (see :func:`cached_structure`) when it's changed in place.
+
+    Lists assigned to attributes named in `_structure_dependencies` are converted to tracked lists automatically.
+
+    Shared defaults (see :func:`shared_default`) held in the list are replaced with copies as they're accessed,
+    so items got from the list can always be modified. The copies have the same structure, so cached structures stay
+    valid.
+    """
+
+    def _changed(self) -> None:
+        _generation[0] += 1
+
+    @overload
+    def __getitem__(self, index: SupportsIndex) -> _T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[_T]: ...
+
+    def __getitem__(self, index: SupportsIndex | slice) -> _T | list[_T]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        item = super().__getitem__(index)
+        if id(item) not in _shared_defaults:
+            return item
+        copy = _unshared(cast("JsonSerializable", item))
+        super().__setitem__(index, cast("_T", copy))
+        return cast("_T", copy)
+
+    def __iter__(self) -> Iterator[_T]:
+        if not _shared_defaults.isdisjoint(map(id, super().__iter__())):
+            for index in range(len(self)):
+                self[index]
+        return super().__iter__()
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self: _L, values: Iterable[_T]) -> _L:
+        super().__iadd__(values)
+        self._changed()
+        return self
+
+    def __imul__(self, times: Any) -> TrackedList[_T]:
+        super().__imul__(times)
+        self._changed()
+        return self
+
+    def append(self, value: _T) -> None:
+        super().append(value)
+        self._changed()
+
+    def extend(self, values: Iterable[_T]) -> None:
+        super().extend(values)
+        self._changed()
+
+    def insert(self, index: Any, value: _T) -> None:
+        super().insert(index, value)
+        self._changed()
+
+    def pop(self, index: Any = -1) -> _T:
+        value = super().pop(index)
+        self._changed()
+        return value
+
+    def remove(self, value: _T) -> None:
+        super().remove(value)
+        self._changed()
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._changed()
+
+
+@dataclass(slots=True)
 class Injecting(JsonSerializable, ABC):
     inject: str
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"inject": self.inject}
@@ -3,11 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import cast
 
-from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue  # noqa: F401
+from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue, cached_structure  # noqa: F401
 from mbtest.imposters.behaviors.using import Using
 
 
-@dataclass
+@dataclass(slots=True)
 class Copy(JsonSerializable):
     """Represents a `copy behavior <http://localhost:2525/docs/api/behaviors#behavior-copy>`_.
 
@@ -21,6 +21,9 @@ class Copy(JsonSerializable):
     into: str
     using: Using
 
+    _structure_dependencies = ("using",)
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"from": self.from_, "into": self.into, "using": self.using.as_structure()}
 
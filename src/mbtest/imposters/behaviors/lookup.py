@@ -4,11 +4,11 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import cast
 
-from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue  # noqa: F401
+from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue, cached_structure  # noqa: F401
 from mbtest.imposters.behaviors.using import Using
 
 
-@dataclass
+@dataclass(slots=True)
 class Lookup(JsonSerializable):
     """Represents a `lookup behavior <http://localhost:2525/docs/api/behaviors#behavior-lookup>`_.
 
@@ -23,6 +23,9 @@ class Lookup(JsonSerializable):
     datasource_key_column: str
     into: str
 
+    _structure_dependencies = ("key",)
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {
             "key": self.key.as_structure(),
@@ -42,7 +45,7 @@ class Lookup(JsonSerializable):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Key(JsonSerializable):
     """The information on how to select the key from the request.
 
@@ -52,17 +55,20 @@ class Key(JsonSerializable):
     :param index: Index of the iten from the result array to be selected.
     """
 
-    from_: str
+    from_: str | JsonObject
     using: Using
     index: int = 0
 
+    _structure_dependencies = ("using",)
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"from": self.from_, "using": self.using.as_structure(), "index": self.index}
 
     @classmethod
     def from_structure(cls, structure: JsonObject) -> Key:
         return cls(
-            cast("str", structure["from"]),
+            cast("str | JsonObject", structure["from"]),
             Using.from_structure(cls.as_json_object(structure["using"])),
             cast("int", structure["index"]),
         )
@@ -5,10 +5,10 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import cast
 
-from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue  # noqa: F401
+from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue, cached_structure  # noqa: F401
 
 
-@dataclass
+@dataclass(slots=True)
 class Using(JsonSerializable, abc.ABC):
     """
     How to select values from the response.
@@ -28,7 +28,11 @@ class Using(JsonSerializable, abc.ABC):
     def method(self) -> Using.Method:  # pragma: no cover
         raise NotImplementedError
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
+        return self._selector_structure()
+
+    def _selector_structure(self) -> JsonObject:
         return {"method": self.method.value, "selector": self.selector}
 
     @classmethod
@@ -44,7 +48,7 @@ class Using(JsonSerializable, abc.ABC):
         ).from_structure(structure)
 
 
-@dataclass
+@dataclass(slots=True)
 class UsingRegex(Using):
     """
     `Select values from the response using a regular expression. <http://localhost:2525/docs/api/behaviors#copy-regex-replacement>`_
@@ -61,8 +65,9 @@ class UsingRegex(Using):
     def method(self) -> Using.Method:
         return Using.Method.REGEX
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
-        structure = super().as_structure()
+        structure = self._selector_structure()
         structure["options"] = {
             "ignoreCase": self.ignore_case,
             "multiline": self.multiline,
@@ -79,7 +84,7 @@ class UsingRegex(Using):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class UsingXpath(Using):
     """
     `Select values from the response using an xpath expression. <http://localhost:2525/docs/api/behaviors#copy-xpath-replacement>`_
@@ -94,8 +99,9 @@ class UsingXpath(Using):
     def method(self) -> Using.Method:
         return Using.Method.XPATH
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
-        structure = super().as_structure()
+        structure = self._selector_structure()
         if self.ns:
             structure["ns"] = self.ns
         return structure
@@ -108,7 +114,7 @@ class UsingXpath(Using):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class UsingJsonpath(Using):
     """
     `Select values from the response using a jsonpath expression. <http://localhost:2525/docs/api/behaviors#copy-jsonpath-replacement>`_
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import binascii
+import codecs
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar
+
+from mbtest.serialisation import CHUNK_SIZE, StreamingString
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Iterable, Iterator
+
+
+class StreamingBody(ABC):
+    """A response body which is produced a chunk at a time, rather than held in memory.
+
+    When an imposter is added to Mountebank, or saved, the body is encoded into its definition as it's written, so
+    however large it is, it's never held in memory whole - see :func:`mbtest.imposters.base.streaming_structures`.
+    Structures got from :meth:`~mbtest.imposters.base.JsonSerializable.as_structure` otherwise hold the whole body.
+
+    Subclasses whose content isn't text should set `binary`, so that responses default to binary mode.
+    """
+
+    binary: ClassVar[bool] = False
+
+    @abstractmethod
+    def iter_bytes(self) -> Iterator[bytes]:  # pragma: no cover
+        """Produce the body's content.
+
+        :returns: Iterator of chunks of the content.
+        """
+        raise NotImplementedError
+
+    def read(self) -> bytes:
+        """Read the whole body into memory."""
+        return b"".join(self.iter_bytes())
+
+    def encoded(self, *, binary: bool) -> EncodedBody:
+        """The body as a string for an imposter definition.
+
+        :param binary: Base64 encode the content, for binary mode. Otherwise, it must be UTF-8 text.
+        """
+        return EncodedBody(self, binary=binary)
+
+
+@dataclass(frozen=True)
+class FileBody(StreamingBody):
+    """A response body read from a file, each time the imposter definition is written.
+
+    :param path: File path.
+    :param chunk_size: Size of the chunks the file is read in.
+    """
+
+    path: Path | str
+    chunk_size: int = CHUNK_SIZE
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        with Path(self.path).open("rb") as file:
+            while chunk := file.read(self.chunk_size):
+                yield chunk
+
+
+class EncodedBody(StreamingString):
+    """A streaming body in an imposter definition structure built for streaming - see :meth:`StreamingBody.encoded`
+    and :func:`mbtest.imposters.base.streaming_structures`.
+
+    Not a dataclass, since JSON backends encode those as objects themselves.
+
+    :param body: The body.
+    :param binary: Whether the content is base64 encoded.
+    """
+
+    __slots__ = ("binary", "body")
+
+    def __init__(self, body: StreamingBody, *, binary: bool) -> None:
+        self.body = body
+        self.binary = binary
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, EncodedBody):
+            return NotImplemented
+        return (self.body, self.binary) == (other.body, other.binary)
+
+    def __hash__(self) -> int:
+        return hash((self.body, self.binary))
+
+    def __repr__(self) -> str:
+        return f"EncodedBody({self.body!r}, binary={self.binary!r})"
+
+    def iter_text(self) -> Iterator[str]:
+        return _iter_base64(self.body.iter_bytes()) if self.binary else _iter_utf8(self.body.iter_bytes())
+
+
+def _iter_base64(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Base64 encode chunks, carrying bytes over so that each encoded chunk is a whole number of 3 byte groups."""
+    remainder = b""
+    for chunk in chunks:
+        data = remainder + chunk
+        end = len(data) - len(data) % 3
+        remainder = data[end:]
+        if end:
+            yield binascii.b2a_base64(memoryview(data)[:end], newline=False).decode("ascii")
+    if remainder:
+        yield binascii.b2a_base64(remainder, newline=False).decode("ascii")
+
+
+def _iter_utf8(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        if text := decoder.decode(chunk):
+            yield text
+    decoder.decode(b"", final=True)  # Raises if the content ends part way through a character.
@@ -0,0 +1,174 @@
+"""Framing for TCP imposters - how an imposter finds where each request ends, when requests may arrive split across
+several packets, or several together in one.
+
+Mountebank takes this from an imposter's ``endOfRequestResolver``, a JavaScript function. The framings here produce
+that function, so imposters using them work with Mountebank as long as it's run with ``--allowInjection``, and also
+declare themselves in it, so that :mod:`mbtest.engine` can frame requests natively, and imposters read back from a
+server keep their framing. Resolvers which don't declare a framing - hand-written functions, say - are kept as they
+are, as an :class:`InjectedFraming`.
+"""
+
+from __future__ import annotations
+
+import re
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, ClassVar, Literal, cast
+
+from mbtest.imposters.base import JsonObject, JsonSerializable, cached_structure
+from mbtest.serialisation import dumps, loads
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Mapping
+
+_DECLARATION = re.compile(r"// mbtest-framing (\{.*\})")
+
+
+@dataclass(slots=True)
+class Framing(JsonSerializable):
+    """Represents a TCP imposter's `end of request resolver <http://localhost:2525/docs/protocols/tcp>`_."""
+
+    @abstractmethod
+    def split(self, data: bytes) -> tuple[list[bytes], bytes]:
+        """Split data received into complete requests.
+
+        :param data: Data received so far, and not yet part of a request.
+        :returns: Complete requests, in order, and the remaining data.
+        """
+
+    @classmethod
+    def from_structure(cls, structure: JsonObject) -> Framing:
+        """Convert from a JSON serializable structure.
+
+        :param structure: JSON structure to be converted.
+        :returns: Converted object - an :class:`InjectedFraming`, if the resolver isn't declared by a framing.
+        """
+        inject = cast("str", structure.get("inject", ""))
+        if (declared := _DECLARATION.search(inject)) is None:
+            return InjectedFraming(inject)
+        parameters = cast("JsonObject", loads(declared.group(1)))
+        return _FRAMINGS[cast("str", parameters.pop("kind"))].from_parameters(parameters)
+
+
+@dataclass(slots=True)
+class DeclaredFraming(Framing):
+    """A framing mbtest implements, which declares itself in the resolver it produces."""
+
+    kind: ClassVar[str]
+
+    @abstractmethod
+    def parameters(self) -> JsonObject:
+        """The framing's parameters, as declared in its resolver."""
+
+    @abstractmethod
+    def resolver_test(self) -> str:
+        """JavaScript expression telling whether ``data``, a Buffer holding the request so far, is complete."""
+
+    @cached_structure
+    def as_structure(self) -> JsonObject:
+        declaration = dumps({"kind": self.kind, **self.parameters()}).decode("utf-8")
+        return {
+            "inject": "function (requestData) {\n"
+            f"    // mbtest-framing {declaration}\n"
+            "    var data = Buffer.from(requestData);\n"
+            f"    return {self.resolver_test()};\n"
+            "}"
+        }
+
+    @classmethod
+    @abstractmethod
+    def from_parameters(cls, parameters: JsonObject) -> DeclaredFraming:
+        """Create from the parameters declared in a resolver - see :meth:`parameters`."""
+
+
+@dataclass(slots=True)
+class InjectedFraming(Framing):
+    """A resolver which doesn't declare a framing, such as a hand-written function, kept as it is. Only Mountebank can
+    run it - the local engine doesn't support it.
+
+    :param inject: The resolver's JavaScript function.
+    """
+
+    inject: str
+
+    def split(self, data: bytes) -> tuple[list[bytes], bytes]:
+        msg = "Injected end of request resolvers can only be run by Mountebank."
+        raise NotImplementedError(msg)
+
+    @cached_structure
+    def as_structure(self) -> JsonObject:
+        return {"inject": self.inject}
+
+
+@dataclass(slots=True)
+class DelimitedFraming(DeclaredFraming):
+    """Requests end with a delimiter, such as a newline.
+
+    :param delimiter: Delimiter, which is kept at the end of each request. It mustn't be empty.
+    """
+
+    kind: ClassVar[str] = "delimited"
+
+    delimiter: bytes = b"\n"
+
+    def __post_init__(self) -> None:
+        if not self.delimiter:
+            msg = "A delimiter can't be empty."
+            raise ValueError(msg)
+
+    def split(self, data: bytes) -> tuple[list[bytes], bytes]:
+        *requests, rest = data.split(self.delimiter)
+        return [request + self.delimiter for request in requests], rest
+
+    def parameters(self) -> JsonObject:
+        return {"delimiter": self.delimiter.hex()}
+
+    def resolver_test(self) -> str:
+        return f"data.slice(-{len(self.delimiter)}).equals(Buffer.from('{self.delimiter.hex()}', 'hex'))"
+
+    @classmethod
+    def from_parameters(cls, parameters: JsonObject) -> DelimitedFraming:
+        return cls(bytes.fromhex(cast("str", parameters["delimiter"])))
+
+
+@dataclass(slots=True)
+class LengthPrefixedFraming(DeclaredFraming):
+    """Requests start with a header holding the length of the rest of the request, as an unsigned integer.
+
+    :param header_size: Size of the length header in bytes, from 1 to 6.
+    :param byteorder: Byte order of the length header.
+    """
+
+    kind: ClassVar[str] = "length-prefixed"
+
+    header_size: int = 4
+    byteorder: Literal["big", "little"] = "big"
+
+    def split(self, data: bytes) -> tuple[list[bytes], bytes]:
+        requests = []
+        start = 0
+        while len(data) - start >= self.header_size:
+            length = int.from_bytes(data[start : start + self.header_size], self.byteorder)
+            end = start + self.header_size + length
+            if end > len(data):
+                break
+            requests.append(data[start:end])
+            start = end
+        return requests, data[start:]
+
+    def parameters(self) -> JsonObject:
+        return {"headerSize": self.header_size, "byteorder": self.byteorder}
+
+    def resolver_test(self) -> str:
+        read = "readUIntBE" if self.byteorder == "big" else "readUIntLE"
+        size = self.header_size
+        return f"data.length >= {size} && data.length >= {size} + data.{read}(0, {size})"
+
+    @classmethod
+    def from_parameters(cls, parameters: JsonObject) -> LengthPrefixedFraming:
+        return cls(cast("int", parameters["headerSize"]), cast("Literal['big', 'little']", parameters["byteorder"]))
+
+
+_FRAMINGS: Mapping[str, type[DeclaredFraming]] = {
+    framing.kind: framing for framing in (DelimitedFraming, LengthPrefixedFraming)
+}
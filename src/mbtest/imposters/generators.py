@@ -0,0 +1,119 @@
+"""Synthetic response bodies, of controlled size and shape, for throughput testing.
+
+Bodies are generated deterministically from a seed - the same arguments always give the same content - and are
+streamed into imposter definitions a chunk at a time, so even very large bodies are never held in memory whole.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, ClassVar
+
+from mbtest.imposters.bodies import StreamingBody
+from mbtest.serialisation import CHUNK_SIZE
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Iterable, Iterator
+
+# Bytes taken by a JSON array's brackets.
+_BRACKETS = len("[]")
+
+
+@dataclass(frozen=True)
+class RandomBytesBody(StreamingBody):
+    """Random binary content. Responses with this body default to binary mode.
+
+    :param size: Size in bytes.
+    :param seed: Random seed.
+    """
+
+    binary: ClassVar[bool] = True
+
+    size: int
+    seed: int = 0
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        rng = random.Random(self.seed)  # noqa: S311 - Not for cryptographic use.
+        for start in range(0, self.size, CHUNK_SIZE):
+            yield rng.randbytes(min(CHUNK_SIZE, self.size - start))
+
+
+@dataclass(frozen=True)
+class JsonArrayBody(StreamingBody):
+    """A JSON array of records, each like ``{"id":0,"name":"4c1b9a0e2f7d","value":0.8444218515250481,"active":true}``.
+
+    Records are added while they fit, and the array is padded with whitespace to exactly the requested size.
+
+    :param size: Size in bytes - at least 2.
+    :param seed: Random seed.
+    """
+
+    size: int
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        if self.size < _BRACKETS:
+            msg = f"A JSON array needs at least {_BRACKETS} bytes, not {self.size}."
+            raise ValueError(msg)
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        return _chunked(self._iter_text())
+
+    def _iter_text(self) -> Iterator[str]:
+        rng = random.Random(self.seed)  # noqa: S311 - Not for cryptographic use.
+        remaining = self.size - _BRACKETS
+        yield "["
+        for i in range(self.size):
+            active = "true" if rng.getrandbits(1) else "false"
+            record = (
+                f'{"," if i else ""}{{"id":{i},"name":"{rng.getrandbits(48):012x}",'
+                f'"value":{rng.random()!r},"active":{active}}}'
+            )
+            if len(record) > remaining:
+                break
+            remaining -= len(record)
+            yield record
+        yield " " * remaining
+        yield "]"
+
+
+@dataclass(frozen=True)
+class NestedJsonBody(StreamingBody):
+    """Deeply nested JSON objects. Each level has `breadth` scalar members, like ``"k0":"4c1b9a0e2f7d"``, and a
+    ``"child"`` member holding the next level. Generated without recursion, so any depth can be produced - though
+    clients may not cope.
+
+    :param depth: Number of levels.
+    :param breadth: Scalar members per level.
+    :param seed: Random seed.
+    """
+
+    depth: int
+    breadth: int = 3
+    seed: int = 0
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        return _chunked(self._iter_text())
+
+    def _iter_text(self) -> Iterator[str]:
+        rng = random.Random(self.seed)  # noqa: S311 - Not for cryptographic use.
+        for level in range(self.depth):
+            members = ",".join(f'"k{k}":"{rng.getrandbits(48):012x}"' for k in range(self.breadth))
+            yield f'{{{members}{"," if members else ""}"level":{level},"child":'
+        yield "null"
+        yield "}" * self.depth
+
+
+def _chunked(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Join text pieces into UTF-8 chunks of about :data:`~mbtest.serialisation.CHUNK_SIZE` bytes."""
+    buffer: list[str] = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, buffered = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
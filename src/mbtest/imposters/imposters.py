@@ -1,19 +1,33 @@
 from __future__ import annotations
 
 from collections import abc
-from collections.abc import Iterable, Mapping, Sequence
+from collections.abc import Iterable, Iterator, Mapping, MutableSequence, Sequence
 from dataclasses import dataclass, field
+from datetime import datetime
 from enum import Enum
-from json import JSONDecodeError, dumps, loads
 from pathlib import Path
-from typing import cast
+from sys import intern
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Final, cast
 
-import httpx2 as httpx
 from yarl import URL
 
-from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue
-from mbtest.imposters.responses import HttpResponse, Proxy
-from mbtest.imposters.stubs import AddStub, Stub
+from mbtest.imposters.base import (
+    JsonObject,
+    JsonSerializable,
+    JsonValue,
+    cached_structure,
+    shared_structure,
+    streaming_structures,
+)
+from mbtest.imposters.framing import Framing
+from mbtest.imposters.responses import HttpResponse, Proxy, Response
+from mbtest.imposters.stubs import AddStub, LazyStubs, Stub
+from mbtest.serialisation import JSON_HEADERS, dump_file, iter_dumps, iter_json_array, load_file, loads
+from mbtest.util import default_client
+
+if TYPE_CHECKING:  # pragma: no cover
+    import httpx2 as httpx
 
 
 @dataclass(init=False)
@@ -22,7 +36,8 @@ class Imposter(JsonSerializable):
     Think of an imposter as a mock website, running a protocol, on a specific port.
     Required behaviors are specified using stubs.
 
-    :param stubs: One or more Stubs.
+    :param stubs: One or more Stubs. A :class:`~mbtest.imposters.stubs.LazyStubs` sequence is kept as it is, without
+        decoding its stubs.
     :param port: Port.
     :param protocol: Protocol to run on.
     :param name: Imposter name - useful for interactive exploration of imposters on http://localhost:2525/imposters
@@ -31,6 +46,16 @@ class Imposter(JsonSerializable):
     :param mutual_auth: Server will request a client certificate.
     :param key: SSL server certificate.
     :param cert: SSL server certificate.
+    :param mode: TCP imposters only - whether requests and responses are text, or binary, given as base64 strings.
+    :param end_of_request_resolver: TCP imposters only - how to find where each request ends. By default, each packet
+        received is a request.
+    :param client: Client to reach the imposter's server with - set when it's attached to a server. A shared default
+        client is used if not.
+
+    Use :meth:`clone` to derive variations of an imposter cheaply. Imposters are pickled as their Mountebank
+    structure, which is much quicker than pickling the object graph, but bodies given as bytes or XML elements come
+    back as the text sent to Mountebank, and the unpickled imposter isn't attached to a server. :func:`copy.copy` and
+    :func:`copy.deepcopy` copy the imposter itself, exactly.
     """
 
     class Protocol(Enum):
@@ -41,7 +66,7 @@ class Imposter(JsonSerializable):
         SMTP = "smtp"
         TCP = "tcp"
 
-    stubs: list[Stub]
+    stubs: MutableSequence[Stub]
     port: int | None = None
     protocol: Imposter.Protocol = Protocol.HTTP
     name: str | None = None
@@ -50,9 +75,13 @@ class Imposter(JsonSerializable):
     mutual_auth: bool = False
     key: str | None = None
     cert: str | None = None
+    mode: Response.Mode | None = None
+    end_of_request_resolver: Framing | None = None
     host: str | None = field(default=None, repr=False, compare=False)
     server_url: URL | None = field(default=None, repr=False, compare=False)
 
+    _structure_dependencies = ("stubs", "default_response", "end_of_request_resolver")
+
     def __init__(
         self,
         stubs: Stub | Iterable[Stub],
@@ -65,12 +94,20 @@ class Imposter(JsonSerializable):
         *,
         record_requests: bool = True,
         mutual_auth: bool = False,
+        mode: Response.Mode | None = None,
+        end_of_request_resolver: Framing | None = None,
         host: str | None = None,
         server_url: URL | None = None,
+        client: httpx.Client | None = None,
     ) -> None:
-        stubs_iter = cast("Iterable[Stub]", stubs if isinstance(stubs, abc.Sequence) else [stubs])
-        # For backwards compatibility where previously a proxy may have been used directly as a stub.
-        self.stubs = [Stub(responses=cast("Proxy", stub)) if isinstance(stub, Proxy) else stub for stub in stubs_iter]
+        if isinstance(stubs, LazyStubs):
+            self.stubs = stubs
+        else:
+            stubs_iter = cast("Iterable[Stub]", stubs if isinstance(stubs, abc.Sequence) else [stubs])
+            # For backwards compatibility where previously a proxy may have been used directly as a stub.
+            self.stubs = [
+                Stub(responses=cast("Proxy", stub)) if isinstance(stub, Proxy) else stub for stub in stubs_iter
+            ]
         self.port = port
         self.protocol = protocol if isinstance(protocol, Imposter.Protocol) else Imposter.Protocol(protocol)
         self.name = name
@@ -79,8 +116,35 @@ class Imposter(JsonSerializable):
         self.mutual_auth = mutual_auth
         self.key = key
         self.cert = cert
+        self.mode = mode
+        self.end_of_request_resolver = end_of_request_resolver
         self.host = host
         self.server_url = server_url
+        # Private, so that matchers comparing imposters' properties don't compare clients.
+        self._client = client
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return Imposter.from_structure, (shared_structure(self),)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Imposter:
+        # Clients hold connections, so copies share them.
+        memo[id(self._client)] = self._client
+        return super().__deepcopy__(memo)
+
+    def clone(self, **overrides: Any) -> Imposter:
+        """Copy this imposter, for deriving variations without changing the original - see
+        :meth:`JsonSerializable.clone <mbtest.imposters.base.JsonSerializable.clone>`. The clone isn't attached to a
+        server, even if this imposter is.
+
+        :param overrides: Attributes to set on the clone, e.g. ``port=4546``.
+        :returns: The clone.
+        """
+        clone = super().clone(**overrides)
+        # Attachment isn't part of the structure, so reset it without invalidating the cached structure.
+        for name in {"host", "server_url"} - overrides.keys():
+            object.__setattr__(clone, name, None)
+        object.__setattr__(clone, "_client", None)
+        return clone
 
     @property
     def url(self) -> URL | None:
@@ -88,24 +152,40 @@ class Imposter(JsonSerializable):
             return URL.build(scheme=self.protocol.value, host=self.host, port=self.port)
         return None
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         structure: JsonObject = {"protocol": self.protocol.value, "recordRequests": self.record_requests}
         self.add_if_true(structure, "port", self.port)
         self.add_if_true(structure, "name", self.name)
         if self.default_response:
             structure["defaultResponse"] = self.default_response.as_structure()
-        self.add_if_true(structure, "stubs", [stub.as_structure() for stub in self.stubs])
+        self.add_if_true(
+            structure,
+            "stubs",
+            self.stubs.item_structures()
+            if isinstance(self.stubs, LazyStubs)
+            else [stub.as_structure() for stub in self.stubs],
+        )
         self.add_if_true(structure, "mutualAuth", self.mutual_auth)
         self.add_if_true(structure, "key", self.key)
         self.add_if_true(structure, "cert", self.cert)
+        if self.mode:
+            structure["mode"] = self.mode.value
+        if self.end_of_request_resolver:
+            structure["endOfRequestResolver"] = self.end_of_request_resolver.as_structure()
         return structure
 
     @classmethod
     def from_structure(cls, structure: JsonObject) -> Imposter:
+        """Convert from a JSON serializable structure.
+
+        Stubs are decoded lazily, when first accessed - see :class:`~mbtest.imposters.stubs.LazyStubs`.
+
+        :param structure: JSON structure to be converted.
+        :returns: Converted object.
+        """
         return cls(
-            stubs=[
-                Stub.from_structure(cls.as_json_object(stub)) for stub in cast("list[JsonValue]", structure["stubs"])
-            ],
+            stubs=LazyStubs(cast("list[JsonObject]", structure.get("stubs", []))),
             port=cast("int | None", structure.get("port")),
             protocol=cast("str", structure["protocol"]),
             name=cast("str | None", structure.get("name")),
@@ -116,42 +196,72 @@ class Imposter(JsonSerializable):
             mutual_auth=cast("bool", structure.get("mutualAuth", False)),
             key=cast("str | None", structure.get("key")),
             cert=cast("str | None", structure.get("cert")),
+            mode=Response.Mode(cast("str", structure["mode"])) if "mode" in structure else None,
+            end_of_request_resolver=Framing.from_structure(cls.as_json_object(structure["endOfRequestResolver"]))
+            if "endOfRequestResolver" in structure
+            else None,
         )
 
-    def save(self, path: Path | str) -> None:
+    def save(self, path: Path | str, *, compact: bool = False) -> None:
         """Save this imposter to a JSON file for later replay.
 
         The saved file can be loaded with :meth:`from_file` and posted to a
         Mountebank server, or used directly with Mountebank's ``--configfile`` option.
 
+        The file is written a stub at a time, and compressed if its name ends with ``.gz`` (gzip) or ``.zst``
+        (Zstandard) - see :func:`mbtest.serialisation.open_json_file`. Mountebank can't read compressed files itself.
+
         :param path: Destination file path.
+        :param compact: Don't indent the JSON, making the file smaller and quicker to write.
         """
-        Path(path).write_text(dumps(self.as_structure(), indent=2))
+        with streaming_structures():
+            structure = shared_structure(self)
+        dump_file(structure, path, indent=not compact)
 
     @classmethod
     def from_file(cls, path: Path | str) -> Imposter:
         """Load an imposter from a JSON file previously saved with :meth:`save`.
 
+        The file is read a chunk at a time, and decompressed if its name ends with ``.gz`` or ``.zst``.
+
         :param path: Source file path.
         :returns: An Imposter object.
         """
-        return cls.from_structure(loads(Path(path).read_text()))
+        return cls.from_structure(load_file(path))
 
     def get_actual_requests(self) -> Sequence[Request]:
-        json = httpx.get(str(self.configuration_url)).json()["requests"]
-        return [Request.from_json(req) for req in json]
+        return list(self.iter_actual_requests())
+
+    def iter_actual_requests(self) -> Iterator[Request]:
+        """Lazily yield the requests recorded by this imposter.
+
+        The ``requests`` array is decoded incrementally as the imposter's configuration is downloaded, and everything
+        else in it (stub definitions, for example) is skipped, so memory use doesn't grow with the size of the log.
+        """
+        with self.http_client().stream("GET", str(self.configuration_url)) as response:
+            for json in iter_json_array(response.iter_bytes(), "requests"):
+                yield Request.from_json(self.as_json_object(json))
 
-    def attach(self, host: str, port: int, server_url: URL) -> None:
-        """Attach imposter to a running MB server."""
+    def delete_saved_requests(self) -> None:
+        """Remove all requests recorded so far by this imposter from the Mountebank server."""
+        self.http_client().delete(f"{self.configuration_url}/savedRequests").raise_for_status()
+
+    def attach(self, host: str, port: int, server_url: URL, client: httpx.Client | None = None) -> None:
+        """Attach imposter to a running MB server, reached through a client, if given."""
         self.host = host
         self.port = port
         self.server_url = server_url
+        self._client = client
 
     @property
     def attached(self) -> bool:
         """Imposter is attached to a running MB server."""
         return cast("bool", self.port and self.host and self.server_url)
 
+    def http_client(self) -> httpx.Client:
+        """Client to reach the imposter's server with - its own, or the shared default."""
+        return default_client() if self._client is None else self._client
+
     @property
     def configuration_url(self) -> URL:
         if self.attached:
@@ -159,10 +269,17 @@ class Imposter(JsonSerializable):
         msg = f"Unattached imposter {self} has no configuration URL."
         raise AttributeError(msg)
 
-    def query_all_stubs(self) -> list[Stub]:
-        """Return all stubs running on the impostor, including those defined elsewhere."""
-        json = httpx.get(str(self.configuration_url)).json()["stubs"]
-        return [Stub.from_structure(s) for s in json]
+    def query_all_stubs(self) -> MutableSequence[Stub]:
+        """Return all stubs running on the impostor, including those defined elsewhere. Stubs are decoded lazily, when
+        first accessed."""
+        json = loads(self.http_client().get(str(self.configuration_url)).content)["stubs"]
+        return LazyStubs(json)
+
+    def query_stub_hits(self) -> list[int]:
+        """Return the number of requests each stub running on the impostor has matched, in stub order. Mountebank only
+        records the requests stubs match in debug mode - otherwise, every count is zero."""
+        stubs = loads(self.http_client().get(str(self.configuration_url)).content)["stubs"]
+        return [len(stub.get("matches") or ()) for stub in stubs]
 
     def playback(self) -> list[Stub]:
         all_stubs = self.query_all_stubs()
@@ -178,74 +295,197 @@ class Imposter(JsonSerializable):
 
     def add_stub(self, definition: Stub, index: int | None = None) -> int:
         """Add a stub to a running impostor. Returns index of new stub."""
-        json = AddStub(stub=definition, index=index).as_structure()
-        post = httpx.post(f"{self.configuration_url}/stubs", json=json)
+        with streaming_structures():
+            json = shared_structure(AddStub(stub=definition, index=index))
+        post = self.http_client().post(
+            f"{self.configuration_url}/stubs", content=iter_dumps(json), headers=JSON_HEADERS
+        )
         post.raise_for_status()
         self.stubs.append(definition)  # TODO - what if we've not added to the end?
-        return index or len(post.json()["stubs"]) - 1
+        return index or len(loads(post.content)["stubs"]) - 1
 
     def delete_stub(self, index: int) -> Stub:
         """Remove a stub from a running impostor."""
-        post = httpx.delete(f"{self.configuration_url}/stubs/{index}")
+        post = self.http_client().delete(f"{self.configuration_url}/stubs/{index}")
         post.raise_for_status()
         return self.stubs.pop(index)
 
+    def replace_all_stubs(self, definitions: Iterable[Stub]) -> None:
+        """Replace all the stubs on a running impostor in a single request. Mountebank starts cycling through each
+        stub's responses from the first again."""
+        stubs = definitions if isinstance(definitions, LazyStubs) else LazyStubs(definitions)
+        with streaming_structures():
+            json = {"stubs": stubs.item_structures()}
+        put = self.http_client().put(f"{self.configuration_url}/stubs", content=iter_dumps(json), headers=JSON_HEADERS)
+        put.raise_for_status()
+        self.stubs = stubs
+
     def update_stub(self, index: int, definition: Stub) -> int:
         """Change a stub in an existing imposter. Returns index of changed stub."""
-        json = definition.as_structure()
-        put = httpx.put(f"{self.configuration_url}/stubs/{index}", json=json)
+        with streaming_structures():
+            json = shared_structure(definition)
+        put = self.http_client().put(
+            f"{self.configuration_url}/stubs/{index}", content=iter_dumps(json), headers=JSON_HEADERS
+        )
         put.raise_for_status()
         return index
 
 
 class Request:
+    __slots__ = ()
+
     @staticmethod
     def from_json(json: JsonObject) -> Request:
         if "envelopeFrom" in json:
             return SentEmail.from_json(json)
+        if "data" in json:
+            return TcpRequest.from_json(json)
         return HttpRequest.from_json(json)
 
 
-@dataclass
+_EMPTY_MAPPING: Mapping[str, str] = MappingProxyType({})
+_UNDECODED: Final = object()
+
+
+class _InternedHeaders(Mapping[str, str]):
+    """Headers as decoded, shared until first used, when they're re-keyed with interned names - so requests which are
+    never looked at cost nothing more than their decoded headers."""
+
+    __slots__ = ("_headers", "_interned")
+
+    def __init__(self, headers: Mapping[str, str]) -> None:
+        self._headers = headers
+        self._interned = False
+
+    def _names_interned(self) -> Mapping[str, str]:
+        if not self._interned:
+            self._headers = {intern(name): value for name, value in self._headers.items()}
+            self._interned = True
+        return self._headers
+
+    def __getitem__(self, name: str) -> str:
+        return self._names_interned()[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names_interned())
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+    def __repr__(self) -> str:
+        return repr(self._headers)
+
+
+@dataclass(frozen=True, slots=True)
 class HttpRequest(Request):
+    """An HTTP request, as recorded by an imposter.
+
+    Requests are immutable and slotted, since there may be very many of them. Those built by :meth:`from_json` share
+    the decoded query and headers mappings rather than copying them, methods and paths are interned, and header names
+    are interned and the body parsed as JSON only when they're first used.
+
+    :param timestamp: When Mountebank received the request, as recorded - an ISO 8601 string. See :attr:`time`.
+    :param request_from: Client address and port the request came from.
+    """
+
     method: str
     path: str
     query: Mapping[str, str]
     headers: Mapping[str, str]
     body: str | None = None
+    timestamp: str | None = None
+    request_from: str | None = None
+    _json: JsonObject | object | None = field(default=_UNDECODED, init=False, repr=False, compare=False)
 
     @staticmethod
     def from_json(json: JsonObject) -> HttpRequest:
+        query = cast("Mapping[str, str] | None", json.get("query"))
+        headers = cast("Mapping[str, str] | None", json.get("headers"))
         return HttpRequest(
-            method=cast("str", json["method"]),
-            path=cast("str", json["path"]),
-            query=cast("Mapping[str, str]", json.get("query", {})),
-            headers=cast("Mapping[str, str]", json.get("headers", {})),
+            method=intern(cast("str", json["method"])),
+            path=intern(cast("str", json["path"])),
+            query=query or _EMPTY_MAPPING,
+            headers=_InternedHeaders(headers) if headers else _EMPTY_MAPPING,
             body=cast("str | None", json.get("body")),
+            timestamp=cast("str | None", json.get("timestamp")),
+            request_from=cast("str | None", json.get("requestFrom")),
         )
 
+    @property
+    def time(self) -> datetime | None:
+        return _parse_timestamp(self.timestamp)
+
+    @property
+    def client(self) -> str | None:
+        """Client address the request came from, without the port."""
+        return _client_address(self.request_from)
+
     @property
     def json(self) -> JsonObject | None:
+        if self._json is _UNDECODED:
+            object.__setattr__(self, "_json", self._decode_json())
+        return cast("JsonObject | None", self._json)
+
+    def _decode_json(self) -> JsonObject | None:
         try:
             return loads(self.body) if self.body else None
-        except JSONDecodeError:
+        except ValueError:
             return None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class TcpRequest(Request):
+    """A TCP request, as recorded by an imposter.
+
+    :param data: Data received - base64 encoded, for a binary mode imposter.
+    :param timestamp: When Mountebank received the request, as recorded - an ISO 8601 string. See :attr:`time`.
+    :param request_from: Client address and port the request came from.
+    """
+
+    data: str
+    timestamp: str | None = None
+    request_from: str | None = None
+
+    @staticmethod
+    def from_json(json: JsonObject) -> TcpRequest:
+        return TcpRequest(
+            data=cast("str", json["data"]),
+            timestamp=cast("str | None", json.get("timestamp")),
+            request_from=cast("str | None", json.get("requestFrom")),
+        )
+
+    @property
+    def time(self) -> datetime | None:
+        return _parse_timestamp(self.timestamp)
+
+    @property
+    def client(self) -> str | None:
+        """Client address the request came from, without the port."""
+        return _client_address(self.request_from)
+
+
+@dataclass(frozen=True, slots=True)
 class Address:
     address: str
     name: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SentEmail(Request):
+    """An email, as recorded by an SMTP imposter.
+
+    :param timestamp: When Mountebank received the email, as recorded - an ISO 8601 string. See :attr:`time`.
+    :param request_from: Client address and port the email came from.
+    """
+
     from_: Address
     to: list[Address]
     cc: list[Address]
     bcc: list[Address]
     subject: str
     text: str
+    timestamp: str | None = None
+    request_from: str | None = None
 
     @staticmethod
     def from_json(json: JsonObject) -> SentEmail:
@@ -259,8 +499,19 @@ class SentEmail(Request):
             bcc=SentEmail._parse_addresses(json.get("bcc", [])),
             subject=cast("str", json.get("subject", "")),
             text=cast("str", json.get("text", "")),
+            timestamp=cast("str | None", json.get("timestamp")),
+            request_from=cast("str | None", json.get("requestFrom")),
         )
 
+    @property
+    def time(self) -> datetime | None:
+        return _parse_timestamp(self.timestamp)
+
+    @property
+    def client(self) -> str | None:
+        """Client address the email came from, without the port."""
+        return _client_address(self.request_from)
+
     @staticmethod
     def _parse_addresses(value: JsonValue) -> list[Address]:
         if isinstance(value, dict):
@@ -272,6 +523,15 @@ class SentEmail(Request):
         ]
 
 
+def _parse_timestamp(timestamp: str | None) -> datetime | None:
+    # datetime.fromisoformat() only accepts a "Z" suffix from Python 3.11.
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00")) if timestamp else None
+
+
+def _client_address(request_from: str | None) -> str | None:
+    return request_from.rsplit(":", 1)[0] if request_from else None
+
+
 def smtp_imposter(name: str = "smtp", *, record_requests: bool = True) -> Imposter:
     """Canned SMTP server imposter."""
     return Imposter([], 5525, protocol=Imposter.Protocol.SMTP, name=name, record_requests=record_requests)
@@ -1,34 +1,32 @@
 from __future__ import annotations
 
 from abc import ABC
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any, cast
 
-from mbtest.imposters.base import Injecting, JsonObject, JsonSerializable, JsonValue  # noqa: F401
+from mbtest.imposters.base import (  # noqa: F401
+    Injecting,
+    JsonObject,
+    JsonSerializable,
+    JsonValue,
+    cached_structure,
+    shared_default,
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class BasePredicate(JsonSerializable, ABC):
     @classmethod
-    def from_structure(cls, structure: JsonObject) -> BasePredicate:  # noqa: C901
-        if "and" in structure:
-            return AndPredicate.from_structure(structure)
-        if "or" in structure:
-            return OrPredicate.from_structure(structure)
-        if "not" in structure:
-            return NotPredicate.from_structure(structure)
-        if "contains" in structure and "data" in cls.as_json_object(structure["contains"]):
-            return TcpPredicate.from_structure(structure)
-        if "inject" in structure:
-            return InjectionPredicate.from_structure(structure)
-        if set(structure.keys()).intersection({o.value for o in Predicate.Operator}):  # pragma: no cover
-            return Predicate.from_structure(structure)
+    def from_structure(cls, structure: JsonObject) -> BasePredicate:
+        for key in structure:
+            if decoder := _DECODERS.get(key):
+                return decoder(structure)
         raise NotImplementedError  # pragma: no cover
 
 
-@dataclass
+@dataclass(slots=True)
 class LogicallyCombinablePredicate(BasePredicate, ABC):
     def __and__(self, other: BasePredicate) -> AndPredicate:
         return AndPredicate(self, other)
@@ -40,7 +38,7 @@ class LogicallyCombinablePredicate(BasePredicate, ABC):
         return NotPredicate(self)
 
 
-@dataclass(init=False)
+@dataclass(init=False, slots=True)
 class Predicate(LogicallyCombinablePredicate):
     """Represents a `Mountebank predicate <http://localhost:2525/docs/api/predicates>`_.
     A predicate can be thought of as a trigger, which may or may not match a request.
@@ -84,7 +82,7 @@ class Predicate(LogicallyCombinablePredicate):
 
         @classmethod
         def has_value(cls, name: str) -> bool:
-            return any(name == item.value for item in cls)
+            return name in _OPERATORS
 
     path: str | None = None
     method: Predicate.Method | None = None
@@ -122,6 +120,7 @@ class Predicate(LogicallyCombinablePredicate):
         self.operator = operator if isinstance(operator, Predicate.Operator) else Predicate.Operator(operator)
         self.case_sensitive = case_sensitive
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         predicate = {
             self.operator.value: self.fields_as_structure(),
@@ -135,14 +134,13 @@ class Predicate(LogicallyCombinablePredicate):
 
     @classmethod
     def from_structure(cls, structure: JsonObject) -> Predicate:
-        operators = tuple(filter(Predicate.Operator.has_value, structure.keys()))
+        operators = [key for key in structure if key in _OPERATORS]
         if len(operators) != 1:
             msg = "Each predicate must define exactly one operator."
             raise Predicate.InvalidPredicateOperator(msg)
-        operator = operators[0]
-        inner = cls.as_json_object(structure[operator])
+        inner = cls.as_json_object(structure[operators[0]])
         return cls(
-            operator=operator,
+            operator=_OPERATORS[operators[0]],
             case_sensitive=cast("bool", structure.get("caseSensitive", True)),
             path=cast("str | None", inner.get("path")),
             method=cast("str | None", inner.get("method")),
@@ -168,11 +166,14 @@ class Predicate(LogicallyCombinablePredicate):
         return fields
 
 
-@dataclass
+@dataclass(slots=True)
 class AndPredicate(LogicallyCombinablePredicate):
     left: BasePredicate
     right: BasePredicate
 
+    _structure_dependencies = ("left", "right")
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"and": [self.left.as_structure(), self.right.as_structure()]}
 
@@ -185,11 +186,14 @@ class AndPredicate(LogicallyCombinablePredicate):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class OrPredicate(LogicallyCombinablePredicate):
     left: BasePredicate
     right: BasePredicate
 
+    _structure_dependencies = ("left", "right")
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"or": [self.left.as_structure(), self.right.as_structure()]}
 
@@ -202,10 +206,13 @@ class OrPredicate(LogicallyCombinablePredicate):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class NotPredicate(LogicallyCombinablePredicate):
     inverted: BasePredicate
 
+    _structure_dependencies = ("inverted",)
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"not": self.inverted.as_structure()}
 
@@ -214,7 +221,7 @@ class NotPredicate(LogicallyCombinablePredicate):
         return cls(BasePredicate.from_structure(cls.as_json_object(structure["not"])))
 
 
-@dataclass
+@dataclass(slots=True)
 class TcpPredicate(LogicallyCombinablePredicate):
     """Represents a `Mountebank TCP predicate <http://localhost:2525/docs/protocols/tcp>`_.
     A predicate can be thought of as a trigger, which may or may not match a request.
@@ -224,6 +231,7 @@ class TcpPredicate(LogicallyCombinablePredicate):
 
     data: str
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"contains": {"data": self.data}}
 
@@ -232,7 +240,7 @@ class TcpPredicate(LogicallyCombinablePredicate):
         return cls(cast("str", cls.as_json_object(structure["contains"])["data"]))
 
 
-@dataclass
+@dataclass(slots=True)
 class InjectionPredicate(BasePredicate, Injecting):
     """Represents a `Mountebank injection predicate <http://localhost:2525/docs/api/injection>`_.
     A predicate can be thought of as a trigger, which may or may not match a request.
@@ -245,3 +253,24 @@ class InjectionPredicate(BasePredicate, Injecting):
     @classmethod
     def from_structure(cls, structure: JsonObject) -> InjectionPredicate:
         return cls(inject=cast("str", structure["inject"]))
+
+
+def _contains_from_structure(structure: JsonObject) -> BasePredicate:
+    if "data" in BasePredicate.as_json_object(structure["contains"]):
+        return TcpPredicate.from_structure(structure)
+    return Predicate.from_structure(structure)
+
+
+# Operator values, and the decoder for predicates identified by each key, built once rather than per predicate.
+_OPERATORS: dict[str, Predicate.Operator] = {operator.value: operator for operator in Predicate.Operator}
+_DECODERS: dict[str, Callable[[JsonObject], BasePredicate]] = {
+    **dict.fromkeys(_OPERATORS, Predicate.from_structure),
+    "contains": _contains_from_structure,
+    "and": AndPredicate.from_structure,
+    "or": OrPredicate.from_structure,
+    "not": NotPredicate.from_structure,
+    "inject": InjectionPredicate.from_structure,
+}
+
+# Used by stubs which don't specify predicates.
+DEFAULT_PREDICATE = shared_default(Predicate())
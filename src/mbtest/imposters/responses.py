@@ -1,70 +1,96 @@
 from __future__ import annotations
 
+import binascii
 from abc import ABC
-from collections.abc import Iterable, Mapping
+from collections.abc import Callable, Iterable, Mapping
 from dataclasses import dataclass, field
 from enum import Enum
 from http import HTTPStatus
-from typing import cast
+from pathlib import Path
+from typing import Any, TypeAlias, cast
 from xml.etree import ElementTree as ET  # nosec - We are creating, not parsing XML.
 
 from yarl import URL
 
-from mbtest.imposters.base import Injecting, JsonObject, JsonSerializable, JsonValue
+from mbtest.imposters.base import (
+    Injecting,
+    JsonObject,
+    JsonSerializable,
+    JsonValue,
+    cached_structure,
+    shared_default,
+    streaming,
+)
 from mbtest.imposters.behaviors import Copy, Lookup
+from mbtest.imposters.bodies import FileBody, StreamingBody
 from mbtest.imposters.predicates import Predicate
+from mbtest.serialisation import dumps
 
+Body: TypeAlias = "str | JsonObject | ET.Element | bytes | bytearray | memoryview | StreamingBody"
 
-@dataclass
+
+@dataclass(slots=True)
 class BaseResponse(JsonSerializable, ABC):
     @classmethod
-    def from_structure(cls, structure: JsonObject) -> BaseResponse:  # noqa: C901
-        if "is" in structure and "data" in cls.as_json_object(structure["is"]):
-            return TcpResponse.from_structure(structure)
-        if "is" in structure:
-            return Response.from_structure(structure)
-        if "proxy" in structure:
-            return Proxy.from_structure(structure)
-        if "inject" in structure:
-            return InjectionResponse.from_structure(structure)
-        if "fault" in structure:
-            return FaultResponse.from_structure(structure)
+    def from_structure(cls, structure: JsonObject) -> BaseResponse:
+        for key in structure:
+            if decoder := _DECODERS.get(key):
+                return decoder(structure)
         raise NotImplementedError  # pragma: no cover
 
 
-@dataclass(init=False)
+@dataclass(init=False, slots=True)
 class HttpResponse(JsonSerializable):
     """Represents a `Mountebank HTTP response <http://localhost:2525/docs/protocols/http>`_.
 
-    :param body: Body text for response. Can be a string, bytes, an XML Element, or a JSON serialisable data structure.
+    :param body: Body text for response. Can be a string, an XML Element, a JSON serialisable data structure, or
+        bytes (or any bytes-like object, such as a bytearray or memoryview). In binary mode, bytes are base64 encoded
+        for Mountebank straight from the buffer; in text mode they must be UTF-8. A :class:`pathlib.Path`, or any
+        :class:`~mbtest.imposters.bodies.StreamingBody`, is streamed into the imposter definition when it's added to
+        Mountebank, so is never held in memory whole - see :meth:`Response.from_file`.
     :param status_code: HTTP status code - prefer :class:`http.HTTPStatus` values.
     :param headers: Response HTTP headers
-    :param mode: Mode - text or binary
+    :param mode: Mode - text or binary. Defaults to text, unless the body is a binary
+        :class:`~mbtest.imposters.bodies.StreamingBody`, such as those in :mod:`mbtest.imposters.generators`.
 
     """
 
-    body: str | JsonObject | ET.Element | bytes = ""
+    body: Body = ""
     status_code: HTTPStatus | int | str = HTTPStatus.OK
     headers: Mapping[str, str] | None = None
     mode: Response.Mode
 
     def __init__(
         self,
-        body: str | JsonObject | ET.Element | bytes = "",
+        body: Body | Path = "",
         status_code: HTTPStatus | int | str = HTTPStatus.OK,
         headers: Mapping[str, str] | None = None,
         mode: Response.Mode | None = None,
     ) -> None:
-        self.body = body
+        self.body = FileBody(body) if isinstance(body, Path) else body
         self.status_code = status_code
         self.headers = headers
-        self.mode = mode if mode is not None else Response.Mode.TEXT
-
+        if mode is None:
+            mode = (
+                Response.Mode.BINARY
+                if isinstance(self.body, StreamingBody) and self.body.binary
+                else Response.Mode.TEXT
+            )
+        self.mode = mode
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         if isinstance(self.body, ET.Element):
             body_str: str | JsonObject = ET.tostring(self.body, encoding="unicode")
-        elif isinstance(self.body, bytes):
-            body_str = self.body.decode("utf-8")
+        elif isinstance(self.body, bytes | bytearray | memoryview):
+            body_str = (
+                binascii.b2a_base64(self.body, newline=False).decode("ascii")
+                if self.mode == Response.Mode.BINARY
+                else str(self.body, "utf-8")
+            )
+        elif isinstance(self.body, StreamingBody):
+            encoded = self.body.encoded(binary=self.mode == Response.Mode.BINARY)
+            body_str = cast("str", encoded) if streaming() else str(encoded)
         else:
             body_str = self.body
         is_structure: JsonObject = {"statusCode": self.status_code, "_mode": self.mode.value}
@@ -72,21 +98,42 @@ class HttpResponse(JsonSerializable):
         self.add_if_true(is_structure, "headers", self.headers)
         return is_structure
 
+    def streams_body(self) -> bool:
+        return isinstance(self.body, StreamingBody)
+
+    @property
+    def body_bytes(self) -> bytes:
+        """The body as bytes, as it will be served - base64 decoded in binary mode, or UTF-8 encoded text otherwise.
+
+        Decoded on each access, so bodies of binary responses loaded with :meth:`from_structure` are kept in their
+        compact, encoded form until needed.
+        """
+        if isinstance(self.body, bytes | bytearray | memoryview):
+            return bytes(self.body)
+        if isinstance(self.body, StreamingBody):
+            return self.body.read()
+        structure = cast("str | JsonObject", self.as_structure().get("body", ""))
+        if not isinstance(structure, str):
+            return dumps(structure)
+        return binascii.a2b_base64(structure) if self.mode == Response.Mode.BINARY else structure.encode("utf-8")
+
     @classmethod
     def from_structure(cls, structure: JsonObject) -> HttpResponse:
+        body = structure.get("body", "")
         return cls(
-            body=cast("str | JsonObject", structure.get("body", "")),
+            body=cast("str | JsonObject", body),
             status_code=cast("HTTPStatus | int | str", structure.get("statusCode", HTTPStatus.OK)),
             headers=cast("Mapping[str, str] | None", structure.get("headers")),
             mode=Response.Mode(cast("str", structure.get("_mode", "text"))),
         )
 
 
-@dataclass(init=False)
+@dataclass(init=False, slots=True)
 class Response(BaseResponse):
     """Represents a `Mountebank 'is' response behavior <http://localhost:2525/docs/api/stubs>`_.
 
-    :param body: Body text for response. Can be a string, or a JSON serialisable data structure.
+    :param body: Body text for response. Can be a string, a JSON serialisable data structure, bytes, or a file path
+        - see :class:`HttpResponse`.
     :param status_code: HTTP status code - prefer :class:`http.HTTPStatus` values.
     :param wait: `Add latency, in ms <http://localhost:2525/docs/api/behaviors#behavior-wait>`_.
     :param repeat: `Repeat this many times before moving on to next response
@@ -113,9 +160,11 @@ class Response(BaseResponse):
     shell_transform: str | Iterable[str] | None = None
     http_response: HttpResponse = field(default_factory=HttpResponse)
 
+    _structure_dependencies = ("http_response", "copy", "lookup")
+
     def __init__(
         self,
-        body: str | JsonObject = "",
+        body: Body | Path = "",
         status_code: HTTPStatus | int | str = HTTPStatus.OK,
         wait: int | str | None = None,
         repeat: int | None = None,
@@ -138,6 +187,7 @@ class Response(BaseResponse):
         self.lookup = self.one_or_many(lookup)
         self.shell_transform = shell_transform
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {
             "is": (self.http_response.as_structure()),
@@ -175,10 +225,39 @@ class Response(BaseResponse):
             else None,
         )
 
+    def clone(self, **overrides: Any) -> Response:
+        """Copy this response - see :meth:`JsonSerializable.clone <mbtest.imposters.base.JsonSerializable.clone>`.
+
+        :param overrides: Attributes to set on the clone, including those of its :class:`HttpResponse`, e.g.
+            ``body="..."`` or ``status_code=HTTPStatus.NOT_FOUND``.
+        :returns: The clone.
+        """
+        if http_overrides := {name: overrides.pop(name) for name in _HTTP_RESPONSE_FIELDS & overrides.keys()}:
+            current = self.http_response.clone()
+            fields = {name: getattr(current, name) for name in _HTTP_RESPONSE_FIELDS}
+            overrides["http_response"] = HttpResponse(**(fields | http_overrides))
+        # Not super(), which doesn't work in slotted dataclasses.
+        return cast("Response", JsonSerializable.clone(self, **overrides))
+
+    @classmethod
+    def from_file(cls, path: Path | str, **kwargs: Any) -> Response:
+        """Response with a body read from a file. Only the path is held - the content is streamed into the imposter
+        definition whenever it's added to Mountebank, or saved.
+
+        :param path: File path.
+        :param kwargs: Other :class:`Response` arguments. Use binary mode for anything other than UTF-8 text.
+        :returns: The response.
+        """
+        return cls(body=FileBody(path), **kwargs)
+
     @property
-    def body(self) -> str | JsonObject | ET.Element | bytes:
+    def body(self) -> Body:
         return self.http_response.body
 
+    @property
+    def body_bytes(self) -> bytes:
+        return self.http_response.body_bytes
+
     @property
     def status_code(self) -> HTTPStatus | int | str:
         return self.http_response.status_code
@@ -192,10 +271,11 @@ class Response(BaseResponse):
         return self.http_response.mode
 
 
-@dataclass
+@dataclass(slots=True)
 class TcpResponse(BaseResponse):
     data: str
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"is": {"data": self.data}}
 
@@ -204,7 +284,7 @@ class TcpResponse(BaseResponse):
         return cls(data=cast("str", cls.as_json_object(structure["is"])["data"]))
 
 
-@dataclass
+@dataclass(slots=True)
 class FaultResponse(BaseResponse):
     """Represents a `Mountebank fault response <https://localhost:2525/docs/api/faults>`_.
 
@@ -217,6 +297,7 @@ class FaultResponse(BaseResponse):
 
     fault: FaultResponse.Fault
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {"fault": self.fault.name}
 
@@ -225,7 +306,7 @@ class FaultResponse(BaseResponse):
         return cls(fault=cls.Fault(cast("str", structure["fault"])))
 
 
-@dataclass
+@dataclass(slots=True)
 class Proxy(BaseResponse):
     """Represents a `Mountebank proxy <http://localhost:2525/docs/api/proxies>`_.
 
@@ -246,6 +327,9 @@ class Proxy(BaseResponse):
     predicate_generators: list[PredicateGenerator] = field(default_factory=list)
     decorate: str | None = None
 
+    _structure_dependencies = ("predicate_generators",)
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         proxy: JsonObject = {"to": str(self.to), "mode": self.mode.value}
         self.add_if_true(proxy, "injectHeaders", self.inject_headers)
@@ -278,7 +362,7 @@ class Proxy(BaseResponse):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class PredicateGenerator(JsonSerializable):
     """Represents a `Mountebank predicate generator <https://localhost:2525/docs/api/proxies#proxy-predicate-generators>`_.
 
@@ -290,6 +374,7 @@ class PredicateGenerator(JsonSerializable):
     operator: Predicate.Operator = Predicate.Operator.EQUALS
     case_sensitive: bool = True
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         matches: JsonObject = {}
         self.add_if_true(matches, "path", self.path)
@@ -309,7 +394,7 @@ class PredicateGenerator(JsonSerializable):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class InjectionResponse(BaseResponse, Injecting):
     """Represents a `Mountebank injection response <http://localhost:2525/docs/api/injection>`_.
 
@@ -321,3 +406,23 @@ class InjectionResponse(BaseResponse, Injecting):
     @classmethod
     def from_structure(cls, structure: JsonObject) -> InjectionResponse:
         return cls(inject=cast("str", structure["inject"]))
+
+
+def _is_from_structure(structure: JsonObject) -> BaseResponse:
+    if "data" in BaseResponse.as_json_object(structure["is"]):
+        return TcpResponse.from_structure(structure)
+    return Response.from_structure(structure)
+
+
+# Response arguments which are fields of its HttpResponse.
+_HTTP_RESPONSE_FIELDS = frozenset(("body", "status_code", "headers", "mode"))
+# Decoder for responses identified by each key.
+_DECODERS: dict[str, Callable[[JsonObject], BaseResponse]] = {
+    "is": _is_from_structure,
+    "proxy": Proxy.from_structure,
+    "inject": InjectionResponse.from_structure,
+    "fault": FaultResponse.from_structure,
+}
+
+# Used by stubs which don't specify responses.
+DEFAULT_RESPONSE = shared_default(Response(http_response=shared_default(HttpResponse())))
@@ -1,19 +1,34 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import Iterable, MutableSequence, Sequence
 from dataclasses import dataclass, field
-from typing import cast
+from typing import Any, cast, overload
 
-from mbtest.imposters.base import JsonObject, JsonSerializable, JsonValue  # noqa: F401
-from mbtest.imposters.predicates import BasePredicate, Predicate
-from mbtest.imposters.responses import BaseResponse, Response
+from mbtest.imposters.base import (  # noqa: F401
+    JsonObject,
+    JsonSerializable,
+    JsonValue,
+    TrackedList,
+    cached_structure,
+    iter_shared,
+    shared_structure,
+)
+from mbtest.imposters.predicates import DEFAULT_PREDICATE, BasePredicate
+from mbtest.imposters.responses import DEFAULT_RESPONSE, BaseResponse
 
+# Keys Mountebank adds to the stubs it returns, which aren't part of their definitions.
+_STATE_KEYS = frozenset(("matches", "_links"))
 
-@dataclass(init=False)
+
+@dataclass(init=False, slots=True)
 class Stub(JsonSerializable):
     """Represents a `Mountebank stub <http://localhost:2525/docs/api/stubs>`_.
     Think of a stub as a behavior, triggered by a matching predicate.
 
+    Stubs are pickled as their Mountebank structure, so an unpickled stub is an equivalent definition, but bodies
+    given as bytes or XML elements come back as the text sent to Mountebank. :func:`copy.copy` and
+    :func:`copy.deepcopy` copy the stub itself, exactly. Use :meth:`clone` for fast, exact copies.
+
     :param predicates: Trigger this stub if one of these predicates matches the request
     :param responses: Use these response behaviors (in order)
     """
@@ -21,18 +36,25 @@ class Stub(JsonSerializable):
     predicates: list[BasePredicate]
     responses: list[BaseResponse]
 
+    _structure_dependencies = ("predicates", "responses")
+
     def __init__(
         self,
         predicates: BasePredicate | Iterable[BasePredicate] | None = None,
         responses: BaseResponse | Iterable[BaseResponse] | None = None,
     ) -> None:
-        self.predicates = self.one_or_many(predicates) or [Predicate()]
-        self.responses = self.one_or_many(responses) or [Response()]
+        self.predicates = self.one_or_many(predicates) or [DEFAULT_PREDICATE]
+        self.responses = self.one_or_many(responses) or [DEFAULT_RESPONSE]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Pickle as the Mountebank structure, which is much quicker than pickling the object graph.
+        return Stub.from_structure, (shared_structure(self),)
 
+    @cached_structure
     def as_structure(self) -> JsonObject:
         return {
-            "predicates": [predicate.as_structure() for predicate in self.predicates],
-            "responses": [response.as_structure() for response in self.responses],
+            "predicates": [predicate.as_structure() for predicate in iter_shared(self.predicates)],
+            "responses": [response.as_structure() for response in iter_shared(self.responses)],
         }
 
     @classmethod
@@ -49,7 +71,7 @@ class Stub(JsonSerializable):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class AddStub(JsonSerializable):
     """Represents a `Mountebank add stub request <http://localhost:2525/docs/api/overview#add-stub>`.
     To add new stab to an existing imposter.
@@ -62,6 +84,9 @@ class AddStub(JsonSerializable):
     stub: Stub = field(default_factory=Stub)
     index: int | None = None
 
+    _structure_dependencies = ("stub",)
+
+    @cached_structure
     def as_structure(self) -> JsonObject:
         structure: JsonObject = {"stub": self.stub.as_structure()}
         if self.index is not None:
@@ -74,3 +99,80 @@ class AddStub(JsonSerializable):
             stub=Stub.from_structure(cls.as_json_object(structure.get("stub", {}))),
             index=cast("int | None", structure.get("index")),
         )
+
+
+class LazyStubs(MutableSequence[Stub]):
+    """A sequence of stubs held as JSON structures, each decoded into a :class:`Stub` only when it's first accessed.
+
+    Stubs which haven't been accessed are serialised by passing their structures straight through, so a large
+    imposter can be loaded from a file or a Mountebank server and posted again without building its object graph.
+
+    :param structures: Stub structures, as found in an imposter's ``stubs`` array. These are kept, not copied -
+        unless they hold state Mountebank adds to the stubs it returns, such as the requests they've matched, which
+        is left out, as it isn't part of their definitions.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, structures: Iterable[JsonObject | Stub] = ()) -> None:
+        self._items: TrackedList[JsonObject | Stub] = TrackedList(map(_without_state, structures))
+
+    @overload
+    def __getitem__(self, index: int) -> Stub: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Stub]: ...
+
+    def __getitem__(self, index: int | slice) -> Stub | list[Stub]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self._items))[index]]
+        item = self._items[index]
+        if isinstance(item, Stub):
+            return item
+        stub = Stub.from_structure(item)
+        # Decoding doesn't change the structure, so bypass TrackedList, leaving cached structures valid.
+        list.__setitem__(self._items, index, stub)
+        return stub
+
+    @overload
+    def __setitem__(self, index: int, value: Stub) -> None: ...
+
+    @overload
+    def __setitem__(self, index: slice, value: Iterable[Stub]) -> None: ...
+
+    def __setitem__(self, index: int | slice, value: Any) -> None:
+        self._items[index] = value
+
+    def __delitem__(self, index: int | slice) -> None:
+        del self._items[index]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def insert(self, index: int, value: Stub) -> None:
+        self._items.insert(index, value)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(mine == theirs for mine, theirs in zip(self, other, strict=False))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def clone(self) -> LazyStubs:
+        """Copy the sequence, cloning any stubs which have been decoded. Stub structures are shared."""
+        return LazyStubs(item.clone() if isinstance(item, Stub) else item for item in self._items)
+
+    def item_structures(self) -> list[JsonObject]:
+        """Structures of the stubs, passing those which haven't been decoded straight through - shared, so read-only
+        (see :func:`~mbtest.imposters.base.shared_structure`)."""
+        return [shared_structure(item) if isinstance(item, Stub) else item for item in self._items]
+
+
+def _without_state(item: JsonObject | Stub) -> JsonObject | Stub:
+    if isinstance(item, Stub) or item.keys().isdisjoint(_STATE_KEYS):
+        return item
+    return {key: value for key, value in item.items() if key not in _STATE_KEYS}
@@ -3,13 +3,19 @@ from __future__ import annotations
 import warnings
 from typing import TYPE_CHECKING, Any, cast
 
-from hamcrest import anything
+from hamcrest import anything, less_than
 from hamcrest.core.base_matcher import BaseMatcher
 from hamcrest.core.core.isanything import IsAnything
+from hamcrest.core.core.isequal import IsEqual
 from hamcrest.core.helpers.wrap_matcher import wrap_matcher
 
+from mbtest.analytics import RequestLog
+from mbtest.imposters.imposters import Imposter
+from mbtest.server import MountebankServer
+from mbtest.store import MailStore, RequestDrainer, RequestStore, find_mail_store
+
 if TYPE_CHECKING:  # pragma: no cover
-    from collections.abc import Mapping, Sequence
+    from collections.abc import Iterable, Mapping, Sequence
 
     from furl import furl
     from hamcrest.core.description import Description
@@ -17,8 +23,7 @@ if TYPE_CHECKING:  # pragma: no cover
     from yarl import URL
 
     from mbtest.imposters.base import JsonObject, JsonValue  # noqa: F401
-    from mbtest.imposters.imposters import Address, HttpRequest, Imposter, SentEmail
-    from mbtest.server import MountebankServer
+    from mbtest.imposters.imposters import Address, HttpRequest, SentEmail
 
 ANYTHING = anything()
 
@@ -52,6 +57,9 @@ def had_request(
 class HadRequest(BaseMatcher):
     """Mountebank server has recorded call matching
 
+    Requests in a :class:`~mbtest.store.RequestStore`, or drained into one by a :class:`~mbtest.store.RequestDrainer`,
+    are queried using the store's indexes where the criteria allow - for a method or path given as a string.
+
     :param method: Request's method matched...
     :param path: Request's path matched...
     :param query: Request's query matched...
@@ -85,6 +93,10 @@ class HadRequest(BaseMatcher):
         self.body: Matcher[str] = wrap_matcher(body)
         self.json: Matcher[JsonObject] = ANYTHING
         self.times: Matcher[int] = wrap_matcher(times)
+        self.rate: Matcher[float] = ANYTHING
+        self.rate_window = 1.0
+        self.all_requests: Sequence[HttpRequest] | None = None
+        self.matching_requests: Sequence[HttpRequest] = []
 
     def describe_to(self, description: Description) -> None:
         if isinstance(self.times, IsAnything):
@@ -101,22 +113,26 @@ class HadRequest(BaseMatcher):
         self.append_matcher_description(self.headers, "headers", description)
         self.append_matcher_description(self.body, "body", description)
         self.append_matcher_description(self.json, "json", description)
+        self.append_matcher_description(self.rate, f"peak rate per {self.rate_window}s window", description)
 
     @staticmethod
     def append_matcher_description(field_matcher: Matcher[Any], field_name: str, description: Description) -> None:
         if not isinstance(field_matcher, IsAnything):
             description.append_text(f" {field_name}: ").append_description_of(field_matcher)
 
-    def describe_mismatch(self, item: Imposter | MountebankServer, mismatch_description: Description) -> None:  # noqa: ARG002
+    def describe_mismatch(self, item: Imposter | MountebankServer, mismatch_description: Description) -> None:
+        if self.all_requests is None:
+            self.all_requests = cast("Sequence[HttpRequest]", item.get_actual_requests())
         mismatch_description.append_text("found ").append_description_of(len(self.matching_requests))
         mismatch_description.append_text(" matching requests: ").append_description_of(self.matching_requests)
         mismatch_description.append_text(". All requests: ").append_description_of(self.all_requests)
+        if not isinstance(self.rate, IsAnything):
+            mismatch_description.append_text(". Peak rate: ").append_description_of(self.peak_rate)
 
     def _matches(self, item: Imposter | MountebankServer) -> bool:
-        self.all_requests = cast("Sequence[HttpRequest]", item.get_actual_requests())
         self.matching_requests = [
             request
-            for request in self.all_requests
+            for request in self._candidates(item)
             if self.method.matches(request.method)
             and self.path.matches(request.path)
             and self.query.matches(request.query)
@@ -125,11 +141,28 @@ class HadRequest(BaseMatcher):
             and self.json.matches(request.json or {})
         ]
 
+        if not isinstance(self.rate, IsAnything):
+            self.peak_rate = RequestLog(self.matching_requests).peak_rate(self.rate_window)
+            if not self.rate.matches(self.peak_rate):
+                return False
+
         if isinstance(self.times, IsAnything):
             return len(self.matching_requests) > 0
 
         return self.times.matches(len(self.matching_requests))
 
+    def _candidates(self, item: Imposter | MountebankServer | RequestStore | RequestDrainer) -> Iterable[HttpRequest]:
+        """Requests which might match - all of them, unless they can be filtered using a store's indexes, in which
+        case all requests are only fetched if they're needed to describe a mismatch."""
+        if isinstance(item, (RequestStore, RequestDrainer)):
+            self.all_requests = None
+            return cast(
+                "Iterable[HttpRequest]",
+                item.iter_actual_requests(method=_indexed(self.method), path=_indexed(self.path)),
+            )
+        self.all_requests = cast("Sequence[HttpRequest]", item.get_actual_requests())
+        return self.all_requests
+
     def with_method(self, method: str | Matcher[str]) -> HadRequest:
         self.method = wrap_matcher(method)
         return self
@@ -179,6 +212,20 @@ class HadRequest(BaseMatcher):
     def and_times(self, times: int | Matcher[int]) -> HadRequest:
         return self.with_times(times)
 
+    def with_rate(self, rate: float | Matcher[float], window: float = 1.0) -> HadRequest:
+        """Peak rate of matching requests, in requests per second over any sliding `window` seconds, matched..."""
+        self.rate = wrap_matcher(rate)
+        self.rate_window = window
+        return self
+
+    def and_rate(self, rate: float | Matcher[float], window: float = 1.0) -> HadRequest:
+        return self.with_rate(rate, window)
+
+    def at_rate_below(self, rate: float, window: float = 1.0) -> HadRequest:
+        """Matching requests never exceeded `rate` requests per second, over any sliding `window` seconds - useful
+        for asserting on client-side rate limiting and batching."""
+        return self.with_rate(less_than(rate), window)
+
 
 def email_sent(
     from_: Address | Matcher[Address] = ANYTHING,
@@ -205,6 +252,10 @@ def email_sent(
 class EmailSent(BaseMatcher):
     """Mountebank SMTP server was asked to sent email matching.
 
+    Email sent to local SMTP imposters (see :class:`mbtest.engine.LocalMountebankServer`) is queried directly from
+    their :class:`~mbtest.store.MailStore`, rather than fetched from the server, using its indexes where the
+    criteria allow - for a recipient, and for a subject given as a string.
+
     :param from_: Email's from field matched...
     :param to: Email's to field matched...
     :param subject: Email's subject field matched...
@@ -224,6 +275,7 @@ class EmailSent(BaseMatcher):
         self.subject: Matcher[str] = wrap_matcher(subject)
         self.to: Matcher[Sequence[Address]] = wrap_matcher(to)
         self.from_: Matcher[Address] = wrap_matcher(from_)
+        self.recipient: str | None = None
 
     def describe_to(self, description: Description) -> None:
         description.append_text("email with")
@@ -234,6 +286,8 @@ class EmailSent(BaseMatcher):
         self._append_matcher_description(description, self.subject, "subject")
         self._append_matcher_description(description, self.to, "to")
         self._append_matcher_description(description, self.from_, "from")
+        if self.recipient is not None:
+            description.append_text(" recipient: ").append_description_of(self.recipient)
 
     @staticmethod
     def _append_matcher_description(description: Description, matcher: Matcher, text: str) -> None:
@@ -249,14 +303,24 @@ class EmailSent(BaseMatcher):
         mismatch_description.append_text(". All emails: ").append_description_of(sent_email)
 
     def _matches(self, item: Imposter | MountebankServer) -> bool:
-        sent_email = self.get_sent_email(item)
-        matching_emails = self.get_matching_emails(sent_email)
+        stores = _mail_stores(item)
+        if stores is None:
+            candidates = self.get_sent_email(item)
+        else:
+            subject = self.subject.object if isinstance(self.subject, IsEqual) else None
+            candidates = [
+                email for store in stores for email in store.iter_sent_email(recipient=self.recipient, subject=subject)
+            ]
+        matching_emails = self.get_matching_emails(candidates)
 
         return len(matching_emails) > 0
 
     @staticmethod
     def get_sent_email(actual) -> Sequence[SentEmail]:
-        return cast("Sequence[SentEmail]", list(actual.get_actual_requests()))
+        stores = _mail_stores(actual)
+        if stores is None:
+            return cast("Sequence[SentEmail]", list(actual.get_actual_requests()))
+        return [email for store in stores for email in store.iter_sent_email()]
 
     def get_matching_emails(self, sent_email) -> Sequence[SentEmail]:
         return [
@@ -266,6 +330,7 @@ class EmailSent(BaseMatcher):
             and self.subject.matches(email.subject)
             and self.to.matches(email.to)
             and self.from_.matches(email.from_)
+            and (self.recipient is None or _sent_to(email, self.recipient))
         ]
 
     def with_from_(self, from_: Address | Matcher[Address]) -> EmailSent:
@@ -295,3 +360,34 @@ class EmailSent(BaseMatcher):
 
     def and_body_text(self, body_text: str | Matcher[str]) -> EmailSent:
         return self.with_body_text(body_text)
+
+    def with_recipient(self, recipient: str) -> EmailSent:
+        """Email was sent to this address - as to, cc, or bcc. Not case-sensitive."""
+        self.recipient = recipient
+        return self
+
+    def and_recipient(self, recipient: str) -> EmailSent:
+        return self.with_recipient(recipient)
+
+
+def _indexed(matcher: Matcher[Any]) -> str | None:
+    """Value a store's index can be queried for, to satisfy a matcher - if it's simply equal to a string."""
+    return matcher.object if isinstance(matcher, IsEqual) and isinstance(matcher.object, str) else None
+
+
+def _sent_to(email: SentEmail, recipient: str) -> bool:
+    lowered = recipient.lower()
+    return any(address.address.lower() == lowered for address in (*email.to, *email.cc, *email.bcc))
+
+
+def _mail_stores(item: object) -> list[MailStore] | None:
+    """Mail stores holding all the email sent to an imposter, to a server's SMTP imposters, or the store itself - or
+    None, if any of it has to be fetched from a server."""
+    if isinstance(item, MountebankServer):
+        imposters: list[object] = [
+            imposter for imposter in item.get_running_imposters() if imposter.protocol == Imposter.Protocol.SMTP
+        ]
+    else:
+        imposters = [item]
+    stores = [find_mail_store(imposter) for imposter in imposters]
+    return None if None in stores else cast("list[MailStore]", stores)
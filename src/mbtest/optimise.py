@@ -0,0 +1,574 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, TypeVar, cast
+
+from mbtest.imposters.base import shared_structure
+from mbtest.imposters.stubs import LazyStubs
+from mbtest.serialisation import loads
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+
+    from mbtest.imposters.base import JsonObject, JsonValue
+    from mbtest.imposters.imposters import Imposter
+    from mbtest.imposters.stubs import Stub
+
+_T = TypeVar("_T")
+
+# Request fields which always hold a single string, so that constraints on them can be reasoned about.
+_FIELDS = frozenset(("method", "path"))
+_OPERATORS = {"equals": "equals", "deepEquals": "equals", "startsWith": "startsWith", "endsWith": "endsWith"}
+# Predicates which select or strip parts of fields before comparing them, so don't constrain the fields themselves.
+_TRANSFORMING = ("xpath", "jsonpath", "except")
+_ALL_OPERATORS = ("equals", "deepEquals", "contains", "startsWith", "endsWith", "matches", "exists")
+# Request fields which are always single values, never arrays or objects.
+_SINGLE_VALUED = frozenset(("method", "path", "body", "data"))
+
+
+@dataclass(frozen=True)
+class StubOrder:
+    """A new order for an imposter's stubs, built by :func:`plan_stub_order`, with the number of stub evaluations it
+    would have taken to serve the requests each stub matched - in the original order, and in the new one.
+
+    Requests which matched no stub are served by evaluating every stub, whatever their order, so aren't counted.
+
+    :param order: Original position of each stub, in the new order.
+    :param hits: Number of requests each stub matched, in the original order.
+    :param evaluations_before: Stub evaluations to serve those requests in the original order.
+    :param evaluations_after: Stub evaluations to serve those requests in the new order.
+    """
+
+    order: tuple[int, ...]
+    hits: tuple[int, ...]
+    evaluations_before: int
+    evaluations_after: int
+
+    @property
+    def changed(self) -> bool:
+        """Whether the new order differs from the original one."""
+        return self.order != tuple(range(len(self.order)))
+
+    @property
+    def reduction(self) -> float:
+        """Proportion of stub evaluations the new order saves."""
+        return 1 - self.evaluations_after / self.evaluations_before if self.evaluations_before else 0.0
+
+    def apply(self, stubs: Sequence[_T]) -> list[_T]:
+        """Put a sequence of stubs, in their original order, into the new order."""
+        return [stubs[index] for index in self.order]
+
+
+def optimise_stub_order(imposter: Imposter, *, apply: bool = True) -> StubOrder:
+    """Reorder the stubs of a running imposter so that those which have matched most requests come first, where doing
+    so can't change which stub any request matches - see :func:`plan_stub_order`.
+
+    Mountebank checks stubs in order until one matches, so a frequently matched stub near the end of a large imposter
+    costs an evaluation of every stub before it, for every request it serves. Hit counts come from the requests
+    Mountebank records each stub as matching, which it only does in debug mode. The new order is applied with a
+    single request, replacing all the stubs, so each starts cycling through its responses from the first again.
+
+    :param imposter: A running imposter.
+    :param apply: Apply the new order to the imposter, if it differs from the current one. If not, it's only planned.
+    :returns: The new order, and the reduction in stub evaluations expected from it.
+    """
+    structures = cast(
+        "list[JsonObject]", loads(imposter.http_client().get(str(imposter.configuration_url)).content)["stubs"]
+    )
+    stubs = LazyStubs(structures)
+    hits = [len(cast("list[JsonValue]", structure.get("matches", []))) for structure in structures]
+    order = plan_stub_order(stubs, hits)
+    if apply and order.changed:
+        imposter.replace_all_stubs(LazyStubs(order.apply(stubs.item_structures())))
+    return order
+
+
+def plan_stub_order(stubs: Sequence[Stub], hits: Sequence[int]) -> StubOrder:
+    """Plan a new order for stubs, putting those which have matched most requests first, wherever that's safe.
+
+    A stub is only moved ahead of another if no request could match both - so every request still matches the stub
+    it matched before. That's decided conservatively, from the method and path constraints of ``equals``,
+    ``deepEquals``, ``startsWith`` and ``endsWith`` predicates, combined with ``and`` and ``or`` - see
+    :func:`stubs_disjoint`. Any other predicate is assumed to overlap with every stub.
+
+    Stubs which define an exact path are only compared with those sharing it, or defining none, so planning a large
+    imposter of exact paths takes time roughly proportional to its size.
+
+    :param stubs: Stubs, in their current order.
+    :param hits: Number of requests each stub has matched - see :meth:`mbtest.imposters.Imposter.query_stub_hits`.
+    :raises ValueError: If there isn't a hit count for each stub.
+    """
+    if len(hits) != len(stubs):
+        msg = f"{len(hits)} hit counts given for {len(stubs)} stubs."
+        raise ValueError(msg)
+    structures = _structures(stubs)
+    constraints = [_stub_constraints(structure) for structure in structures]
+    order = _schedule(_precedence(constraints), hits)
+    return StubOrder(tuple(order), tuple(hits), _evaluations(range(len(hits)), hits), _evaluations(order, hits))
+
+
+def stubs_disjoint(first: Stub, second: Stub) -> bool:
+    """Whether no request could match both of two stubs, as far as can be decided from their method and path
+    constraints - see :func:`plan_stub_order`. If not, they may or may not overlap."""
+    return _disjoint(_stub_constraints(shared_structure(first)), _stub_constraints(shared_structure(second)))
+
+
+@dataclass(frozen=True)
+class DeadStub:
+    """A stub which can never match a request, because an earlier stub matches every request it could.
+
+    :param index: The dead stub's position.
+    :param shadowed_by: Position of the earlier stub which matches every request it could.
+    :param duplicate: The dead stub is an exact duplicate of the earlier one, responses and all.
+    """
+
+    index: int
+    shadowed_by: int
+    duplicate: bool
+
+
+def find_dead_stubs(stubs: Sequence[Stub]) -> list[DeadStub]:
+    """Find stubs which can never match a request, because an earlier stub always wins - such as a stub for
+    ``/orders/1`` after one for paths starting with ``/orders``, or a second stub with the same predicates. Dead stubs
+    still cost Mountebank memory, and time scanning past them.
+
+    Whether one stub's predicates match every request another's do is decided where it can be, so some dead stubs
+    may not be found, but those which are really are dead:
+
+    * Stubs with identical predicates always shadow later ones, whatever their predicates.
+    * ``equals``, ``startsWith``, ``endsWith`` and ``contains`` values imply others on the same field - an exact path
+      implies any prefix of it, for instance - taking case sensitivity into account. ``deepEquals`` is treated as
+      ``equals`` on the method, path and body. Other operators only imply identical ones.
+    * ``and`` and ``or`` predicates, and a ``not`` predicate which no request matching the later stub could match -
+      see :func:`stubs_disjoint`.
+
+    :param stubs: Stubs, in order.
+    :returns: Dead stubs, in order.
+    """
+    structures = _structures(stubs)
+    facts = [_Facts(cast("list[JsonObject]", structure.get("predicates") or [])) for structure in structures]
+    first_with_predicates: dict[object, int] = {}
+    index = _ShadowIndex()
+    dead: dict[int, DeadStub] = {}
+    for position, structure in enumerate(structures):
+        predicates = _frozen(structure.get("predicates") or [])
+        shadowed_by = first_with_predicates.get(predicates)
+        if shadowed_by is None:
+            candidates = index.candidates(facts[position])
+            shadowed_by = next((i for i in candidates if facts[position].implies_all(structures[i])), None)
+        if shadowed_by is not None:
+            # Report the live stub which matches the requests, rather than one which is itself dead.
+            while shadowed_by in dead:
+                shadowed_by = dead[shadowed_by].shadowed_by
+            dead[position] = DeadStub(position, shadowed_by, _frozen(structures[shadowed_by]) == _frozen(structure))
+        first_with_predicates.setdefault(predicates, position)
+        index.add(position, facts[position])
+    return list(dead.values())
+
+
+def remove_dead_stubs(imposter: Imposter) -> list[DeadStub]:
+    """Remove stubs which can never match a request from an imposter's definition - see :func:`find_dead_stubs`.
+    Exact duplicates are merged into the first of them. To remove them from a running imposter, replace its stubs
+    with :meth:`~mbtest.imposters.Imposter.replace_all_stubs` afterwards.
+
+    :param imposter: Imposter, which is modified.
+    :returns: The stubs removed, with their original positions.
+    """
+    dead = find_dead_stubs(imposter.stubs)
+    for stub in reversed(dead):
+        del imposter.stubs[stub.index]
+    return dead
+
+
+class _Facts:
+    """What's certain of every request a stub's predicates match - field constraints it must meet, and alternative
+    sets of them, from ``or`` predicates. ``not`` and injected predicates contribute nothing."""
+
+    __slots__ = ("alternatives", "atoms", "constraints")
+
+    def __init__(self, predicates: list[JsonObject]) -> None:
+        self.atoms: dict[tuple[tuple[str, ...], object], list[_Atom]] = {}
+        self.alternatives: list[list[_Facts]] = []
+        self.constraints = [constraint for predicate in predicates for constraint in _constraints(predicate)]
+        for predicate in predicates:
+            self._add(predicate)
+
+    def _add(self, predicate: JsonObject) -> None:
+        if "and" in predicate:
+            for item in cast("list[JsonObject]", predicate["and"]):
+                self._add(item)
+        elif "or" in predicate:
+            self.alternatives.append([_Facts([item]) for item in cast("list[JsonObject]", predicate["or"])])
+        else:
+            for atom in _atoms(predicate) or ():
+                self.atoms.setdefault((atom.request_field, atom.context), []).append(atom)
+
+    def implies_all(self, stub: JsonObject) -> bool:
+        """Whether every request meeting these facts matches all of a stub's predicates."""
+        return all(self.implies(predicate) for predicate in cast("list[JsonObject]", stub.get("predicates") or []))
+
+    def implies(self, predicate: JsonObject) -> bool:
+        """Whether every request meeting these facts matches a predicate."""
+        for key, implies in _COMBINATOR_IMPLICATIONS.items():
+            if key in predicate:
+                return implies(self, predicate[key])
+        atoms = _atoms(predicate)
+        return atoms is not None and all(self.implies_atom(atom) for atom in atoms)
+
+    def implies_atom(self, atom: _Atom) -> bool:
+        """Whether every request meeting these facts passes a single test."""
+        if any(mine.implies(atom) for mine in self.atoms.get((atom.request_field, atom.context), ())):
+            return True
+        return any(all(facts.implies_atom(atom) for facts in alternatives) for alternatives in self.alternatives)
+
+    def key_atom(self) -> _Atom | None:
+        """The test every request meeting these facts passes which is likely to be the most selective, if any - the
+        one with the longest expected text."""
+        atoms = [atom for atoms in self.atoms.values() for atom in atoms]
+        return max(atoms, key=lambda atom: len(atom.value) if isinstance(atom.value, str) else 0, default=None)
+
+    def all_atoms(self) -> Iterator[_Atom]:
+        """Every test in these facts, including those in alternatives."""
+        for atoms in self.atoms.values():
+            yield from atoms
+        for alternatives in self.alternatives:
+            for facts in alternatives:
+                yield from facts.all_atoms()
+
+
+class _ShadowIndex:
+    """Stubs, by their key tests - see :meth:`_Facts.key_atom`. A stub can only match every request another does if
+    the other's facts imply its key test, so only stubs whose key tests are implied by one of the other's tests, or
+    which have no key test, need be checked."""
+
+    def __init__(self) -> None:
+        self.unkeyed: list[int] = []
+        self.by_atom: dict[_Atom, list[int]] = {}
+        # Stubs with text key tests, by field, context and operator, then by their case folded expected text.
+        self.by_text: dict[tuple[tuple[str, ...], object, str], dict[str, list[int]]] = {}
+
+    def candidates(self, facts: _Facts) -> list[int]:
+        """Stubs which may match every request meeting some facts, in order."""
+        candidates = set(self.unkeyed)
+        for atom in facts.all_atoms():
+            candidates.update(self.by_atom.get(atom, ()))
+            if isinstance(atom.value, str):
+                for operator in _IMPLIED_TEXT_OPERATORS.get(atom.operator, ()):
+                    by_text = self.by_text.get((atom.request_field, atom.context, operator), {})
+                    candidates.update(_TEXT_LOOKUPS[operator](atom.value.lower(), by_text))
+        return sorted(candidates)
+
+    def add(self, position: int, facts: _Facts) -> None:
+        atom = facts.key_atom()
+        if atom is None:
+            self.unkeyed.append(position)
+            return
+        self.by_atom.setdefault(atom, []).append(position)
+        if isinstance(atom.value, str) and atom.operator in _TEXT_LOOKUPS:
+            by_text = self.by_text.setdefault((atom.request_field, atom.context, atom.operator), {})
+            by_text.setdefault(atom.value.lower(), []).append(position)
+
+
+_COMBINATOR_IMPLICATIONS: Mapping[str, Callable[[_Facts, Any], bool]] = {
+    "and": lambda facts, items: all(facts.implies(item) for item in items),
+    "or": lambda facts, items: any(facts.implies(item) for item in items),
+    "not": lambda facts, item: _disjoint(facts.constraints, _constraints(item)),
+    "inject": lambda _, __: False,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class _Atom:
+    """A request field, or a member of one, must meet a single test."""
+
+    operator: str
+    request_field: tuple[str, ...]
+    value: object
+    case_sensitive: bool
+    # Anything else affecting the test - whether keys are case sensitive, and any selector or except pattern.
+    context: object
+
+    def implies(self, other: _Atom) -> bool:
+        """Whether every value passing this test passes another, on the same field and in the same context."""
+        if self == other:
+            return True
+        implies = _TEXT_IMPLICATIONS.get((self.operator, other.operator))
+        if implies is None or not isinstance(self.value, str) or not isinstance(other.value, str):
+            return False
+        if other.case_sensitive:
+            return self.case_sensitive and implies(self.value, other.value)
+        return implies(self.value.lower(), other.value.lower())
+
+
+def _atoms(predicate: JsonObject) -> list[_Atom] | None:
+    """A predicate's tests, one per field it names - or, for objects, per member - or `None` if it's not an operator
+    predicate. For ``deepEquals``, objects are tested whole, and only always single valued fields as ``equals``."""
+    operator = next((key for key in _ALL_OPERATORS if key in predicate), None)
+    if operator is None:
+        return None
+    case_sensitive = bool(predicate.get("caseSensitive", False))
+    context = (
+        bool(predicate.get("keyCaseSensitive", False)),
+        _frozen({key: predicate[key] for key in _TRANSFORMING if key in predicate}),
+    )
+    fields = cast("JsonObject", predicate[operator])
+    if operator == "deepEquals":
+        return [
+            _Atom(_deep_equals_operator(name, value), (name,), _frozen(value), case_sensitive, context)
+            for name, value in fields.items()
+        ]
+    return [_Atom(operator, name, value, case_sensitive, context) for name, value in _leaves(fields, ())]
+
+
+def _deep_equals_operator(name: str, value: object) -> str:
+    return "equals" if name in _SINGLE_VALUED and isinstance(value, str) else "deepEquals"
+
+
+def _leaves(value: object, name: tuple[str, ...]) -> Iterator[tuple[tuple[str, ...], object]]:
+    """Members of an expected object, each of which must match, with the names leading to them."""
+    if isinstance(value, Mapping):
+        for key, item in value.items():
+            yield from _leaves(item, (*name, key))
+    else:
+        yield name, _frozen(value)
+
+
+def _frozen(value: object) -> object:
+    """A hashable equivalent of a JSON value. Strings are kept as they are, for comparison as text."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Mapping):
+        return ("object", tuple(sorted((key, _frozen(item)) for key, item in value.items())))
+    if isinstance(value, list):
+        return ("array", tuple(_frozen(item) for item in value))
+    # Distinguish true from 1, which are equal in Python, but not to Mountebank.
+    return (type(value).__name__, value)
+
+
+def _structures(stubs: Sequence[Stub]) -> list[JsonObject]:
+    return stubs.item_structures() if isinstance(stubs, LazyStubs) else [shared_structure(stub) for stub in stubs]
+
+
+@dataclass(frozen=True, slots=True)
+class _Constraint:
+    """A request field must equal, start with, or end with, one of some values."""
+
+    request_field: str
+    operator: str
+    values: frozenset[str]
+    case_sensitive: bool
+    folded: frozenset[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "folded", frozenset(value.lower() for value in self.values))
+
+    def excludes(self, other: _Constraint) -> bool:
+        """Whether no value could satisfy both constraints."""
+        exclusive = _EXCLUSIVE.get((self.operator, other.operator))
+        if self.request_field != other.request_field or exclusive is None:
+            return False
+        if self.case_sensitive and other.case_sensitive:
+            return all(exclusive(value, other_value) for value in self.values for other_value in other.values)
+        return all(exclusive(value, other_value) for value in self.folded for other_value in other.folded)
+
+
+def _stub_constraints(structure: JsonObject) -> list[_Constraint]:
+    predicates = cast("list[JsonObject]", structure.get("predicates") or [])
+    return [constraint for predicate in predicates for constraint in _constraints(predicate)]
+
+
+def _constraints(predicate: JsonObject) -> list[_Constraint]:
+    """Constraints a request must meet to match a predicate - not all of them, but only ones which are certain."""
+    if "and" in predicate:
+        return [constraint for item in cast("list[JsonObject]", predicate["and"]) for constraint in _constraints(item)]
+    if "or" in predicate:
+        return _alternatives(cast("list[JsonObject]", predicate["or"]))
+    operator = next((key for key in _OPERATORS if key in predicate), None)
+    if operator is None or any(key in predicate for key in _TRANSFORMING):
+        return []
+    case_sensitive = bool(predicate.get("caseSensitive", False))
+    return [
+        _Constraint(name, _OPERATORS[operator], frozenset((value,)), case_sensitive)
+        for name, value in cast("JsonObject", predicate[operator]).items()
+        if name in _FIELDS and isinstance(value, str)
+    ]
+
+
+def _alternatives(predicates: list[JsonObject]) -> list[_Constraint]:
+    """A constraint from an ``or`` predicate - if each alternative constrains the same field in the same way."""
+    alternatives = [_constraints(predicate) for predicate in predicates]
+    if not alternatives or any(len(constraints) != 1 for constraints in alternatives):
+        return []
+    first = alternatives[0][0]
+    if any((item.request_field, item.operator) != (first.request_field, first.operator) for [item] in alternatives):
+        return []
+    values = frozenset(value for [item] in alternatives for value in item.values)
+    return [
+        _Constraint(first.request_field, first.operator, values, all(item.case_sensitive for [item] in alternatives))
+    ]
+
+
+def _disjoint(first: Iterable[_Constraint], second: Iterable[_Constraint]) -> bool:
+    theirs = list(second)
+    return any(mine.excludes(other) for mine in first for other in theirs)
+
+
+def _precedence(constraints: Sequence[list[_Constraint]]) -> list[list[int]]:
+    """For each stub, the earlier stubs it might overlap with, which must stay ahead of it."""
+    index = _PathIndex()
+    predecessors = []
+    for position, mine in enumerate(constraints):
+        key = _path_key(mine)
+        candidates = index.candidates(key) if key is not None else range(position)
+        predecessors.append(sorted({i for i in candidates if not _disjoint(constraints[i], mine)}))
+        index.add(position, key)
+    return predecessors
+
+
+class _PathIndex:
+    """Stubs, by the case folded paths they must equal or start with. Stubs can only overlap if one of those paths is
+    a prefix of the other's, so others needn't be compared."""
+
+    def __init__(self) -> None:
+        self.by_path: dict[str, list[int]] = {}
+        self.paths: list[str] = []  # Sorted, so paths starting with a prefix are found by bisection.
+        self.unkeyed: list[int] = []
+
+    def candidates(self, key: tuple[str, frozenset[str]]) -> set[int]:
+        """Stubs which may overlap with one with the given key - see :func:`_path_key`."""
+        operator, paths = key
+        candidates = set(self.unkeyed)
+        for path in paths:
+            for end in range(1, len(path) + 1):
+                candidates.update(self.by_path.get(path[:end], ()))
+            if operator == "startsWith":
+                for longer in self.paths[bisect_left(self.paths, path) : bisect_left(self.paths, f"{path}\U0010ffff")]:
+                    candidates.update(self.by_path[longer])
+        return candidates
+
+    def add(self, position: int, key: tuple[str, frozenset[str]] | None) -> None:
+        if key is None:
+            self.unkeyed.append(position)
+            return
+        for path in key[1]:
+            if path not in self.by_path:
+                insort(self.paths, path)
+            self.by_path.setdefault(path, []).append(position)
+
+
+def _path_key(constraints: list[_Constraint]) -> tuple[str, frozenset[str]] | None:
+    """The operator, and case folded paths, of a stub's first constraint that its path equal or start with one of
+    some paths, if it has one."""
+    return next(
+        (
+            (constraint.operator, constraint.folded)
+            for constraint in constraints
+            if constraint.request_field == "path" and constraint.operator in ("equals", "startsWith")
+        ),
+        None,
+    )
+
+
+def _schedule(predecessors: list[list[int]], hits: Sequence[int]) -> list[int]:
+    """Order stubs so that each follows those it must, taking the highest priority of those available next - see
+    :func:`_priorities`."""
+    successors = _successors(predecessors)
+    priorities = _priorities(successors, hits)
+    waiting = [len(before) for before in predecessors]
+    available = [(-priorities[index], index) for index, count in enumerate(waiting) if not count]
+    heapq.heapify(available)
+    order = []
+    while available:
+        _, index = heapq.heappop(available)
+        order.append(index)
+        for later in successors[index]:
+            waiting[later] -= 1
+            if not waiting[later]:
+                heapq.heappush(available, (-priorities[later], later))
+    return order
+
+
+def _priorities(successors: list[list[int]], hits: Sequence[int]) -> list[float]:
+    """Each stub's priority - the most hits per stub of any chain of stubs it leads, which can be moved forward
+    together. A rarely hit stub which holds back a frequently hit one is worth moving forward with it."""
+    chains: list[tuple[int, int]] = [(0, 1)] * len(hits)
+    # Stubs only ever follow earlier ones, so going backwards, each stub's successors are done before it.
+    for index in reversed(range(len(hits))):
+        options = [
+            (hits[index] + total, length + 1) for total, length in (chains[later] for later in successors[index])
+        ]
+        chains[index] = max([(hits[index], 1), *options], key=lambda chain: chain[0] / chain[1])
+    return [total / length for total, length in chains]
+
+
+def _successors(predecessors: list[list[int]]) -> list[list[int]]:
+    successors: list[list[int]] = [[] for _ in predecessors]
+    for index, before in enumerate(predecessors):
+        for earlier in before:
+            successors[earlier].append(index)
+    return successors
+
+
+def _evaluations(order: Iterable[int], hits: Sequence[int]) -> int:
+    return sum(position * hits[index] for position, index in enumerate(order, start=1))
+
+
+_EXCLUSIVE: Mapping[tuple[str, str], Callable[[str, str], bool]] = {
+    ("equals", "equals"): lambda mine, theirs: mine != theirs,
+    ("equals", "startsWith"): lambda mine, theirs: not mine.startswith(theirs),
+    ("startsWith", "equals"): lambda mine, theirs: not theirs.startswith(mine),
+    ("equals", "endsWith"): lambda mine, theirs: not mine.endswith(theirs),
+    ("endsWith", "equals"): lambda mine, theirs: not theirs.endswith(mine),
+    ("startsWith", "startsWith"): lambda mine, theirs: not (mine.startswith(theirs) or theirs.startswith(mine)),
+    ("endsWith", "endsWith"): lambda mine, theirs: not (mine.endswith(theirs) or theirs.endswith(mine)),
+}
+
+
+_TEXT_IMPLICATIONS: Mapping[tuple[str, str], Callable[[str, str], bool]] = {
+    ("equals", "equals"): str.__eq__,
+    ("equals", "startsWith"): str.startswith,
+    ("equals", "endsWith"): str.endswith,
+    ("equals", "contains"): lambda mine, theirs: theirs in mine,
+    ("startsWith", "startsWith"): str.startswith,
+    ("startsWith", "contains"): lambda mine, theirs: theirs in mine,
+    ("endsWith", "endsWith"): str.endswith,
+    ("endsWith", "contains"): lambda mine, theirs: theirs in mine,
+    ("contains", "contains"): lambda mine, theirs: theirs in mine,
+}
+# For each text operator, those whose tests it may imply.
+_IMPLIED_TEXT_OPERATORS: Mapping[str, list[str]] = {
+    operator: [implied for mine, implied in _TEXT_IMPLICATIONS if mine == operator]
+    for operator in dict.fromkeys(mine for mine, _ in _TEXT_IMPLICATIONS)
+}
+
+
+def _equal(text: str, by_text: Mapping[str, list[int]]) -> Iterator[int]:
+    yield from by_text.get(text, ())
+
+
+def _prefixes(text: str, by_text: Mapping[str, list[int]]) -> Iterator[int]:
+    for end in range(len(text) + 1):
+        yield from by_text.get(text[:end], ())
+
+
+def _suffixes(text: str, by_text: Mapping[str, list[int]]) -> Iterator[int]:
+    for start in range(len(text) + 1):
+        yield from by_text.get(text[start:], ())
+
+
+def _substrings(text: str, by_text: Mapping[str, list[int]]) -> Iterator[int]:
+    for expected, positions in by_text.items():
+        if expected in text:
+            yield from positions
+
+
+# For each text operator, how to find stubs whose key tests with it a text might imply.
+_TEXT_LOOKUPS: Mapping[str, Callable[[str, Mapping[str, list[int]]], Iterator[int]]] = {
+    "equals": _equal,
+    "startsWith": _prefixes,
+    "endsWith": _suffixes,
+    "contains": _substrings,
+}
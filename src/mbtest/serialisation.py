@@ -0,0 +1,508 @@
+from __future__ import annotations
+
+import codecs
+import gzip
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+from abc import ABC, abstractmethod
+from collections.abc import Mapping, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import partial
+from json import JSONDecodeError
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Final, Literal, cast
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Callable, Iterable, Iterator
+
+    from mbtest.imposters.base import JsonObject, JsonValue
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS: Final[Mapping[str, str]] = {"Content-Type": "application/json"}
+
+
+@dataclass(frozen=True)
+class JsonBackend:
+    """A JSON implementation - see :func:`use_json_backend`.
+
+    :param name: Backend name.
+    :param dumps: Encode a structure to UTF-8 JSON, indented if the second argument is true.
+    :param loads: Decode UTF-8 or text JSON. Errors must be raised as :class:`ValueError`.
+    """
+
+    name: str
+    dumps: Callable[[Any, bool], bytes]
+    loads: Callable[[bytes | str], Any]
+
+
+class StreamingString(ABC):
+    """A string value which is produced a chunk at a time, such as a large response body read from a file.
+
+    :func:`iter_dumps` encodes these as it goes, so they are never held in memory whole. Elsewhere, they are joined
+    and encoded like any other string.
+    """
+
+    @abstractmethod
+    def iter_text(self) -> Iterator[str]:  # pragma: no cover
+        """Produce the string's content.
+
+        :returns: Iterator of chunks of text.
+        """
+        raise NotImplementedError
+
+    def __str__(self) -> str:
+        return "".join(self.iter_text())
+
+
+# While iter_dumps() is encoding, streaming strings are collected here and encoded as placeholders, which are then
+# replaced by the strings' content as the output is written. The placeholders include a random token, so they can't
+# clash with real values.
+_streaming_strings: ContextVar[list[StreamingString] | None] = ContextVar("_streaming_strings", default=None)
+_PLACEHOLDER: Final = f"mbtest-streaming-string-{secrets.token_hex(8)}-"
+_PLACEHOLDER_PATTERN: Final = re.compile(rf'"{_PLACEHOLDER}(\d+)"'.encode("ascii"))
+
+
+def _default(value: Any) -> Any:
+    """Encode mappings and sequences which aren't dicts or lists, such as header multi-dicts, and streaming
+    strings."""
+    if isinstance(value, StreamingString):
+        if (strings := _streaming_strings.get()) is None:
+            return str(value)
+        strings.append(value)
+        return f"{_PLACEHOLDER}{len(strings) - 1}"
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence) and not isinstance(value, str | bytes):
+        return list(value)
+    msg = f"Object of type {type(value).__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def _stdlib_backend() -> JsonBackend:
+    def dumps(structure: Any, indent: bool) -> bytes:  # noqa: FBT001
+        return json.dumps(
+            structure, default=_default, indent=2 if indent else None, separators=None if indent else (",", ":")
+        ).encode("utf-8")
+
+    return JsonBackend("json", dumps, json.loads)
+
+
+def _orjson_backend() -> JsonBackend:
+    import orjson  # noqa: PLC0415
+
+    def dumps(structure: Any, indent: bool) -> bytes:  # noqa: FBT001
+        return orjson.dumps(structure, default=_default, option=orjson.OPT_INDENT_2 if indent else 0)
+
+    return JsonBackend("orjson", dumps, orjson.loads)
+
+
+def _msgspec_backend() -> JsonBackend:
+    import msgspec  # noqa: PLC0415
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    decoder = msgspec.json.Decoder()
+
+    def dumps(structure: Any, indent: bool) -> bytes:  # noqa: FBT001
+        encoded = encoder.encode(structure)
+        return msgspec.json.format(encoded, indent=2) if indent else encoded
+
+    return JsonBackend("msgspec", dumps, decoder.decode)
+
+
+_BACKENDS: Final[Mapping[str, Callable[[], JsonBackend]]] = {
+    "orjson": _orjson_backend,
+    "msgspec": _msgspec_backend,
+    "json": _stdlib_backend,
+}
+
+
+def use_json_backend(name: str | None = None) -> JsonBackend:
+    """Choose the JSON implementation used for all Mountebank admin requests and responses, and for imposter files.
+
+    By default, the first of `orjson <https://pypi.org/project/orjson/>`_ and
+    `msgspec <https://pypi.org/project/msgspec/>`_ which is installed is used, falling back to the standard library's
+    :mod:`json`. The choice can be made with the ``MBTEST_JSON_BACKEND`` environment variable, or by calling this
+    function.
+
+    :param name: ``"orjson"``, ``"msgspec"`` or ``"json"``. If not given, use the fastest available.
+    :returns: The backend now in use.
+    """
+    global _backend  # noqa: PLW0603
+    if name:
+        _backend = _BACKENDS[name]()
+    else:
+        for factory in _BACKENDS.values():
+            try:
+                _backend = factory()
+                break
+            except ImportError:
+                continue
+    logger.debug("Using %s JSON backend.", _backend.name)
+    return _backend
+
+
+_backend: JsonBackend = _stdlib_backend()
+use_json_backend(os.environ.get("MBTEST_JSON_BACKEND"))
+
+
+def dumps(structure: Any, *, indent: bool = False) -> bytes:
+    """Encode a JSON serialisable structure to UTF-8 JSON, using the current backend.
+
+    :param structure: Structure to encode.
+    :param indent: Indent the output, for readability.
+    """
+    return _backend.dumps(structure, indent)
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON using the current backend.
+
+    :raises ValueError: If the data is not valid JSON.
+    """
+    return _backend.loads(data)
+
+
+_RAW_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+_STRING_TAIL = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR_END = re.compile(r"[\s,\]}]")
+
+
+class JsonStreamReader:
+    """Incremental reader for a JSON document arriving in chunks, such as an HTTP response body.
+
+    Values which are skipped are located by scanning for structural characters only, so are never decoded, and at
+    most one value (plus one chunk) is held in memory at a time. Array items which are already buffered are decoded
+    in batches.
+
+    :param chunks: The document, as an iterable of bytes (UTF-8 encoded) or text chunks.
+    """
+
+    def __init__(self, chunks: Iterable[bytes | str]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._mark = 0
+        self._chunks_read = 0
+        self._batch_failed_at = -1
+
+    def peek(self) -> str:
+        """Skip whitespace, and return the next character without consuming it."""
+        while True:
+            self._pos = cast("re.Match[str]", _WHITESPACE.match(self._buffer, self._pos)).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            self._mark = self._pos
+            self._require_more()
+
+    def expect(self, char: str) -> None:
+        """Consume the next non-whitespace character, which must be `char`."""
+        if self.peek() != char:
+            msg = f"Expecting {char!r}"
+            raise JSONDecodeError(msg, self._buffer, self._pos)
+        self._pos += 1
+
+    def read_value(self) -> JsonValue:
+        """Decode and return the next value.
+
+        The value is decoded straight from the buffer. If it's incomplete, at least as much again is read before
+        retrying, so that a large value spanning many chunks isn't parsed too many times.
+        """
+        self.peek()
+        self._mark = self._pos
+        while True:
+            try:
+                value, end = _RAW_DECODER.raw_decode(self._buffer, self._pos)
+            except JSONDecodeError:
+                if not self._grow():
+                    raise
+                continue
+            if self._complete(end) or not self._grow():
+                self._pos = end
+                return cast("JsonValue", value)
+
+    def _complete(self, end: int) -> bool:
+        """Whether the value decoded from here up to `end` can't continue in the next chunk. A number at the end of the
+        buffer might, as might one cut off after what could start its fraction or exponent, such as ``1.`` or ``1e``,
+        which is decoded as just its integer part."""
+        if end == len(self._buffer):
+            return False
+        return self._buffer[self._pos] in '[{"' or _SCALAR_END.match(self._buffer, end) is not None
+
+    def skip_value(self) -> None:
+        """Consume the next value without decoding it."""
+        self._scan_value(keep=False)
+
+    def iter_array(self) -> Iterator[JsonValue]:
+        """Decode the items of the array which is the next value, one at a time."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield from self._read_batch()
+            yield self.read_value()
+            if self.peek() == "]":
+                self._pos += 1
+                return
+            self.expect(",")
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """Iterate over the keys of the object which is the next value.
+
+        After each key is yielded, the caller must consume its value, using :meth:`read_value`, :meth:`skip_value`
+        or :meth:`iter_array`, before resuming iteration.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = cast("str", self.read_value())
+            self.expect(":")
+            yield key
+            if self.peek() == "}":
+                self._pos += 1
+                return
+            self.expect(",")
+
+    def _read_batch(self) -> list[JsonValue]:
+        """Decode, in one go, any complete array items buffered from here, up to and including the last item which is
+        followed by a comma - consuming that comma.
+
+        The last comma at the array's level is found by counting brackets. Brackets inside strings can mislead this,
+        but then the batch is never valid JSON, so decoding fails, and items are read one at a time until the next
+        chunk arrives.
+        """
+        if self._batch_failed_at == self._chunks_read:
+            return []
+        end, depth = len(self._buffer), _depth(self._buffer, self._pos, len(self._buffer))
+        while depth and (comma := self._buffer.rfind(",", self._pos, end)) >= 0:
+            depth -= _depth(self._buffer, comma, end)
+            end = comma
+        if depth or end in (self._pos, len(self._buffer)):
+            return []
+        try:
+            batch = cast("list[JsonValue]", loads(f"[{self._buffer[self._pos : end]}]"))
+        except ValueError:
+            self._batch_failed_at = self._chunks_read
+            return []
+        self._pos = end + 1
+        return batch
+
+    def _scan_value(self, *, keep: bool) -> None:
+        self.peek()
+        self._mark = self._pos
+        if self._buffer[self._pos] not in '[{"':
+            self._scan_scalar()
+            return
+        depth = 0
+        while True:
+            char = self._next_structural(keep=keep)
+            if char == '"':
+                self._scan_string_tail(keep=keep)
+            else:
+                depth += 1 if char in "[{" else -1
+            if depth == 0:
+                return
+
+    def _next_structural(self, *, keep: bool) -> str:
+        while (structural := _STRUCTURAL.search(self._buffer, self._pos)) is None:
+            self._pos = len(self._buffer)
+            self._release(keep=keep)
+            self._require_more()
+        self._pos = structural.end()
+        return structural.group()
+
+    def _scan_string_tail(self, *, keep: bool) -> None:
+        while (string_tail := _STRING_TAIL.match(self._buffer, self._pos)) is None:
+            self._release(keep=keep)
+            self._require_more()
+        self._pos = string_tail.end()
+
+    def _scan_scalar(self) -> None:
+        while (end := _SCALAR_END.search(self._buffer, self._pos)) is None:
+            self._pos = len(self._buffer)
+            if not self._more():
+                return
+        self._pos = end.start()
+
+    def _release(self, *, keep: bool) -> None:
+        if not keep:
+            self._mark = self._pos
+
+    def _require_more(self) -> None:
+        if not self._more():
+            msg = "Unexpected end of JSON document"
+            raise JSONDecodeError(msg, self._buffer, len(self._buffer))
+
+    def _grow(self) -> bool:
+        """Read until the text buffered from the mark has doubled, or the document ends."""
+        wanted = 2 * (len(self._buffer) - self._mark)
+        grown = False
+        while len(self._buffer) - self._mark < wanted and self._more():
+            grown = True
+        return grown
+
+    def _more(self) -> bool:
+        """Read the next chunk, discarding any buffered text before the mark."""
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                self._chunks_read += 1
+                self._buffer = self._buffer[self._mark :] + text
+                self._pos -= self._mark
+                self._mark = 0
+                return True
+        return False
+
+
+def _depth(text: str, start: int, end: int) -> int:
+    """Change in bracket nesting depth over a slice of text, ignoring the possibility of brackets in strings."""
+    return (
+        text.count("[", start, end)
+        + text.count("{", start, end)
+        - text.count("]", start, end)
+        - text.count("}", start, end)
+    )
+
+
+def iter_json_array(chunks: Iterable[bytes | str], key: str) -> Iterator[JsonValue]:
+    """Lazily decode the items of the array held under `key` in a JSON object which arrives in chunks.
+
+    Other members of the object are skipped without being decoded, and reading stops as soon as the array is
+    exhausted. If there is no such key, nothing is yielded.
+
+    :param chunks: The JSON object, as an iterable of bytes (UTF-8 encoded) or text chunks.
+    :param key: Key of the array to decode.
+    :returns: Iterator of array items.
+    """
+    reader = JsonStreamReader(chunks)
+    for name in reader.iter_object_keys():
+        if name == key:
+            yield from reader.iter_array()
+            return
+        reader.skip_value()
+
+
+CHUNK_SIZE: Final = 1 << 20
+_BATCH_SIZE: Final = 1000
+
+
+def iter_dumps(structure: Mapping[str, Any], *, indent: bool = False) -> Iterator[bytes]:
+    """Encode a JSON object piece by piece, encoding the items of any array members a batch at a time, and any
+    :class:`StreamingString` values a chunk at a time.
+
+    The output is the same as :func:`dumps`, but a large object, such as an imposter with many stubs or with large
+    file-backed response bodies, can be written without ever holding its whole encoding in memory.
+
+    :param structure: Object to encode.
+    :param indent: Indent the output, for readability.
+    """
+    newline, separator = (b"\n  ", b": ") if indent else (b"", b":")
+    yield b"{"
+    for i, (key, value) in enumerate(structure.items()):
+        yield (b"," if i else b"") + newline + dumps(key) + separator
+        if isinstance(value, list) and value:
+            yield b"["
+            for start in range(0, len(value), _BATCH_SIZE):
+                if start:
+                    yield b","
+                # Encode a batch as an array, then strip the brackets.
+                yield from _iter_encoded(value[start : start + _BATCH_SIZE], indent=indent, newline=newline, strip=True)
+            yield newline + b"]"
+        else:
+            yield from _iter_encoded(value, indent=indent, newline=newline, strip=False)
+    yield b"\n}" if indent and structure else b"}"
+
+
+def _iter_encoded(value: Any, *, indent: bool, newline: bytes, strip: bool) -> Iterator[bytes]:
+    """Encode a value, re-indented to sit within an object, and with any streaming strings streamed in."""
+    strings: list[StreamingString] = []
+    token = _streaming_strings.set(strings)
+    try:
+        encoded = dumps(value, indent=indent)
+    finally:
+        _streaming_strings.reset(token)
+    if strip:
+        encoded = encoded[1:-1].rstrip(b"\n")
+    if indent:
+        encoded = encoded.replace(b"\n", newline)
+    start = 0
+    for placeholder in _PLACEHOLDER_PATTERN.finditer(encoded) if strings else ():
+        yield encoded[start : placeholder.start()] + b'"'
+        for text in strings[int(placeholder.group(1))].iter_text():
+            yield dumps(text)[1:-1]
+        yield b'"'
+        start = placeholder.end()
+    yield encoded[start:]
+
+
+def open_json_file(path: Path | str, mode: Literal["rb", "wb"]) -> BinaryIO:
+    """Open a JSON file, compressed according to its extension - ``.gz`` for gzip or ``.zst`` for
+    `Zstandard <https://facebook.github.io/zstd/>`_.
+
+    Zstandard support requires Python 3.14, or the `zstandard <https://pypi.org/project/zstandard/>`_ package, which
+    can be installed with the ``zstd`` extra: ``pip install mbtest[zstd]``.
+
+    :param path: File path.
+    :param mode: ``"rb"`` or ``"wb"``.
+    """
+    suffix = Path(path).suffix
+    if suffix == ".gz":
+        return cast("BinaryIO", gzip.open(path, mode))
+    if suffix == ".zst":
+        return _open_zstd(path, mode)
+    return cast("BinaryIO", Path(path).open(mode))
+
+
+def _open_zstd(path: Path | str, mode: Literal["rb", "wb"]) -> BinaryIO:
+    if sys.version_info >= (3, 14):  # pragma: no cover
+        from compression import zstd  # noqa: PLC0415
+
+        return cast("BinaryIO", zstd.open(path, mode))
+    try:
+        import zstandard  # noqa: PLC0415
+    except ImportError as e:  # pragma: no cover
+        msg = "Zstandard compressed files require Python 3.14 or later, or zstandard - install mbtest[zstd]."
+        raise ImportError(msg) from e
+    return cast("BinaryIO", zstandard.open(path, mode))
+
+
+def dump_file(structure: Mapping[str, Any], path: Path | str, *, indent: bool = True) -> None:
+    """Write a JSON object to a file, streaming it a piece at a time - see :func:`iter_dumps`. The file is compressed
+    according to its extension - see :func:`open_json_file`.
+
+    :param structure: Object to write.
+    :param path: File path.
+    :param indent: Indent the output, for readability.
+    """
+    with open_json_file(path, "wb") as file:
+        for chunk in iter_dumps(structure, indent=indent):
+            file.write(chunk)
+
+
+def load_file(path: Path | str) -> JsonObject:
+    """Read a JSON object from a file, streaming it a chunk at a time. The file is decompressed according to its
+    extension - see :func:`open_json_file`.
+
+    Each member's value, and each item of array members, is decoded separately, so the whole file is never held in
+    memory at once.
+
+    :param path: File path.
+    :returns: Decoded object.
+    """
+    with open_json_file(path, "rb") as file:
+        reader = JsonStreamReader(iter(partial(file.read, CHUNK_SIZE), b""))
+        return {
+            key: list(reader.iter_array()) if reader.peek() == "[" else reader.read_value()
+            for key in reader.iter_object_keys()
+        }
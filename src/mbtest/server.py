@@ -3,27 +3,34 @@ from __future__ import annotations
 import logging
 import subprocess  # nosec
 import time
-from collections import abc
+from collections import abc, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import partial
 from operator import attrgetter
 from threading import Lock
-from typing import TYPE_CHECKING, ClassVar, Final
+from typing import TYPE_CHECKING, ClassVar, Final, TypeVar, cast
 
 import httpx2 as httpx
 from yarl import URL
 
+from mbtest.compaction import compact_imposter
 from mbtest.imposters import Imposter
-from mbtest.util import find_mountebank_executable
+from mbtest.imposters.base import shared_structure, streaming_structures
+from mbtest.serialisation import JSON_HEADERS, dumps, iter_dumps, loads
+from mbtest.util import default_client, find_mountebank_executable
 
 if TYPE_CHECKING:  # pragma: no cover
-    from collections.abc import Iterable, MutableSequence, Sequence
+    from collections.abc import Callable, Iterable, Iterator, MutableSequence, Sequence
     from pathlib import Path
     from types import TracebackType
 
     from _pytest.fixtures import FixtureRequest
 
+    from mbtest.imposters.base import JsonObject, JsonValue
     from mbtest.imposters.imposters import Request
 
 logger = logging.getLogger(__name__)
+_T = TypeVar("_T")
 
 DEFAULT_MB_EXECUTABLE: Final[Path] = find_mountebank_executable()
 
@@ -114,6 +121,8 @@ class MountebankServer:
     :param scheme: Server scheme, if not `http`.
     :param host: Server host, if not `localhost`.
     :param imposters_path: Imposters path, if not `imposters`.
+    :param client: Client to reach the server, and the imposters added to it, with. A shared default client is used
+        if not given.
 
     """
 
@@ -123,11 +132,14 @@ class MountebankServer:
         scheme: str = "http",
         host: str = "localhost",
         imposters_path: str = "imposters",
+        *,
+        client: httpx.Client | None = None,
     ):
         self.server_port = port
         self.host = host
         self.scheme = scheme
         self.imposters_path = imposters_path
+        self.client = default_client() if client is None else client
         self._running_imposters: MutableSequence[Imposter] = []
 
     def __call__(self, imposters: Imposter | Iterable[Imposter]) -> MountebankServer:
@@ -143,25 +155,88 @@ class MountebankServer:
     ) -> None:
         self.delete_imposters()
 
-    def add_imposters(self, definition: Imposter | Iterable[Imposter]) -> None:
+    def add_imposters(self, definition: Imposter | Iterable[Imposter], *, compact: bool = True) -> None:
         """Add imposters to Mountebank server.
 
         :param definition: One or more Imposters.
+        :param compact: Compact the imposters' definitions - see :meth:`add_impostor`.
         """
         if isinstance(definition, abc.Iterable):
             for imposter in definition:
-                self.add_imposters(imposter)
+                self.add_imposters(imposter, compact=compact)
         else:
-            self.add_impostor(definition)
+            self.add_impostor(definition, compact=compact)
 
-    def add_impostor(self, definition: Imposter) -> None:
+    def add_impostor(self, definition: Imposter, *, compact: bool = True) -> None:
         """Add single imposter to Mountebank server.
 
-        :param definition: One or more Imposters."""
-        json = definition.as_structure()
-        post = httpx.post(str(self.server_url), json=json)
+        :param definition: One or more Imposters.
+        :param compact: Leave out of the definition posted anything which makes no difference to Mountebank, such as
+            empty behaviors, and fold runs of identical responses together - see
+            :func:`mbtest.compaction.compact_imposter`."""
+        with streaming_structures():
+            structure = shared_structure(definition)
+        self._post_imposter(definition, compact_imposter(structure) if compact else structure)
+
+    def add_impostor_in_batches(
+        self,
+        definition: Imposter,
+        *,
+        batch_size: int = 1000,
+        concurrency: int = 1,
+        order_independent: bool = False,
+        progress: Callable[[int, int], None] | None = None,
+        compact: bool = True,
+    ) -> None:
+        """Add an imposter with very many stubs to Mountebank a batch at a time, rather than in one large request which
+        may exceed Mountebank's, or a proxy's, limits. The imposter is created with its first batch of stubs, and the
+        rest are appended through its stubs endpoint, a stub per request.
+
+        No more than ``concurrency`` stubs are in flight at once, and appending stops at the first failure, leaving the
+        imposter running with the stubs added so far. Call again with the same imposter to resume - the stubs
+        Mountebank holds are counted, and the rest appended. That's only exact when appending one stub at a time, as a
+        stub appended alongside the one which failed may have been added after it.
+
+        Mountebank responds to each stub appended with the whole imposter, so appending gets slower as the imposter
+        grows. Those responses are closed unread.
+
+        :param definition: Imposter.
+        :param batch_size: Stubs to create the imposter with, and to append between progress reports.
+        :param concurrency: Stubs to append at once. Stubs appended at once may be added in any order, so more than one
+            may only be appended at once where ``order_independent`` is given.
+        :param order_independent: The caller asserts that the order of the imposter's stubs doesn't matter - that no
+            request matches more than one, say - see :func:`mbtest.optimise.stubs_disjoint`.
+        :param progress: Called with the number of stubs added so far, and the total, once the imposter is created and
+            after each batch is appended.
+        :param compact: Compact the imposter's definition - see :meth:`add_impostor`.
+        :raises ValueError: If appending more than one stub at once, without asserting that their order doesn't
+            matter.
+        """
+        if concurrency > 1 and not order_independent:
+            msg = "Stubs appended at once may be added in any order, so only where order_independent is asserted."
+            raise ValueError(msg)
+        with streaming_structures():
+            structure = shared_structure(definition)
+        structure = compact_imposter(structure) if compact else structure
+        stubs = cast("list[JsonObject]", structure.get("stubs", []))
+        if any(imposter is definition for imposter in self._running_imposters):
+            added = len(loads(self.client.get(str(definition.configuration_url)).content)["stubs"])
+        else:
+            self._post_imposter(definition, {**structure, "stubs": cast("list[JsonValue]", stubs[:batch_size])})
+            added = min(batch_size, len(stubs))
+        report = progress or (lambda _, __: None)
+        report(added, len(stubs))
+        with ThreadPoolExecutor(concurrency) as executor:
+            append = partial(_append_stub, self.client, f"{definition.configuration_url}/stubs")
+            for start in range(added, len(stubs), batch_size):
+                batch = stubs[start : start + batch_size]
+                _run_bounded(executor, append, batch, concurrency)
+                report(start + len(batch), len(stubs))
+
+    def _post_imposter(self, definition: Imposter, structure: JsonObject) -> None:
+        post = self.client.post(str(self.server_url), content=iter_dumps(structure), headers=JSON_HEADERS)
         post.raise_for_status()
-        definition.attach(self.host, post.json()["port"], self.server_url)
+        definition.attach(self.host, loads(post.content)["port"], self.server_url, self.client)
         self._running_imposters.append(definition)
 
     def delete_imposters(self) -> None:
@@ -171,7 +246,7 @@ class MountebankServer:
 
     def delete_impostor(self, imposter: Imposter) -> None:
         """Delete impostor from server."""
-        httpx.delete(str(imposter.configuration_url)).raise_for_status()
+        self.client.delete(str(imposter.configuration_url)).raise_for_status()
         self._running_imposters = [
             i for i in self._running_imposters if i.configuration_url != imposter.configuration_url
         ]
@@ -182,20 +257,24 @@ class MountebankServer:
             actual_requests += imposter.get_actual_requests()
         return actual_requests
 
+    def iter_actual_requests(self) -> Iterator[Request]:
+        """Lazily yield the requests recorded by all running imposters - see :meth:`Imposter.iter_actual_requests`."""
+        for imposter in self._running_imposters:
+            yield from imposter.iter_actual_requests()
+
     @property
     def server_url(self) -> URL:
         return URL.build(scheme=self.scheme, host=self.host or "", port=self.server_port or 0) / self.imposters_path
 
     def query_all_imposters(self) -> Sequence[Imposter]:
         """Yield all imposters running on the server, including those defined elsewhere."""
-        server_info = httpx.get(str(self.server_url))
-        imposters_structure = server_info.json()["imposters"]
+        server_info = self.client.get(str(self.server_url))
+        imposters_structure = loads(server_info.content)["imposters"]
         all_imposters: MutableSequence[Imposter] = []
         for imposter_structure in imposters_structure:
             impostor_url = imposter_structure["_links"]["self"]["href"]
-            imposter = Imposter.from_structure(httpx.get(str(impostor_url)).json())
-            imposter.host = self.host
-            imposter.server_url = self.server_url
+            imposter = Imposter.from_structure(loads(self.client.get(str(impostor_url)).content))
+            imposter.attach(self.host, cast("int", imposter.port), self.server_url, self.client)
             all_imposters.append(imposter)
         return sorted(all_imposters, key=attrgetter("port"))
 
@@ -210,11 +289,10 @@ class MountebankServer:
         :returns: A new Imposter object populated with the recorded stubs.
         """
         url = imposter.configuration_url % {"replayable": "true", "removeProxies": "true"}
-        response = httpx.get(str(url))
+        response = self.client.get(str(url))
         response.raise_for_status()
-        result = Imposter.from_structure(response.json())
-        result.host = self.host
-        result.server_url = self.server_url
+        result = Imposter.from_structure(loads(response.content))
+        result.attach(self.host, cast("int", result.port), self.server_url, self.client)
         return result
 
     def import_running_imposters(self) -> None:
@@ -228,6 +306,23 @@ class MountebankServer:
         return self._running_imposters
 
 
+def _append_stub(client: httpx.Client, url: str, stub: JsonObject) -> None:
+    # Mountebank responds with the whole imposter, which isn't needed, so isn't read.
+    with client.stream("POST", url, content=dumps({"stub": stub}), headers=JSON_HEADERS) as response:
+        response.raise_for_status()
+
+
+def _run_bounded(executor: Executor, task: Callable[[_T], object], items: Iterable[_T], limit: int) -> None:
+    """Run a task for each of some items, no more than a limited number at once, stopping at the first failure."""
+    pending: deque[Future[object]] = deque()
+    for item in items:
+        if len(pending) == limit:
+            pending.popleft().result()
+        pending.append(executor.submit(task, item))
+    for future in pending:
+        future.result()
+
+
 class ExecutingMountebankServer(MountebankServer):
     """A Mountebank mock server, running one or more imposters, one for each domain being mocked.
 
@@ -316,7 +411,7 @@ class ExecutingMountebankServer(MountebankServer):
 
         while time.time() - start_time < timeout:
             try:
-                response = httpx.get(str(self.server_url))
+                response = self.client.get(str(self.server_url))
                 response.raise_for_status()
             except httpx.HTTPError:
                 started = False
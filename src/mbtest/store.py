@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from collections import abc, defaultdict
+from itertools import islice
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, cast
+
+import httpx2 as httpx
+
+from mbtest.imposters.imposters import Request
+from mbtest.serialisation import dumps, iter_json_array, loads
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Iterable, Iterator, Sequence
+    from pathlib import Path
+    from types import TracebackType
+
+    from mbtest.imposters.base import JsonObject, JsonValue
+    from mbtest.imposters.imposters import Imposter, SentEmail
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY,
+    imposter INTEGER,
+    method TEXT,
+    path TEXT,
+    timestamp TEXT,
+    json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_path ON requests (path);
+CREATE INDEX IF NOT EXISTS requests_method ON requests (method);
+CREATE INDEX IF NOT EXISTS requests_timestamp ON requests (timestamp);
+"""
+# Requests stored, or read back, while holding the store's lock at once.
+_BATCH_SIZE = 1000
+
+
+class RequestStore:
+    """Local `SQLite <https://docs.python.org/3/library/sqlite3.html>`_ store of recorded requests, indexed on path,
+    method and timestamp.
+
+    The store can be used in place of an imposter or server with the :func:`mbtest.matchers.had_request` and
+    :func:`mbtest.matchers.email_sent` matchers. It is usually filled by a :class:`RequestDrainer`.
+
+    :param path: Database file. By default, the store is held in memory.
+    """
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._lock = Lock()
+
+    def add(self, requests: Iterable[JsonValue], imposter: int | None = None) -> int:
+        """Store requests, as recorded by Mountebank.
+
+        :param requests: Request structures, as found in an imposter's ``requests`` array.
+        :param imposter: Port of the imposter which recorded them.
+        :returns: Number of requests stored.
+        """
+        remaining = iter(cast("Iterable[JsonObject]", requests))
+        stored = 0
+        # Requests are read - perhaps from the network - a batch at a time, without holding the lock.
+        while rows := [
+            (
+                imposter,
+                request.get("method"),
+                request.get("path"),
+                request.get("timestamp"),
+                dumps(request).decode("utf-8"),
+            )
+            for request in islice(remaining, _BATCH_SIZE)
+        ]:
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    "INSERT INTO requests (imposter, method, path, timestamp, json) VALUES (?, ?, ?, ?, ?)", rows
+                )
+            stored += len(rows)
+        return stored
+
+    def get_actual_requests(self) -> Sequence[Request]:
+        return list(self.iter_actual_requests())
+
+    def iter_actual_requests(
+        self,
+        *,
+        method: str | None = None,
+        path: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        imposter: int | None = None,
+    ) -> Iterator[Request]:
+        """Yield stored requests, in the order they were recorded, optionally filtered using the indexes.
+
+        :param method: Only requests with this HTTP method.
+        :param path: Only requests for this path.
+        :param since: Only requests recorded at or after this ISO 8601 timestamp.
+        :param until: Only requests recorded before this ISO 8601 timestamp.
+        :param imposter: Only requests recorded by the imposter on this port.
+        """
+        filters = [
+            (clause, parameter)
+            for clause, parameter in [
+                ("method = ?", method),
+                ("path = ?", path),
+                ("timestamp >= ?", since),
+                ("timestamp < ?", until),
+                ("imposter = ?", imposter),
+            ]
+            if parameter is not None
+        ]
+        where = "".join(f" AND {clause}" for clause, _ in filters)
+        parameters = [parameter for _, parameter in filters]
+        # Rows are read a batch at a time, so the lock isn't held while the caller works through them.
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT id, json FROM requests WHERE id > ?{where} ORDER BY id LIMIT ?",  # noqa: S608
+                    [last, *parameters, _BATCH_SIZE],
+                ).fetchall()
+            if not rows:
+                return
+            for _, json in rows:
+                yield Request.from_json(loads(json))
+            last = rows[-1][0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class RequestDrainer:
+    """Periodically move recorded requests from Mountebank into a local :class:`RequestStore`, in a background thread.
+
+    Each drain fetches an imposter's recorded requests, streaming those not already drained into the store, so
+    assertions can be made against the store rather than fetching and decoding every recorded request from Mountebank
+    for each one. The :func:`mbtest.matchers.had_request` matcher queries the store using its indexes where the
+    criteria allow - for a method or path given as a string.
+
+    Use as follows::
+
+        with mock_server(imposter), RequestDrainer(imposter, interval=5) as drainer:
+            ...  # Long-running test
+            assert_that(drainer, had_request().with_path("/test").and_method("GET"))
+
+    Requests are drained from where the last drain stopped, counting those already drained, so this relies on nothing
+    else deleting an imposter's recorded requests while it's drained.
+
+    If draining in the background fails other than with an HTTP error, which is logged and retried at the next
+    interval, the thread stops, and the error is raised by the next call to :meth:`drain` or :meth:`stop`.
+
+    :param imposters: One or more Imposters to drain. They must be attached to a running server.
+    :param store: Store to drain requests into. A new in-memory store is used by default.
+    :param interval: Seconds between drains.
+    :param delete: Delete recorded requests from Mountebank after each drain. Mountebank keeps recorded requests in
+        memory until the imposter is deleted, so in long-running soak tests its memory use grows without limit - but
+        it can't fetch and delete recorded requests in one operation, so any request recorded between the two is
+        lost. Only delete where that doesn't matter.
+    """
+
+    def __init__(
+        self,
+        imposters: Imposter | Iterable[Imposter],
+        store: RequestStore | None = None,
+        interval: float = 1.0,
+        *,
+        delete: bool = False,
+    ) -> None:
+        self.imposters = list(imposters) if isinstance(imposters, abc.Iterable) else [imposters]
+        self.store = store or RequestStore()
+        self.interval = interval
+        self.delete = delete
+        # Requests drained so far, and still held by Mountebank, by imposter port.
+        self._drained: dict[int | None, int] = defaultdict(int)
+        self._stopping = Event()
+        self._thread: Thread | None = None
+        self._drain_lock = Lock()
+        self._failure: Exception | None = None
+
+    def __enter__(self) -> RequestDrainer:
+        self.start()
+        return self
+
+    def __exit__(
+        self, ex_type: type[BaseException] | None, ex_value: BaseException | None, ex_traceback: TracebackType | None
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Start draining in a background thread."""
+        self._stopping.clear()
+        self._thread = Thread(target=self._run, name="mbtest-request-drainer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread, after a final drain."""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+    def drain(self) -> int:
+        """Move requests recorded so far into the store.
+
+        :returns: Number of requests moved.
+        :raises Exception: If draining in the background failed since the last call.
+        """
+        if (failure := self._failure) is not None:
+            self._failure = None
+            raise failure
+        with self._drain_lock:
+            drained = sum(self._drain_imposter(imposter) for imposter in self.imposters)
+            logger.debug("Drained %s requests.", drained)
+            return drained
+
+    def _drain_imposter(self, imposter: Imposter) -> int:
+        skip = self._drained[imposter.port]
+        with imposter.http_client().stream("GET", str(imposter.configuration_url)) as response:
+            response.raise_for_status()
+            requests = iter_json_array(response.iter_bytes(), "requests")
+            drained = self.store.add(islice(requests, skip, None), imposter.port)
+        if self.delete:
+            imposter.delete_saved_requests()
+        else:
+            self._drained[imposter.port] = skip + drained
+        return drained
+
+    def get_actual_requests(self) -> Sequence[Request]:
+        self.drain()
+        return self.store.get_actual_requests()
+
+    def iter_actual_requests(self, *, method: str | None = None, path: str | None = None) -> Iterator[Request]:
+        """Drain, then yield stored requests, optionally filtered using the store's indexes.
+
+        :param method: Only requests with this HTTP method.
+        :param path: Only requests for this path.
+        """
+        self.drain()
+        return self.store.iter_actual_requests(method=method, path=path)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.drain()
+            except httpx.HTTPError:
+                logger.exception("Failed to drain recorded requests.")
+            except Exception as e:  # noqa: BLE001 - Raised again by the next drain or stop.
+                self._failure = e
+                return
+
+
+class MailStore:
+    """In-memory store of sent email, indexed on recipient and subject.
+
+    Local SMTP imposters (see :class:`mbtest.engine.LocalMountebankServer`) record email straight into a mail store,
+    decoding each message once, as it's received. The :func:`mbtest.matchers.email_sent` matcher finds an imposter's
+    store with :func:`find_mail_store`, and queries it directly rather than fetching and decoding every recorded email
+    from the server for each assertion. A store can also be used in place of an imposter or server with the matcher.
+    """
+
+    def __init__(self) -> None:
+        self._emails: list[SentEmail] = []
+        self._by_recipient: dict[str, list[int]] = defaultdict(list)
+        self._by_subject: dict[str, list[int]] = defaultdict(list)
+        self._lock = Lock()
+
+    def add(self, email: SentEmail) -> None:
+        with self._lock:
+            index = len(self._emails)
+            self._emails.append(email)
+            for recipient in {address.address.lower() for address in (*email.to, *email.cc, *email.bcc)}:
+                self._by_recipient[recipient].append(index)
+            self._by_subject[email.subject].append(index)
+
+    def get_actual_requests(self) -> Sequence[Request]:
+        return list(self.iter_sent_email())
+
+    def iter_sent_email(self, *, recipient: str | None = None, subject: str | None = None) -> Iterator[SentEmail]:
+        """Yield stored email, in the order it was sent, optionally filtered using the indexes.
+
+        :param recipient: Only email sent to this address - as to, cc, or bcc. Not case-sensitive.
+        :param subject: Only email with exactly this subject.
+        """
+        with self._lock:
+            emails = self._emails
+            candidates = [
+                set(self._by_recipient.get(recipient.lower(), ())) if recipient is not None else None,
+                set(self._by_subject.get(subject, ())) if subject is not None else None,
+            ]
+            indexes = [index for index in candidates if index is not None]
+            selected = sorted(set.intersection(*indexes)) if indexes else range(len(emails))
+            matching = [emails[index] for index in selected]
+        yield from matching
+
+    def clear(self) -> None:
+        with self._lock:
+            self._emails = []
+            self._by_recipient.clear()
+            self._by_subject.clear()
+
+    def __len__(self) -> int:
+        return len(self._emails)
+
+
+# Mail stores of running local SMTP imposters, by configuration URL.
+_mail_stores: dict[str, MailStore] = {}
+
+
+def attach_mail_store(configuration_url: str, store: MailStore) -> None:
+    """Make a mail store available to :func:`find_mail_store`, for the imposter with this configuration URL."""
+    _mail_stores[configuration_url] = store
+
+
+def detach_mail_store(configuration_url: str) -> None:
+    _mail_stores.pop(configuration_url, None)
+
+
+def find_mail_store(item: object) -> MailStore | None:
+    """The mail store holding email sent to an imposter, if it's a local SMTP imposter, or the item itself, if it's a
+    mail store."""
+    if isinstance(item, MailStore):
+        return item
+    if not getattr(item, "attached", False):
+        return None
+    return _mail_stores.get(str(cast("Imposter", item).configuration_url))
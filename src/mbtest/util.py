@@ -1,8 +1,12 @@
+import atexit
 import logging
 import os
 import platform
+from functools import cache
 from pathlib import Path
 
+import httpx2 as httpx
+
 DEFAULT_MB_PATH = Path("node_modules") / ".bin"
 
 logger = logging.getLogger(__name__)
@@ -21,3 +25,11 @@ def find_mountebank_executable() -> Path:
     mountebank_executable = DEFAULT_MB_PATH / default_mb_name
     logger.info("Using mountebank executable %s", mountebank_executable)
     return mountebank_executable
+
+
+@cache
+def default_client() -> httpx.Client:
+    """Client shared by servers and imposters which aren't given one of their own, closed when the interpreter exits."""
+    client = httpx.Client()
+    atexit.register(client.close)
+    return client
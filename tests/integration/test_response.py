@@ -46,7 +46,7 @@ def test_headers(mock_server):
 
 
 def test_binary_mode(mock_server):
-    imposter = Imposter(Stub(responses=Response(mode=Response.Mode.BINARY, body=b"c2F1c2FnZXM=")))
+    imposter = Imposter(Stub(responses=Response(mode=Response.Mode.BINARY, body=b"sausages")))
 
     with mock_server(imposter):
         response = httpx.get(str(imposter.url))
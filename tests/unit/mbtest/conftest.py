@@ -0,0 +1,10 @@
+import pytest
+
+from mbtest.engine import LocalMountebankServer
+
+
+@pytest.fixture
+def local_server():
+    server = LocalMountebankServer()
+    yield server
+    server.close()
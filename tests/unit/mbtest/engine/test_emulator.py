@@ -0,0 +1,197 @@
+import asyncio
+from http import HTTPStatus
+
+import httpx2 as httpx
+import pytest
+from brunns.matchers.response import is_response
+from hamcrest import assert_that, calling, contains_exactly, has_entries, has_length, raises
+
+from mbtest.engine import EmulatedMountebankServer
+from mbtest.imposters import Imposter, Predicate, Response, Stub
+from mbtest.imposters.responses import FaultResponse
+from mbtest.matchers import had_request
+
+
+@pytest.fixture
+def emulator():
+    server = EmulatedMountebankServer()
+    yield server
+    server.close()
+
+
+def test_serves_imposter_and_records_requests(emulator):
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/test"), Response(body="sausages")), port=4567)
+
+    with emulator(imposter):
+        # When
+        response = emulator.client.get(f"{imposter.url}/test?food=chips")
+
+        # Then
+        assert_that(response, is_response().with_status_code(200).and_body("sausages"))
+        assert_that(imposter, had_request().with_path("/test").and_query(has_entries(food="chips")))
+        assert_that(emulator.query_all_imposters(), contains_exactly(imposter))
+
+
+def test_allocates_ports_when_not_given(emulator):
+    # Given
+    imposters = [Imposter(Stub(responses=Response(body=body))) for body in ("one", "two")]
+
+    with emulator(imposters):
+        # When
+        bodies = [emulator.client.get(str(imposter.url)).text for imposter in imposters]
+
+        # Then
+        assert [imposter.port for imposter in imposters] == [49152, 49153]
+        assert_that(bodies, contains_exactly("one", "two"))
+
+
+def test_stubs_added_updated_and_deleted(emulator):
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/first"), Response(body="first")))
+
+    with emulator(imposter):
+        # When
+        added = imposter.add_stub(Stub(Predicate(path="/second"), Response(body="second")))
+        imposter.add_stub(Stub(Predicate(path="/zeroth"), Response(body="zeroth")), index=0)
+        updated = imposter.update_stub(1, Stub(Predicate(path="/first"), Response(body="changed")))
+        imposter.delete_stub(0)
+
+        # Then
+        assert added == 1
+        assert updated == 1
+        assert_that(imposter.query_all_stubs(), has_length(2))
+        assert emulator.client.get(f"{imposter.url}/first").text == "changed"
+        assert emulator.client.get(f"{imposter.url}/second").text == "second"
+        assert emulator.client.get(f"{imposter.url}/zeroth").text == ""
+
+
+def test_all_stubs_replaced(emulator):
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/old"), Response(body="old")))
+
+    with emulator(imposter):
+        # When
+        response = emulator.client.put(
+            f"{imposter.configuration_url}/stubs",
+            json={"stubs": [Stub(Predicate(path="/new"), Response(body="new")).as_structure()]},
+        )
+
+        # Then
+        assert_that(response, is_response().with_status_code(200))
+        assert emulator.client.get(f"{imposter.url}/old").text == ""
+        assert emulator.client.get(f"{imposter.url}/new").text == "new"
+
+
+def test_missing_stub_not_found(emulator):
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/test"), Response(body="sausages")))
+
+    with emulator(imposter):
+        # When
+        response = emulator.client.delete(f"{imposter.configuration_url}/stubs/1")
+
+        # Then
+        assert_that(response, is_response().with_status_code(HTTPStatus.NOT_FOUND))
+        assert response.json()["errors"][0]["code"] == "no such resource"
+
+
+def test_replayable_imposter_and_saved_requests(emulator):
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/test"), Response(body="sausages")), name="replay")
+
+    with emulator(imposter):
+        emulator.client.get(f"{imposter.url}/test")
+
+        # When
+        replayable = emulator.client.get(str(imposter.configuration_url), params={"replayable": "true"}).json()
+        imposter.delete_saved_requests()
+
+        # Then
+        assert "requests" not in replayable
+        assert "_links" not in replayable
+        assert emulator.get_replayable_imposter(imposter) == imposter
+        assert_that(imposter.get_actual_requests(), has_length(0))
+
+
+def test_all_imposters_replaced(emulator):
+    # Given
+    old = Imposter(Stub(responses=Response(body="old")), port=4567)
+    new = Imposter(Stub(responses=Response(body="new")), port=4568)
+    emulator.add_impostor(old)
+
+    # When
+    response = emulator.client.put(str(emulator.server_url), json={"imposters": [new.as_structure()]})
+
+    # Then
+    assert_that(response, is_response().with_status_code(200))
+    assert_that(response.json()["imposters"], contains_exactly(has_entries(port=4568)))
+    assert emulator.client.get("http://localhost:4568").text == "new"
+
+
+def test_transport_mounted_on_another_client():
+    # Given
+    server = EmulatedMountebankServer()
+    imposter = Imposter(Stub(responses=Response(body="sausages")), port=4567)
+    client = httpx.Client(transport=server.transport)
+
+    try:
+        # When
+        client.post(str(server.server_url), json=imposter.as_structure()).raise_for_status()
+        response = client.get("http://anywhere:4567/")
+
+        # Then
+        assert_that(response, is_response().with_status_code(200).and_body("sausages"))
+        assert_that(calling(client.get).with_args("http://anywhere:4568/"), raises(httpx.ConnectError))
+    finally:
+        client.close()
+        server.close()
+
+
+def test_async_client_and_faults(emulator):
+    # Given
+    imposter = Imposter(
+        [
+            Stub(Predicate(path="/wait"), Response(body="waited", wait=1)),
+            Stub(Predicate(path="/fault"), FaultResponse(FaultResponse.Fault.CONNECTION_RESET_BY_PEER)),
+        ]
+    )
+
+    async def get(path):
+        async with httpx.AsyncClient(transport=emulator.transport) as client:
+            return await client.get(f"{imposter.url}{path}")
+
+    with emulator(imposter):
+        # When
+        response = asyncio.run(get("/wait"))
+
+        # Then
+        assert_that(response, is_response().with_status_code(200).and_body("waited"))
+        assert_that(calling(asyncio.run).with_args(get("/fault")), raises(httpx.TransportError))
+
+
+def test_synchronous_request_while_event_loop_running(emulator):
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/test"), Response(body="sausages")))
+
+    async def get():
+        return emulator.client.get(f"{imposter.url}/test")
+
+    with emulator(imposter):
+        # When
+        response = asyncio.run(get())
+
+        # Then
+        assert_that(response, is_response().with_status_code(200).and_body("sausages"))
+
+
+def test_requests_fail_once_shut_down():
+    # Given
+    server = EmulatedMountebankServer()
+    client = httpx.Client(transport=server.transport)
+
+    # When
+    server.close()
+
+    # Then
+    assert_that(calling(client.get).with_args(str(server.server_url)), raises(httpx.ConnectError))
@@ -0,0 +1,114 @@
+from base64 import b64encode
+
+import pytest
+from hamcrest import assert_that, calling, contains_exactly, has_properties, raises
+
+from mbtest.engine import StubEvaluator
+from mbtest.engine.matching import UnsupportedFeature
+from mbtest.imposters import Imposter, InjectionPredicate, Predicate, Response, Stub, TcpPredicate
+from mbtest.imposters.imposters import TcpRequest
+from tests.utils.builders import HttpRequestFactory, SentEmailFactory
+
+IMPOSTER = Imposter(
+    [
+        Stub(Predicate(path="/orders", method="POST")),
+        Stub([Predicate(path="/orders", operator="startsWith"), Predicate(query={"page": "2"})]),
+        Stub(Predicate(form={"colour": "red"})),
+    ]
+)
+
+
+def test_first_matching_stub_explained():
+    # Given
+    request = HttpRequestFactory.build(method="GET", path="/orders/1", query={"page": "2"}, body=None)
+
+    # When
+    explanation = StubEvaluator(IMPOSTER).explain(request)
+
+    # Then
+    assert_that(explanation, has_properties(matched=True, index=1, stub=IMPOSTER.stubs[1]))
+    assert_that(
+        explanation.traces,
+        contains_exactly(
+            has_properties(
+                index=0,
+                matched=False,
+                predicates=contains_exactly(has_properties(fields={"path": False, "method": False})),
+            ),
+            has_properties(index=1, matched=True),
+        ),
+    )
+    assert "served by stub 1" in explanation.describe()
+
+
+def test_default_response_explained_with_every_stub_traced():
+    # Given
+    request = HttpRequestFactory.build(method="GET", path="/other", query={}, headers={}, body=None)
+
+    # When
+    explanation = StubEvaluator(IMPOSTER).explain(request)
+
+    # Then
+    assert_that(explanation, has_properties(matched=False, index=None, stub=None))
+    assert [trace.index for trace in explanation.traces] == [0, 1, 2]
+    assert_that(
+        explanation.traces[1].predicates,
+        contains_exactly(has_properties(matched=False), has_properties(matched=False)),
+    )
+
+
+def test_log_evaluated_in_batch():
+    # Given
+    requests = [
+        HttpRequestFactory.build(method="POST", path="/orders", body=None),
+        HttpRequestFactory.build(
+            method="PUT",
+            path="/colours",
+            headers={"content-type": "application/x-www-form-urlencoded"},
+            body="colour=red",
+        ),
+        HttpRequestFactory.build(method="GET", path="/", body=None),
+    ]
+
+    # When
+    explanations = list(StubEvaluator(IMPOSTER).explain_all(requests))
+
+    # Then
+    assert [explanation.index for explanation in explanations] == [0, 2, None]
+    assert all(explanation.traces == () for explanation in explanations)
+
+
+def test_binary_tcp_requests():
+    # Given
+    imposter = Imposter(
+        [Stub(TcpPredicate(data=b64encode(b"\xff\x00").decode()))],
+        protocol=Imposter.Protocol.TCP,
+        mode=Response.Mode.BINARY,
+    )
+    request = TcpRequest(data=b64encode(b"\x01\xff\x00\x02").decode())
+
+    # When
+    index = StubEvaluator(imposter).first_match(request)
+
+    # Then
+    assert index == 0
+
+
+def test_unsupported_evaluation_rejected():
+    assert_that(
+        calling(StubEvaluator).with_args(Imposter(Stub(InjectionPredicate(inject="function () { return true; }")))),
+        raises(UnsupportedFeature),
+    )
+    assert_that(calling(StubEvaluator(IMPOSTER).explain).with_args(SentEmailFactory.build()), raises(TypeError))
+
+
+@pytest.mark.parametrize("trace", [True, False])
+def test_explain_with_and_without_trace_agree(trace):
+    # Given
+    request = HttpRequestFactory.build(method="POST", path="/orders", body=None)
+
+    # When
+    explanation = StubEvaluator(IMPOSTER).explain(request, trace=trace)
+
+    # Then
+    assert explanation.index == 0
@@ -0,0 +1,95 @@
+from http import HTTPStatus
+
+import httpx2 as httpx
+import pytest
+from brunns.matchers.response import is_response
+from hamcrest import assert_that, calling, contains_exactly, has_entries, has_length, raises
+
+from mbtest.imposters import Imposter, InjectionResponse, Predicate, Response, Stub
+from mbtest.imposters.responses import FaultResponse
+from mbtest.matchers import had_request
+
+
+def test_serves_imposter_and_records_requests(local_server):
+    # Given
+    imposter = Imposter(
+        [
+            Stub(Predicate(path="/test", method="GET"), Response(body="sausages", headers={"X-Food": "yes"})),
+            Stub(Predicate(path="/json"), Response(body={"food": "chips"}, status_code=HTTPStatus.CREATED)),
+        ]
+    )
+
+    with local_server(imposter):
+        # When
+        r1 = httpx.get(f"{imposter.url}/test")
+        r2 = httpx.post(f"{imposter.url}/json", content="eggs")
+        r3 = httpx.get(f"{imposter.url}/other")
+
+        # Then
+        assert_that(
+            r1, is_response().with_status_code(200).and_body("sausages").and_headers(has_entries({"X-Food": "yes"}))
+        )
+        assert_that(r2, is_response().with_status_code(201).and_json({"food": "chips"}))
+        assert_that(r3, is_response().with_status_code(200).and_body(""))
+        assert_that(imposter, had_request().with_path("/test").and_method("GET"))
+        assert_that(local_server, had_request().with_path("/json").and_body("eggs"))
+        assert_that(imposter.get_actual_requests(), has_length(3))
+
+
+def test_responses_cycle_and_repeat(local_server):
+    # Given
+    imposter = Imposter(Stub(responses=[Response(body="one", repeat=2), Response(body="two")]))
+
+    with local_server(imposter):
+        # When
+        bodies = [httpx.get(str(imposter.url)).text for _ in range(4)]
+
+        # Then
+        assert_that(bodies, contains_exactly("one", "one", "two", "one"))
+
+
+def test_binary_and_fault_responses(local_server):
+    # Given
+    content = bytes(range(256))
+    imposter = Imposter(
+        [
+            Stub(Predicate(path="/binary"), Response(body=content, mode=Response.Mode.BINARY)),
+            Stub(Predicate(path="/fault"), FaultResponse(FaultResponse.Fault.CONNECTION_RESET_BY_PEER)),
+        ]
+    )
+
+    with local_server(imposter):
+        # When
+        binary = httpx.get(f"{imposter.url}/binary")
+
+        # Then
+        assert binary.content == content
+        assert_that(calling(httpx.get).with_args(f"{imposter.url}/fault"), raises(httpx.TransportError))
+
+
+def test_unsupported_imposters_rejected(local_server):
+    # Given
+    imposter = Imposter(Stub(responses=InjectionResponse(inject="function () { return {}; }")))
+
+    # When
+    with pytest.raises(httpx.HTTPStatusError) as e:
+        local_server.add_impostor(imposter)
+
+    # Then
+    assert e.value.response.status_code == HTTPStatus.BAD_REQUEST
+    assert "inject" in e.value.response.json()["errors"][0]["message"]
+
+
+def test_imposters_queried_and_deleted(local_server):
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/test"), Response(body="sausages")), name="test")
+    local_server.add_impostor(imposter)
+
+    # When
+    imposters = local_server.query_all_imposters()
+    local_server.delete_imposters()
+
+    # Then
+    assert_that(imposters, contains_exactly(imposter))
+    assert httpx.get(str(local_server.server_url)).json() == {"imposters": []}
+    assert_that(calling(httpx.get).with_args(str(imposter.url)), raises(httpx.ConnectError))
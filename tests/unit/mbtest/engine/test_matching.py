@@ -0,0 +1,149 @@
+import pytest
+from hamcrest import assert_that, calling, raises
+
+from mbtest.engine.matching import UnsupportedFeature, compile_predicate, compile_predicates
+from mbtest.imposters import InjectionPredicate, Predicate
+
+REQUEST = {
+    "method": "POST",
+    "path": "/orders/123",
+    "query": {"colour": ["red", "blue"], "size": "Large"},
+    "headers": {"Content-Type": "application/json", "X-Trace": "abc"},
+    "body": '{"customer": {"name": "Alice", "tier": "gold"}, "items": [1, 2]}',
+}
+
+
+@pytest.mark.parametrize(
+    ("predicate", "expected"),
+    [
+        (Predicate(), True),
+        (Predicate(path="/orders/123", method="POST"), True),
+        (Predicate(path="/orders/124"), False),
+        (Predicate(path="/ORDERS/123"), False),
+        (Predicate(path="/ORDERS/123", case_sensitive=False), True),
+        (Predicate(query={"colour": "blue"}), True),
+        (Predicate(query={"colour": "green"}), False),
+        (Predicate(query={"size": "Large", "missing": "x"}), False),
+        (Predicate(headers={"content-type": "application/json"}), True),
+        (Predicate(body={"customer": {"name": "Alice"}}), True),
+        (Predicate(body={"customer": {"name": "Bob"}}), False),
+        (Predicate(body={"customer": {"name": "Alice"}}, operator="deepEquals"), False),
+        (Predicate(query={"size": "Large", "colour": ["blue", "red"]}, operator="deepEquals"), True),
+        (Predicate(path="/orders", operator="startsWith"), True),
+        (Predicate(path="123", operator="endsWith"), True),
+        (Predicate(body="gold", operator="contains"), True),
+        (Predicate(path=r"^/orders/\d+$", operator="matches"), True),
+        (Predicate(headers={"X-Trace": "^ABC$"}, operator="matches"), False),
+        (Predicate(headers={"X-Trace": "^ABC$"}, operator="matches", case_sensitive=False), True),
+        (Predicate(query={"size": True}, operator="exists"), True),
+        (Predicate(query={"missing": True}, operator="exists"), False),
+        (Predicate(query={"missing": False}, operator="exists"), True),
+        (Predicate(path="/orders/123") & Predicate(method="GET"), False),
+        (Predicate(path="/orders/123") | Predicate(method="GET"), True),
+        (~Predicate(method="GET"), True),
+    ],
+)
+def test_predicate_matching(predicate, expected):
+    # Given
+    matcher = compile_predicates([predicate.as_structure()])
+
+    # When
+    actual = matcher(REQUEST)
+
+    # Then
+    assert actual is expected
+
+
+def test_all_predicates_must_match():
+    # Given
+    matcher = compile_predicates([Predicate(path="/orders/123").as_structure(), Predicate(method="GET").as_structure()])
+
+    # When
+    actual = matcher(REQUEST)
+
+    # Then
+    assert actual is False
+
+
+def test_unsupported_predicates_rejected():
+    assert_that(
+        calling(compile_predicates).with_args(
+            [InjectionPredicate(inject="function () { return true; }").as_structure()]
+        ),
+        raises(UnsupportedFeature, "inject"),
+    )
+
+
+XML_BODY = (
+    '<order xmlns:b="http://b"><id>7</id><item sku="A1">x</item><item sku="B2">y</item><b:note>N</b:note></order>'
+)
+JSON_BODY = '{"Order": {"id": 7, "items": [{"sku": "A1"}, {"sku": "B2"}]}}'
+
+
+@pytest.mark.parametrize(
+    ("predicate", "body", "expected"),
+    [
+        (Predicate(xpath="//id", body="7"), XML_BODY, True),
+        (Predicate(xpath="/order/id/text()", body="8"), XML_BODY, False),
+        (Predicate(xpath="//item/@sku", body="B2"), XML_BODY, True),
+        (
+            Predicate(xpath="//item/@sku", body=["a1", "b2"], operator="deepEquals", case_sensitive=False),
+            XML_BODY,
+            True,
+        ),
+        (Predicate(xpath="//missing", body=False, operator="exists"), XML_BODY, True),
+        (Predicate(xpath="//id", body="7"), "not xml", False),
+        (Predicate(jsonpath="$.Order.id", body=7), JSON_BODY, True),
+        (Predicate(jsonpath="$..sku", body="B2"), JSON_BODY, True),
+        (Predicate(jsonpath="$['Order'].items[-2].sku", body="A1"), JSON_BODY, True),
+        (Predicate(jsonpath="$.Order.items[*].sku", body="C3"), JSON_BODY, False),
+    ],
+)
+def test_selector_matching(predicate, body, expected):
+    # Given
+    matcher = compile_predicates([predicate.as_structure()])
+
+    # When
+    actual = matcher({"body": body})
+
+    # Then
+    assert actual is expected
+
+
+def test_xpath_namespaces():
+    # Given
+    matcher = compile_predicate({"equals": {"body": "n"}, "xpath": {"selector": "//B:note", "ns": {"b": "http://b"}}})
+
+    # When
+    actual = matcher({"body": XML_BODY})
+
+    # Then
+    assert actual is True
+
+
+@pytest.mark.parametrize(
+    "predicate",
+    [Predicate(xpath="count(//item)", body="2"), Predicate(jsonpath="$.items[?(@.sku)]", body="A1")],
+)
+def test_unsupported_selectors_rejected(predicate):
+    assert_that(calling(compile_predicates).with_args([predicate.as_structure()]), raises(UnsupportedFeature))
+
+
+def test_explain_traces_fields_and_combinators():
+    # Given
+    predicate = Predicate(path="/orders/123") & ~Predicate(method="POST", headers={"X-Trace": "abc"})
+    matcher = compile_predicates([predicate.as_structure()])
+
+    # When
+    trace = matcher.explain(REQUEST)
+
+    # Then
+    assert trace.matched is False
+    inverted = trace.children[1]
+    assert inverted.children[0].fields == {"method": True, "headers": True}
+    assert trace.describe().splitlines() == [
+        "and - didn't match",
+        "  equals: path ok - matched",
+        "  not - didn't match",
+        "    equals: headers ok, method ok - matched",
+    ]
@@ -0,0 +1,74 @@
+import smtplib
+from unittest.mock import patch
+
+from hamcrest import assert_that, contains_exactly, has_item, has_properties, not_
+
+from mbtest.imposters import smtp_imposter
+from mbtest.matchers import email_sent
+from mbtest.store import find_mail_store
+from tests.utils.builders import EmailMessageFactory
+
+
+def test_email_recorded_and_matched_from_mail_store(local_server):
+    # Given
+    imposter = smtp_imposter()
+    message = EmailMessageFactory.build(from_email="sender@example.com", to_email="to@example.com", body_text="hi")
+    message["Subject"] = "Greetings"
+
+    with local_server(imposter), smtplib.SMTP(imposter.host, imposter.port) as client:
+        # When
+        client.sendmail(message["From"], ["to@example.com", "hidden@example.com"], message.as_string())
+
+        # Then
+        with patch.object(type(imposter), "get_actual_requests") as get_actual_requests:
+            assert_that(
+                imposter,
+                email_sent()
+                .with_recipient("HIDDEN@example.com")
+                .and_subject("Greetings")
+                .and_from_(has_properties(address="sender@example.com"))
+                .and_to(has_item(has_properties(address="to@example.com")))
+                .and_body_text("hi"),
+            )
+            assert_that(local_server, email_sent().with_recipient("to@example.com"))
+            assert_that(imposter, not_(email_sent().with_subject("Farewell")))
+            get_actual_requests.assert_not_called()
+        assert_that(imposter.get_actual_requests(), contains_exactly(has_properties(subject="Greetings")))
+
+
+def test_mail_store_cleared_and_detached(local_server):
+    # Given
+    imposter = smtp_imposter()
+    message = EmailMessageFactory.build()
+
+    with local_server(imposter):
+        with smtplib.SMTP(imposter.host, imposter.port) as client:
+            client.send_message(message)
+        store = find_mail_store(imposter)
+
+        # When
+        imposter.delete_saved_requests()
+
+        # Then
+        assert store is not None
+        assert len(store) == 0
+
+    assert find_mail_store(imposter) is None
+
+
+def test_dot_stuffed_and_multiple_messages(local_server):
+    # Given
+    imposter = smtp_imposter()
+    messages = [EmailMessageFactory.build(to_email=f"{n}@example.com", body_text=f".{n}\n.\n..") for n in range(3)]
+
+    with local_server(imposter), smtplib.SMTP(imposter.host, imposter.port) as client:
+        # When
+        for message in messages:
+            client.send_message(message)
+
+        # Then
+        store = find_mail_store(imposter)
+        assert len(store) == 3
+        assert_that(
+            list(store.iter_sent_email(recipient="1@example.com")), contains_exactly(has_properties(text=".1\n.\n.."))
+        )
@@ -0,0 +1,91 @@
+import socket
+from base64 import b64encode
+
+import httpx2 as httpx
+from hamcrest import assert_that, contains_exactly, has_properties
+
+from mbtest.imposters import (
+    DelimitedFraming,
+    Imposter,
+    LengthPrefixedFraming,
+    Response,
+    Stub,
+    TcpPredicate,
+    TcpResponse,
+)
+
+
+def test_text_mode_responds_to_each_packet(local_server):
+    # Given
+    imposter = Imposter(
+        [Stub(TcpPredicate(data="request"), TcpResponse(data="response"))],
+        protocol=Imposter.Protocol.TCP,
+    )
+
+    with local_server(imposter), socket.create_connection((imposter.host, imposter.port)) as client:
+        # When
+        client.sendall(b"a request")
+        response = client.recv(1024)
+
+        # Then
+        assert response == b"response"
+        assert_that(imposter.get_actual_requests(), contains_exactly(has_properties(data="a request")))
+
+
+def test_delimited_requests_framed_across_packets(local_server):
+    # Given
+    imposter = Imposter(
+        [Stub(TcpPredicate(data="ping"), TcpResponse(data="pong\n"))],
+        protocol=Imposter.Protocol.TCP,
+        end_of_request_resolver=DelimitedFraming(),
+    )
+
+    with local_server(imposter), socket.create_connection((imposter.host, imposter.port)) as client:
+        # When
+        client.sendall(b"pi")
+        client.sendall(b"ng\nping\n")
+        responses = _receive(client, 10)
+
+        # Then
+        assert responses == b"pong\npong\n"
+        assert_that(imposter.get_actual_requests(), contains_exactly(*[has_properties(data="ping\n")] * 2))
+
+
+def test_binary_mode_length_prefixed(local_server):
+    # Given
+    request = b"\x00\x03\xff\x00\x01"
+    imposter = Imposter(
+        [Stub(TcpPredicate(data=b64encode(b"\xff\x00").decode()), TcpResponse(data=b64encode(b"\x00\xfe").decode()))],
+        protocol=Imposter.Protocol.TCP,
+        mode=Response.Mode.BINARY,
+        end_of_request_resolver=LengthPrefixedFraming(2),
+    )
+
+    with local_server(imposter), socket.create_connection((imposter.host, imposter.port)) as client:
+        # When
+        client.sendall(request * 2)
+        responses = _receive(client, 4)
+
+        # Then
+        assert responses == b"\x00\xfe\x00\xfe"
+        assert imposter.get_actual_requests()[0].data == b64encode(request).decode()
+
+
+def test_undeclared_resolver_rejected(local_server):
+    # Given
+    structure = Imposter([], protocol=Imposter.Protocol.TCP).as_structure()
+    structure["endOfRequestResolver"] = {"inject": "function (requestData) { return true; }"}
+
+    # When
+    response = httpx.post(str(local_server.server_url), json=structure)
+
+    # Then
+    assert response.status_code == 400
+    assert "End of request resolvers" in response.json()["errors"][0]["message"]
+
+
+def _receive(client: socket.socket, size: int) -> bytes:
+    received = b""
+    while len(received) < size:
+        received += client.recv(size - len(received))
+    return received
@@ -0,0 +1,119 @@
+import logging
+from datetime import datetime, timezone
+
+import pytest
+from hamcrest import assert_that, has_entries, has_length
+
+from mbtest.analytics import RequestLog
+from tests.utils.builders import HttpRequestFactory, SentEmailFactory
+
+np = pytest.importorskip("numpy")
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def log():
+    return RequestLog(
+        [
+            HttpRequestFactory.build(method="GET", path="/a", body="", headers={"Content-Type": "text/plain"}),
+            HttpRequestFactory.build(method="GET", path="/b", body="1234", headers={"content-type": "text/plain"}),
+            SentEmailFactory.build(),
+            HttpRequestFactory.build(method="POST", path="/a", body="12", headers={}),
+            HttpRequestFactory.build(method="POST", path="/a", body="123456", headers={}),
+        ]
+    )
+
+
+def test_log_ignores_non_http_requests(log):
+    assert_that(log, has_length(4))
+    assert log[2].method == "POST"
+
+
+def test_to_columns(log):
+    # When
+    columns = log.to_columns()
+
+    # Then
+    assert len(columns) == 4
+    assert columns.method_names == ("GET", "POST")
+    assert columns.methods.tolist() == [0, 0, 1, 1]
+    assert columns.path_names == ("/a", "/b")
+    assert columns.paths.tolist() == [0, 1, 0, 0]
+    assert columns.body_lengths.tolist() == [0, 4, 2, 6]
+    assert columns.headers["Content-Type"].names == ("text/plain", None)
+    assert columns.headers["Content-Type"].codes.tolist() == [0, 0, 1, 1]
+
+
+def test_count_by(log):
+    columns = log.to_columns()
+
+    assert columns.count_by("path") == {"/a": 3, "/b": 1}
+    assert columns.count_by("Content-Type") == {"text/plain": 2, None: 2}
+    assert columns.count_by("method", "path") == {("GET", "/a"): 1, ("GET", "/b"): 1, ("POST", "/a"): 2}
+
+
+def test_percentile_and_aggregate(log):
+    columns = log.to_columns()
+
+    assert columns.percentile(columns.body_lengths, 50) == 3.0
+    assert_that(columns.percentile(columns.body_lengths, 100, by="method"), has_entries(GET=4.0, POST=6.0))
+    assert columns.aggregate(columns.body_lengths, "path", np.sum) == {"/a": 8, "/b": 4}
+
+
+def test_empty_log():
+    columns = RequestLog([]).to_columns()
+
+    assert len(columns) == 0
+    assert columns.count_by("path") == {}
+
+
+def timed(seconds, path="/a", request_from="10.0.0.1:1000"):
+    timestamp = datetime.fromtimestamp(1_700_000_000 + seconds, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+    return HttpRequestFactory.build(path=path, timestamp=timestamp, request_from=request_from)
+
+
+@pytest.fixture
+def timed_log():
+    return RequestLog(
+        [
+            timed(0.0),
+            timed(0.5, "/b", request_from="10.0.0.3:3000"),
+            timed(0.9, request_from="10.0.0.2:2000"),
+            timed(2.5, request_from="10.0.0.2:2000"),
+            timed(2.6, "/b", request_from="10.0.0.3:3000"),
+            HttpRequestFactory.build(),
+        ]
+    )
+
+
+def test_rate_analytics(timed_log):
+    assert timed_log.timestamps()[0] == 1_700_000_000.0
+    assert timed_log.inter_arrival_times() == pytest.approx([0.5, 0.4, 1.6, 0.1])
+    assert timed_log.requests_per_second() == [3.0, 0.0, 2.0]
+    assert timed_log.peak_rate() == 3.0
+    assert timed_log.peak_rate(window=0.2) == 10.0
+    assert RequestLog([]).requests_per_second() == []
+
+
+def test_concurrency_and_clients(timed_log):
+    assert timed_log.estimated_concurrency() == 2
+    clients = timed_log.by_client()
+    assert {client: len(log) for client, log in clients.items()} == {
+        "10.0.0.1": 1,
+        "10.0.0.3": 2,
+        "10.0.0.2": 2,
+        None: 1,
+    }
+
+
+def test_columns_requests_per_second(timed_log):
+    columns = timed_log.to_columns()
+
+    assert np.isnan(columns.timestamps[-1])
+    assert columns.count_by("client")["10.0.0.2"] == 2
+    assert columns.requests_per_second().tolist() == [3.0, 0.0, 2.0]
+    per_path = columns.requests_per_second(by="path")
+    assert per_path["/a"].tolist() == [2.0, 0.0, 1.0]
+    assert per_path["/b"].tolist() == [1.0, 0.0, 1.0]
+    assert RequestLog([]).to_columns().requests_per_second(by="path") == {}
@@ -0,0 +1,106 @@
+from copy import deepcopy
+
+import pytest
+
+from mbtest.compaction import compact_imposter
+from mbtest.imposters import Imposter, Predicate, Response, Stub
+from mbtest.imposters.responses import HttpResponse
+
+
+def compacted_stubs(*stubs, **kwargs):
+    return compact_imposter(Imposter(list(stubs)).as_structure(), **kwargs)["stubs"]
+
+
+def test_no_op_fields_left_out():
+    # When
+    stubs = compacted_stubs(Stub(), Stub(Predicate(path="/a"), Response(body="a", headers={"X": "1"})))
+
+    # Then
+    assert stubs == [
+        {},
+        {
+            "predicates": [{"equals": {"path": "/a"}, "caseSensitive": True}],
+            "responses": [{"is": {"body": "a", "headers": {"X": "1"}}}],
+        },
+    ]
+
+
+@pytest.mark.parametrize(
+    "imposter",
+    [
+        Imposter(Stub(responses=Response(body="a")), default_response=HttpResponse(status_code=404)),
+        Imposter(Stub(responses=Response(body="a")), protocol=Imposter.Protocol.TCP),
+    ],
+)
+def test_response_fields_kept_where_mountebank_defaults_differ(imposter):
+    # When
+    stubs = compact_imposter(imposter.as_structure())["stubs"]
+
+    # Then
+    assert stubs[0]["responses"] == [{"is": imposter.stubs[0].responses[0].as_structure()["is"]}]
+
+
+@pytest.mark.parametrize(
+    ("responses", "expected"),
+    [
+        (["a", "a", "b", "b", "b", "a"], [("a", 2), ("b", 3), ("a", None)]),
+        (["a", "a", "a"], [("a", None)]),
+        ([("a", 2), ("a", 3), "b"], [("a", 5), ("b", None)]),
+        ([("a", 2)], [("a", None)]),
+        (["a", "b", "a"], [("a", None), ("b", None), ("a", None)]),
+    ],
+)
+def test_identical_responses_folded(responses, expected):
+    # Given
+    stub = Stub(
+        responses=[
+            Response(body=r) if isinstance(r, str) else Response(body=r[0], repeat=r[1], wait=5) for r in responses
+        ]
+    )
+
+    # When
+    stubs = compacted_stubs(stub)
+
+    # Then
+    assert [
+        (response["is"]["body"], response.get("_behaviors", {}).get("repeat")) for response in stubs[0]["responses"]
+    ] == expected
+
+
+def test_cached_structures_left_unchanged():
+    # Given
+    imposter = Imposter([Stub(Predicate(path="/a"), [Response(body="a"), Response(body="a")]), Stub()])
+    structure = imposter.as_structure()
+    original = deepcopy(structure)
+
+    # When
+    compact_imposter(structure, merge_stubs=True)
+
+    # Then
+    assert structure == original
+    assert imposter.as_structure() == original
+
+
+def test_stubs_with_same_response_merged():
+    # Given
+    a, b = Predicate(path="/a"), Predicate(path="/b") & Predicate(method="GET")
+
+    # When
+    stubs = compacted_stubs(
+        Stub(a, Response(body="x")),
+        Stub([b, Predicate(query={"q": "1"})], Response(body="x")),
+        Stub(Predicate(path="/c"), Response(body="y")),
+        Stub(Predicate(path="/d"), Response(body="y")),
+        Stub(responses=Response(body="y")),
+        Stub(Predicate(path="/e"), [Response(body="z"), Response(body="z", wait=1)]),
+        Stub(Predicate(path="/f"), [Response(body="z"), Response(body="z", wait=1)]),
+        merge_stubs=True,
+    )
+
+    # Then
+    assert [stub.get("predicates") for stub in stubs] == [
+        [{"or": [a.as_structure(), {"and": [b.as_structure(), Predicate(query={"q": "1"}).as_structure()]}]}],
+        None,
+        [Predicate(path="/e").as_structure()],
+        [Predicate(path="/f").as_structure()],
+    ]
@@ -0,0 +1,124 @@
+from unittest.mock import patch
+
+import pytest
+from hamcrest import assert_that, calling, contains_exactly, has_properties, raises
+
+from mbtest.engine import StubEvaluator
+from mbtest.families import collapse_stub_families, find_stub_families, verify_stub_family
+from mbtest.imposters import Imposter, Predicate, Response, Stub
+from mbtest.imposters.imposters import HttpRequest
+
+
+def item_stubs(count, **kwargs):
+    return [
+        Stub(
+            Predicate(path=f"/items/{n}", method="GET"), Response(body=f"item {n}", headers={"X-Id": str(n)}, **kwargs)
+        )
+        for n in range(count)
+    ]
+
+
+def test_path_family_collapsed_into_lookup(tmp_path):
+    # Given
+    imposter = Imposter([*item_stubs(12), Stub(responses=Response(status_code=404))])
+
+    # When
+    families = collapse_stub_families(imposter, tmp_path)
+
+    # Then
+    assert_that(
+        families,
+        contains_family(
+            start=0, end=12, request_field=("path",), pattern=f"^/items/({'|'.join(map(str, range(12)))})$"
+        ),
+    )
+    assert len(imposter.stubs) == 2
+    assert (tmp_path / families[0].datasource_name).read_text().splitlines()[:2] == [
+        "key,body,headers.X-Id",
+        "0,item 0,0",
+    ]
+    evaluator = StubEvaluator(imposter)
+    assert evaluator.first_match(request("/items/11")) == 0
+    assert evaluator.first_match(request("/items/12")) == 1
+    assert evaluator.first_match(request("/items/1", "POST")) == 1
+
+
+def test_query_family_found():
+    # Given
+    stubs = [Stub(Predicate(path="/search", query={"q": f"term {n}."}), Response(body=str(n))) for n in range(10)]
+
+    # When
+    families = find_stub_families(stubs)
+
+    # Then
+    assert_that(
+        families,
+        contains_family(
+            request_field=("query", "q"),
+            pattern=rf"^term ({'|'.join(map(str, range(10)))})\.$",
+            predicate={"equals": {"path": "/search"}, "caseSensitive": True},
+        ),
+    )
+    assert families[0].stub("data.csv").predicates[1] == Predicate(query={"q": families[0].pattern}, operator="matches")
+
+
+@pytest.mark.parametrize(
+    "stubs",
+    [
+        item_stubs(9),
+        [Stub(Predicate(path=f"/items/{n}"), Response(status_code=200 + n)) for n in range(10)],
+        [Stub(Predicate(path=f"/items/{n}", method="GET" if n % 2 else "POST")) for n in range(10)],
+        [Stub(Predicate(path=f"/items/{n}", case_sensitive=False)) for n in range(10)],
+        [Stub(Predicate(path=f"/items/{n}"), Response(body=str(n), wait=10)) for n in range(10)],
+        [Stub(Predicate(path=f"/items/{n // 2}"), Response(body=str(n))) for n in range(10)],
+    ],
+)
+def test_only_stubs_a_lookup_serves_the_same_are_families(stubs):
+    assert find_stub_families(stubs) == []
+
+
+def test_families_end_where_stubs_stop_differing_in_one_field():
+    # Given
+    stubs = [*item_stubs(10), Stub(Predicate(path="/other")), *item_stubs(11)]
+
+    # When
+    families = find_stub_families(stubs)
+
+    # Then
+    assert [(family.start, family.end) for family in families] == [(0, 10), (11, 22)]
+
+
+def test_verification_reads_data_source_back(tmp_path):
+    # Given
+    stubs = item_stubs(10)
+    family = find_stub_families(stubs)[0]
+    path = tmp_path / family.datasource_name
+    family.write_datasource(path)
+
+    # When
+    path.write_text(path.read_text().replace("item 3", "item three"))
+
+    # Then
+    assert verify_stub_family(family, stubs, path) == [3]
+
+
+def test_nothing_collapsed_if_any_family_fails_verification(tmp_path):
+    # Given
+    imposter = Imposter([*item_stubs(10), Stub(Predicate(path="/other")), *item_stubs(10)])
+    stubs = list(imposter.stubs)
+
+    # When
+    with patch("mbtest.families.verify_stub_family", side_effect=lambda family, *_: [0] if family.start == 0 else []):
+        assert_that(calling(collapse_stub_families).with_args(imposter, tmp_path), raises(ValueError, r"\[0\]"))
+
+    # Then
+    assert imposter.stubs == stubs
+    assert list(tmp_path.iterdir()) == []
+
+
+def contains_family(**properties):
+    return contains_exactly(has_properties(**properties))
+
+
+def request(path, method="GET"):
+    return HttpRequest(method=method, path=path, query={}, headers={})
@@ -0,0 +1,60 @@
+import pytest
+from hamcrest import assert_that, calling, contains_string, has_entries, raises
+
+from mbtest.imposters import DelimitedFraming, Imposter, InjectedFraming, LengthPrefixedFraming
+
+
+@pytest.mark.parametrize(
+    ("framing", "data", "expected"),
+    [
+        (DelimitedFraming(), b"one\ntwo\nthr", ([b"one\n", b"two\n"], b"thr")),
+        (DelimitedFraming(b"\r\n"), b"one\r\n", ([b"one\r\n"], b"")),
+        (DelimitedFraming(), b"partial", ([], b"partial")),
+        (
+            LengthPrefixedFraming(),
+            b"\x00\x00\x00\x03abc\x00\x00\x00\x02d",
+            ([b"\x00\x00\x00\x03abc"], b"\x00\x00\x00\x02d"),
+        ),
+        (LengthPrefixedFraming(2, "little"), b"\x01\x00a\x00\x00\x01", ([b"\x01\x00a", b"\x00\x00"], b"\x01")),
+    ],
+)
+def test_split(framing, data, expected):
+    # When
+    actual = framing.split(data)
+
+    # Then
+    assert actual == expected
+
+
+@pytest.mark.parametrize("framing", [DelimitedFraming(b"\r\n"), LengthPrefixedFraming(2, "little")])
+def test_structure_roundtrip(framing):
+    # Given
+    imposter = Imposter([], protocol=Imposter.Protocol.TCP, end_of_request_resolver=framing)
+    structure = imposter.as_structure()
+
+    # When
+    actual = Imposter.from_structure(structure)
+
+    # Then
+    assert_that(structure["endOfRequestResolver"], has_entries(inject=contains_string("function (requestData)")))
+    assert actual.end_of_request_resolver == framing
+
+
+def test_undeclared_resolver_kept_unchanged():
+    # Given
+    structure = {"protocol": "tcp", "endOfRequestResolver": {"inject": "function (requestData) { return true; }"}}
+
+    # When
+    imposter = Imposter.from_structure(structure)
+
+    # Then
+    assert imposter.end_of_request_resolver == InjectedFraming("function (requestData) { return true; }")
+    assert imposter.as_structure()["endOfRequestResolver"] == structure["endOfRequestResolver"]
+
+
+def test_injected_resolver_not_run_natively():
+    assert_that(calling(InjectedFraming("function () {}").split).with_args(b"data"), raises(NotImplementedError))
+
+
+def test_empty_delimiter_rejected():
+    assert_that(calling(DelimitedFraming).with_args(b""), raises(ValueError, "empty"))
@@ -0,0 +1,74 @@
+import base64
+import json
+
+import pytest
+from hamcrest import assert_that, calling, equal_to, has_length, is_not, raises
+
+from mbtest.imposters import Imposter, Response, Stub
+from mbtest.imposters.generators import JsonArrayBody, NestedJsonBody, RandomBytesBody
+from mbtest.serialisation import CHUNK_SIZE, iter_dumps, loads
+
+
+@pytest.mark.parametrize("size", [0, 1, 1000, CHUNK_SIZE + 1])
+def test_random_bytes_are_deterministic(size):
+    # Given
+    body = RandomBytesBody(size, seed=42)
+
+    # When
+    content = body.read()
+
+    # Then
+    assert_that(content, has_length(size))
+    assert_that(content, equal_to(RandomBytesBody(size, seed=42).read()))
+    if size:
+        assert_that(content, is_not(equal_to(RandomBytesBody(size, seed=43).read())))
+
+
+@pytest.mark.parametrize("size", [2, 50, 1000, CHUNK_SIZE + 1])
+def test_json_array_is_exact_size(size):
+    # Given
+    body = JsonArrayBody(size, seed=1)
+
+    # When
+    content = body.read()
+
+    # Then
+    assert_that(content, has_length(size))
+    records = json.loads(content)
+    assert [record["id"] for record in records] == list(range(len(records)))
+    assert content == JsonArrayBody(size, seed=1).read()
+
+
+def test_nested_json_depth():
+    # Given
+    body = NestedJsonBody(depth=5000, breadth=2, seed=1)
+
+    # When
+    content = body.read().decode("utf-8")
+
+    # Then
+    assert content.startswith('{"k0":"')
+    assert content.endswith('"level":4999,"child":null' + "}" * 5000)
+    assert content == NestedJsonBody(depth=5000, breadth=2, seed=1).read().decode("utf-8")
+    assert json.loads(NestedJsonBody(depth=2, breadth=0).read()) == {"level": 0, "child": {"level": 1, "child": None}}
+
+
+def test_generated_bodies_streamed_into_imposter():
+    # Given
+    binary, text = RandomBytesBody(1000, seed=3), JsonArrayBody(1000, seed=3)
+    imposter = Imposter(Stub(responses=[Response(body=binary), Response(body=text)]))
+
+    # When
+    structure = loads(b"".join(iter_dumps(imposter.as_structure())))
+
+    # Then
+    responses = structure["stubs"][0]["responses"]
+    assert responses[0]["is"]["_mode"] == "binary"
+    assert base64.b64decode(responses[0]["is"]["body"]) == binary.read()
+    assert responses[1]["is"]["_mode"] == "text"
+    assert responses[1]["is"]["body"] == text.read().decode("utf-8")
+
+
+@pytest.mark.parametrize("size", [-1, 0, 1])
+def test_json_array_too_small_rejected(size):
+    assert_that(calling(JsonArrayBody).with_args(size), raises(ValueError, "at least 2 bytes"))
@@ -1,14 +1,35 @@
+import copy
 import json
 import logging
+import pickle
+from dataclasses import FrozenInstanceError
+from datetime import datetime, timezone
+from http import HTTPStatus
 
 import pytest
 from brunns.matchers.object import has_identical_properties_to
-from hamcrest import assert_that, has_entries, instance_of
+from hamcrest import (
+    all_of,
+    assert_that,
+    contains_exactly,
+    has_entries,
+    has_item,
+    has_key,
+    has_length,
+    has_properties,
+    instance_of,
+    not_,
+    same_instance,
+)
+from yarl import URL
 
-from mbtest.imposters import Imposter, Proxy, Response, Stub
-from mbtest.imposters.imposters import Address, SentEmail
+from mbtest.imposters import Imposter, Predicate, Proxy, Response, Stub
+from mbtest.imposters.base import shared_structure
+from mbtest.imposters.imposters import Address, HttpRequest, Request, SentEmail
+from mbtest.imposters.stubs import LazyStubs
 from tests.utils.builders import (
     AndPredicateFactory,
+    CopyFactory,
     HttpRequestFactory,
     HttpResponseFactory,
     ImposterFactory,
@@ -147,3 +168,320 @@ def test_http_request_roundtrip():
         HttpRequestFactory.build(body=json.dumps({"a": "b"})).json,
         has_entries(a="b"),
     )
+
+
+def test_get_actual_requests_streams_recorded_requests(httpx2_mock):
+    # Given
+    imposter = Imposter(Stub(), port=4567)
+    imposter.attach("localhost", 4567, URL("http://localhost:2525/imposters"))
+    httpx2_mock.get("http://localhost:2525/imposters/4567").respond(
+        json={
+            "protocol": "http",
+            "port": 4567,
+            "stubs": [Stub().as_structure()],
+            "requests": [
+                {"method": "GET", "path": "/test", "query": {"a": "b"}, "headers": {}, "body": ""},
+                {"envelopeFrom": "a@example.com", "subject": "Hello", "text": "World"},
+            ],
+        }
+    )
+
+    # When
+    actual = imposter.get_actual_requests()
+
+    # Then
+    assert_that(
+        actual,
+        contains_exactly(
+            has_properties(method="GET", path="/test", query=has_entries(a="b")),
+            has_properties(subject="Hello", text="World"),
+        ),
+    )
+
+
+def test_http_request_from_json_is_compact_and_immutable():
+    # Given
+    first = HttpRequest.from_json(
+        json.loads('{"method": "POST", "path": "/test", "headers": {"X-Id": "1"}, "body": "{\\"a\\": 1}"}')
+    )
+    second = HttpRequest.from_json(json.loads('{"method": "POST", "path": "/test", "headers": {"X-Id": "2"}}'))
+
+    # Then
+    assert first.path is second.path
+    assert next(iter(first.headers)) is next(iter(second.headers))
+    assert second.query == {}
+    assert first.json is first.json
+    assert not hasattr(first, "__dict__")
+    with pytest.raises(FrozenInstanceError):
+        first.path = "/other"  # type: ignore[misc]
+
+
+def test_http_request_headers_interned_on_first_use():
+    # Given
+    decoded = {"X-Id": "1"}
+
+    # When
+    request = HttpRequest.from_json({"method": "GET", "path": "/", "headers": decoded})
+
+    # Then
+    assert_that(request.headers, has_length(1))
+    assert request.headers["X-Id"] == "1"
+    assert request.headers == decoded
+    assert repr(request.headers) == repr(decoded)
+    assert request == HttpRequest(method="GET", path="/", query={}, headers={"X-Id": "1"})
+
+
+def test_request_timestamp_and_origin_preserved():
+    # Given
+    request = Request.from_json(
+        {"method": "GET", "path": "/", "timestamp": "2024-03-01T12:00:00.250Z", "requestFrom": "::ffff:127.0.0.1:5300"}
+    )
+    email = Request.from_json({"envelopeFrom": "a@b.com", "timestamp": "2024-03-01T12:00:01Z", "requestFrom": "::1:25"})
+
+    # Then
+    assert request.time == datetime(2024, 3, 1, 12, 0, 0, 250000, tzinfo=timezone.utc)
+    assert request.client == "::ffff:127.0.0.1"
+    assert email.time == datetime(2024, 3, 1, 12, 0, 1, tzinfo=timezone.utc)
+    assert email.client == "::1"
+    assert HttpRequestFactory.build().time is None
+
+
+def test_as_structure_is_memoised():
+    # Given
+    imposter = ImposterFactory.build()
+
+    # When
+    first = shared_structure(imposter)
+
+    # Then
+    assert shared_structure(imposter) is first
+    assert imposter.as_structure() is not first
+    assert imposter.as_structure() == first
+
+
+def test_as_structure_changes_dont_reach_cache():
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/a"), Response(body="a")))
+    structure = imposter.as_structure()
+
+    # When
+    structure["stubs"][0]["predicates"].clear()
+    structure["stubs"][0]["responses"][0]["is"]["body"] = "changed"
+    structure["name"] = "changed"
+
+    # Then
+    assert_that(
+        imposter.as_structure(),
+        all_of(
+            not_(has_key("name")),
+            has_entries(
+                stubs=contains_exactly(
+                    has_entries(
+                        predicates=contains_exactly(has_entries(equals={"path": "/a"})),
+                        responses=contains_exactly(has_entries({"is": has_entries(body="a")})),
+                    )
+                )
+            ),
+        ),
+    )
+
+
+def test_as_structure_cache_invalidated_by_mutation_anywhere_in_tree():
+    # Given
+    predicate = Predicate(path="/before")
+    response = Response(body="before", copy=CopyFactory.build())
+    imposter = Imposter(Stub(predicate & Predicate(method="GET"), response))
+    original = imposter.as_structure()
+
+    # When
+    predicate.path = "/after"
+    response.http_response.body = "after"
+    response.copy[0].using.selector = "after"
+
+    # Then
+    structure = imposter.as_structure()
+    assert structure is not original
+    assert_that(
+        structure["stubs"][0],
+        has_entries(
+            predicates=contains_exactly(has_entries({"and": has_item(has_entries(equals=has_entries(path="/after")))})),
+            responses=contains_exactly(
+                has_entries(
+                    {
+                        "is": has_entries(body="after"),
+                        "_behaviors": has_entries(
+                            copy=contains_exactly(has_entries(using=has_entries(selector="after")))
+                        ),
+                    }
+                )
+            ),
+        ),
+    )
+
+
+def test_as_structure_cache_invalidated_by_list_changes():
+    # Given
+    imposter = Imposter(Stub(Predicate(path="/a")))
+    original = imposter.as_structure()
+
+    # When
+    imposter.stubs.append(Stub(Predicate(path="/b")))
+    imposter.stubs[0].predicates[0] = Predicate(path="/c")
+
+    # Then
+    assert_that(
+        imposter.as_structure()["stubs"],
+        contains_exactly(
+            has_entries(predicates=contains_exactly(has_entries(equals=has_entries(path="/c")))),
+            has_entries(predicates=contains_exactly(has_entries(equals=has_entries(path="/b")))),
+        ),
+    )
+    assert_that(original["stubs"], has_length(1))
+
+
+def test_loaded_stubs_decoded_lazily_and_passed_through_untouched(tmp_path):
+    # Given
+    path = tmp_path / "imposter.json"
+    Imposter([Stub(Predicate(path="/a")), Stub(Predicate(path="/b"))], port=4545).save(path)
+    imposter = Imposter.from_file(path)
+    raw_stubs = shared_structure(imposter)["stubs"]
+
+    # When
+    first = imposter.stubs[0]
+    first_structure = shared_structure(imposter)["stubs"]
+    first.predicates = [Predicate(path="/c")]
+    changed_structure = shared_structure(imposter)["stubs"]
+
+    # Then
+    assert_that(imposter.stubs, instance_of(LazyStubs))
+    assert_that(imposter.stubs[0], same_instance(first))
+    assert_that(first_structure[1], same_instance(raw_stubs[1]))
+    assert_that(changed_structure[0], has_entries(predicates=contains_exactly(has_entries(equals={"path": "/c"}))))
+    assert_that(changed_structure[1], same_instance(raw_stubs[1]))
+    assert imposter.stubs == [Stub(Predicate(path="/c")), Stub(Predicate(path="/b"))]
+
+
+def test_lazy_stubs_leave_out_server_state():
+    # Given
+    definition = Stub(Predicate(path="/a")).as_structure()
+    queried = {**definition, "matches": [{"request": {"path": "/a"}}], "_links": {"self": {"href": "/stubs/0"}}}
+
+    # When
+    stubs = LazyStubs([queried, definition])
+
+    # Then
+    assert stubs.item_structures() == [definition, definition]
+    assert_that(stubs.item_structures()[1], same_instance(definition))
+    assert stubs[0] == Stub(Predicate(path="/a"))
+
+
+def test_lazy_stubs_changes_invalidate_cached_structure():
+    # Given
+    imposter = Imposter.from_structure({"protocol": "http", "stubs": [Stub(Predicate(path="/a")).as_structure()]})
+    imposter.as_structure()
+
+    # When
+    imposter.stubs.append(Stub(Predicate(path="/b")))
+    del imposter.stubs[0]
+
+    # Then
+    assert_that(
+        imposter.as_structure()["stubs"],
+        contains_exactly(has_entries(predicates=contains_exactly(has_entries(equals={"path": "/b"})))),
+    )
+
+
+def test_clone_is_independent_of_original():
+    # Given
+    original = Imposter([Stub(Predicate(path="/a"), Response(body="a"))], port=4545, name="original")
+    original.attach("localhost", 4545, URL("http://localhost:2525/imposters"))
+    original_structure = shared_structure(original)
+
+    # When
+    clone = original.clone(name="clone")
+    clone.stubs[0].predicates[0].path = "/b"
+    clone.stubs.append(Stub(Predicate(path="/c")))
+
+    # Then
+    assert_that(shared_structure(original), same_instance(original_structure))
+    assert_that(original.as_structure(), has_entries(name="original", stubs=has_length(1)))
+    assert original.stubs[0].predicates[0].path == "/a"
+    assert_that(clone.as_structure(), has_entries(name="clone", port=4545, stubs=has_length(2)))
+    assert clone.stubs[0].predicates[0].path == "/b"
+    assert not clone.attached
+
+
+def test_unchanged_clone_shares_cached_structures():
+    # Given
+    original = Imposter(LazyStubs([Stub(Predicate(path="/a")).as_structure(), Stub(Predicate(path="/b"))]))
+    structure = shared_structure(original)
+
+    # When
+    clone = original.clone()
+
+    # Then
+    assert_that(shared_structure(clone)["stubs"][0], same_instance(structure["stubs"][0]))
+    assert_that(shared_structure(clone)["stubs"][1], same_instance(structure["stubs"][1]))
+    assert clone == original
+
+
+def test_imposter_pickles_as_structure():
+    # Given
+    original = Imposter([Stub(Predicate(path="/a") | Predicate(path="/b"), Response(body="a", wait=10))], port=4545)
+    original.attach("localhost", 4545, URL("http://localhost:2525/imposters"))
+
+    # When
+    unpickled = pickle.loads(pickle.dumps(original))  # noqa: S301
+    stub = pickle.loads(pickle.dumps(original.stubs[0]))  # noqa: S301
+
+    # Then
+    assert unpickled == original
+    assert unpickled.as_structure() == original.as_structure()
+    assert not unpickled.attached
+    assert stub == original.stubs[0]
+
+
+def test_response_clone_overrides_http_response_fields():
+    # Given
+    original = Response(body="a", headers={"X-Test": "1"}, wait=10)
+
+    # When
+    clone = original.clone(body="b", status_code=HTTPStatus.NOT_FOUND, repeat=2)
+    default_clone = Stub().responses[0].clone(body="c")
+
+    # Then
+    assert_that(clone, has_properties(body="b", status_code=HTTPStatus.NOT_FOUND, headers={"X-Test": "1"}, wait=10))
+    assert clone.repeat == 2
+    assert_that(original, has_properties(body="a", status_code=HTTPStatus.OK, repeat=None))
+    assert default_clone.body == "c"
+    assert Response().body == ""
+
+
+def test_clone_copies_mutable_values():
+    # Given
+    original = Response(headers={"X-Test": "1"})
+
+    # When
+    clone = original.clone()
+    clone.http_response.headers["X-Test"] = "2"
+
+    # Then
+    assert original.headers == {"X-Test": "1"}
+
+
+def test_copies_keep_object_graph():
+    # Given
+    original = Imposter([Stub(Predicate(path="/a"), Response(body=b"\x00\x01", headers={"X-Test": "1"}))], port=4545)
+    original.attach("localhost", 4545, URL("http://localhost:2525/imposters"))
+
+    # When
+    deep = copy.deepcopy(original)
+    shallow = copy.copy(original)
+
+    # Then
+    assert deep == original
+    assert deep.stubs[0].responses[0].body == b"\x00\x01"
+    assert_that(deep.stubs, instance_of(list))
+    assert deep.attached
+    assert deep.stubs[0].responses[0].headers is not original.stubs[0].responses[0].headers
+    assert_that(shallow.stubs, same_instance(original.stubs))
@@ -82,3 +82,25 @@ def test_email_sent():
             ),
         ),
     )
+
+
+def test_request_matcher_with_rate():
+    # Given
+    server = MagicMock()
+    server.get_actual_requests.return_value = [
+        HttpRequestFactory.build(path="/test", timestamp=f"2024-03-01T12:00:0{second}.{ms:03}Z")
+        for second, ms in [(0, 0), (0, 500), (1, 0), (1, 100), (1, 200)]
+    ]
+
+    # Then
+    assert_that(server, had_request().with_path("/test").at_rate_below(5))
+    assert_that(server, not_(had_request().with_path("/test").at_rate_below(4)))
+    assert_that(server, had_request().with_path("/test").and_rate(5, window=0.6))
+    assert_that(
+        had_request().with_path("/test").at_rate_below(3),
+        has_string("call with path: '/test' peak rate per 1.0s window: a value less than <3>"),
+    )
+    assert_that(
+        had_request().with_path("/test").at_rate_below(4),
+        mismatches_with(server, contains_string("Peak rate: <4.0>")),
+    )
@@ -0,0 +1,181 @@
+import httpx2 as httpx
+import pytest
+from hamcrest import assert_that, calling, contains_exactly, has_properties, raises
+
+from mbtest.engine import LocalMountebankServer
+from mbtest.imposters import Imposter, Predicate, Response, Stub
+from mbtest.optimise import (
+    DeadStub,
+    find_dead_stubs,
+    optimise_stub_order,
+    plan_stub_order,
+    remove_dead_stubs,
+    stubs_disjoint,
+)
+
+
+def test_hottest_disjoint_stubs_moved_first():
+    # Given
+    stubs = [Stub(Predicate(path=f"/items/{n}")) for n in range(4)]
+
+    # When
+    order = plan_stub_order(stubs, [1, 0, 5, 10])
+
+    # Then
+    assert_that(
+        order,
+        has_properties(order=(3, 2, 0, 1), changed=True, evaluations_before=1 + 15 + 40, evaluations_after=10 + 10 + 3),
+    )
+    assert order.reduction == pytest.approx(1 - 23 / 56)
+    assert order.apply(stubs) == [stubs[3], stubs[2], stubs[0], stubs[1]]
+
+
+def test_overlapping_stubs_keep_their_order():
+    # Given
+    stubs = [
+        Stub(Predicate(path="/orders", operator="startsWith")),
+        Stub(Predicate(path="/customers/1")),
+        Stub(Predicate(path="/orders/1")),
+    ]
+
+    # When
+    order = plan_stub_order(stubs, [0, 1, 10])
+
+    # Then
+    assert order.order == (0, 2, 1)
+
+
+@pytest.mark.parametrize(
+    ("first", "second", "expected"),
+    [
+        (Predicate(path="/a"), Predicate(path="/b"), True),
+        (Predicate(path="/a"), Predicate(path="/A", case_sensitive=False), False),
+        (Predicate(path="/a", method="GET"), Predicate(path="/a", method="POST"), True),
+        (Predicate(method="GET") | Predicate(method="HEAD"), Predicate(method="POST"), True),
+        (Predicate(method="GET") | Predicate(path="/a"), Predicate(method="POST"), False),
+        (Predicate(path="/a/", operator="startsWith"), Predicate(path="/b/", operator="startsWith"), True),
+        (Predicate(path="/a/", operator="startsWith"), Predicate(path=".json", operator="endsWith"), False),
+        (Predicate(path="/a", query={"q": "1"}), Predicate(path="/a", query={"q": "2"}), False),
+        (Predicate(path="/a", xpath="//a"), Predicate(path="/b"), False),
+        (~Predicate(path="/a"), Predicate(path="/a"), False),
+    ],
+)
+def test_stubs_disjoint(first, second, expected):
+    # When
+    actual = stubs_disjoint(Stub(first), Stub(second))
+
+    # Then
+    assert actual is expected
+
+
+def test_hit_counts_required_for_every_stub():
+    assert_that(calling(plan_stub_order).with_args([Stub()], []), raises(ValueError, "0 hit counts given for 1 stubs"))
+
+
+def test_running_imposter_reordered():
+    # Given
+    imposter = Imposter([Stub(Predicate(path=f"/items/{n}"), Response(body=str(n))) for n in range(3)])
+    server = LocalMountebankServer()
+
+    with server(imposter):
+        for _ in range(3):
+            httpx.get(f"{imposter.url}/items/2")
+        httpx.get(f"{imposter.url}/items/1")
+
+        # When
+        hits = imposter.query_stub_hits()
+        order = optimise_stub_order(imposter)
+
+        # Then
+        assert hits == [0, 1, 3]
+        assert_that(order, has_properties(order=(2, 1, 0), evaluations_before=11, evaluations_after=5))
+        assert_that(
+            imposter.query_all_stubs(),
+            contains_exactly(*(has_properties(predicates=[Predicate(path=f"/items/{n}")]) for n in (2, 1, 0))),
+        )
+        assert imposter.query_stub_hits() == [0, 0, 0]
+        assert httpx.get(f"{imposter.url}/items/1").text == "1"
+    server.close()
+
+
+@pytest.mark.parametrize(
+    ("first", "second", "dead"),
+    [
+        (Predicate(path="/orders", operator="startsWith"), Predicate(path="/orders/1"), True),
+        (Predicate(path="/orders/1"), Predicate(path="/orders", operator="startsWith"), False),
+        (Predicate(path="/orders", operator="startsWith"), Predicate(path="/orders/1", operator="startsWith"), True),
+        (Predicate(path="/Orders"), Predicate(path="/orders", case_sensitive=False), False),
+        (Predicate(path="/Orders", case_sensitive=False), Predicate(path="/orders"), True),
+        (Predicate(path=".json", operator="endsWith"), Predicate(path="/a.json"), True),
+        (Predicate(body="error", operator="contains"), Predicate(body="an error", operator="startsWith"), True),
+        (Predicate(method="GET"), Predicate(path="/a", method="GET"), True),
+        (Predicate(path="/a", method="GET"), Predicate(path="/a"), False),
+        (Predicate(query={"q": "1"}), Predicate(query={"q": "1", "r": "2"}), True),
+        (Predicate(query={"q": "A"}, case_sensitive=False), Predicate(query={"q": "a"}, case_sensitive=False), True),
+        (Predicate(query={"q": "1"}), Predicate(query={"q": 1}), False),
+        (Predicate(method="GET") | Predicate(method="HEAD"), Predicate(path="/a", method="HEAD"), True),
+        (Predicate(path="/a"), Predicate(path="/a") | Predicate(path="/b"), False),
+        (Predicate(method="GET"), Predicate(path="/a", method="GET") | Predicate(path="/b", method="GET"), True),
+        (~Predicate(method="POST"), Predicate(method="GET"), True),
+        (~Predicate(method="POST"), Predicate(path="/a"), False),
+        (Predicate(path="/a", xpath="//a"), Predicate(path="/a"), False),
+        (Predicate(path=r"^/a", operator="matches"), Predicate(path=r"^/a", operator="matches"), True),
+        (Predicate(path=r"^/a", operator="matches"), Predicate(path="/a"), False),
+    ],
+)
+def test_dead_stubs_found(first, second, dead):
+    # When
+    found = find_dead_stubs([Stub(first), Stub(second, Response(body="later"))])
+
+    # Then
+    assert found == ([DeadStub(1, 0, duplicate=False)] if dead else [])
+
+
+def test_catch_all_stub_shadows_later_stubs():
+    # Given
+    stubs = [Stub(Predicate(path="/a")), Stub(), Stub(Predicate(path="/b")), Stub(Predicate(path="/a"))]
+
+    # When
+    found = find_dead_stubs(stubs)
+
+    # Then
+    assert found == [DeadStub(2, 1, duplicate=False), DeadStub(3, 0, duplicate=True)]
+
+
+def test_dead_stubs_attributed_to_live_ones():
+    # Given
+    stubs = [
+        Stub(Predicate(path="/a", operator="startsWith"), Response(body="a")),
+        Stub(Predicate(path="/a/b", operator="startsWith"), Response(body="a")),
+        Stub(Predicate(path="/a/b", operator="startsWith"), Response(body="a")),
+    ]
+
+    # When
+    found = find_dead_stubs(stubs)
+
+    # Then
+    assert found == [DeadStub(1, 0, duplicate=False), DeadStub(2, 0, duplicate=False)]
+
+
+def test_dead_stubs_removed_and_duplicates_merged():
+    # Given
+    imposter = Imposter(
+        [
+            Stub(Predicate(path="/a"), Response(body="a")),
+            Stub(Predicate(path="/b"), Response(body="b")),
+            Stub(Predicate(path="/a"), Response(body="a")),
+            Stub(Predicate(path="/a"), Response(body="other")),
+        ]
+    )
+
+    # When
+    removed = remove_dead_stubs(imposter)
+
+    # Then
+    assert removed == [DeadStub(2, 0, duplicate=True), DeadStub(3, 0, duplicate=False)]
+    assert_that(
+        imposter.stubs,
+        contains_exactly(
+            has_properties(predicates=[Predicate(path="/a")]), has_properties(predicates=[Predicate(path="/b")])
+        ),
+    )
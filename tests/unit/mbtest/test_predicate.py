@@ -168,3 +168,32 @@ def test_injection_predicate_roundtrip():
     # Then
     assert_that(actual, instance_of(InjectionPredicate))
     assert_that(actual, has_identical_properties_to(expected))
+
+
+@pytest.mark.parametrize("operator", list(Predicate.Operator))
+def test_structure_dispatches_on_every_operator(operator):
+    # Given
+    structure = {operator.value: {"path": "/darwin"}, "caseSensitive": False}
+
+    # When
+    predicate = BasePredicate.from_structure(structure)
+
+    # Then
+    assert_that(predicate, instance_of(Predicate))
+    assert predicate.operator == operator
+    assert Predicate.Operator.has_value(operator.value)
+
+
+def test_structure_contains_with_data_is_tcp_predicate():
+    # Given
+    tcp_structure = {"contains": {"data": "sausages"}}
+    http_structure = {"contains": {"body": "sausages"}}
+
+    # When
+    tcp_predicate = BasePredicate.from_structure(tcp_structure)
+    http_predicate = BasePredicate.from_structure(http_structure)
+
+    # Then
+    assert_that(tcp_predicate, instance_of(TcpPredicate))
+    assert_that(http_predicate, instance_of(Predicate))
+    assert not Predicate.Operator.has_value("data")
@@ -1,9 +1,16 @@
+import base64
+import json
 import logging
 from http import HTTPStatus
+from pathlib import Path
 
+import pytest
 from brunns.matchers.object import has_identical_properties_to
-from hamcrest import assert_that, instance_of
+from hamcrest import assert_that, has_entries, instance_of
 
+from mbtest.imposters import Imposter, Stub
+from mbtest.imposters.base import streaming_structures
+from mbtest.imposters.bodies import FileBody
 from mbtest.imposters.responses import (
     BaseResponse,
     FaultResponse,
@@ -12,6 +19,7 @@ from mbtest.imposters.responses import (
     Response,
     TcpResponse,
 )
+from mbtest.serialisation import dumps, iter_dumps, loads
 from tests.utils.builders import (
     CopyFactory,
     FaultResponseFactory,
@@ -169,3 +177,108 @@ def test_http_response_structure_no_mode():
     del response_structure["_mode"]
     response = HttpResponse.from_structure(response_structure)
     assert response.mode == Response.Mode.TEXT
+
+
+@pytest.mark.parametrize("body_type", [bytes, bytearray, memoryview])
+def test_binary_body_base64_encoded(body_type):
+    # Given
+    content = bytes(range(256)) * 4
+    response = Response(body=body_type(content), mode=Response.Mode.BINARY)
+
+    # When
+    structure = response.as_structure()
+
+    # Then
+    assert_that(structure, has_entries(**{"is": has_entries(body=base64.b64encode(content).decode("ascii"))}))
+    assert response.body_bytes == content
+
+
+def test_text_body_bytes_decoded_as_utf8():
+    # Given
+    response = Response(body=bytearray("sausages é".encode()))
+
+    # When
+    structure = response.as_structure()
+
+    # Then
+    assert_that(structure, has_entries(**{"is": has_entries(body="sausages é", _mode="text")}))
+
+
+def test_binary_body_decoded_lazily_from_structure():
+    # Given
+    content = b"\x00\xff\xfe binary"
+    structure = Response(body=content, mode=Response.Mode.BINARY).as_structure()
+
+    # When
+    response = BaseResponse.from_structure(structure)
+
+    # Then
+    assert response.body == base64.b64encode(content).decode("ascii")
+    assert response.body_bytes == content
+    assert Response(body="é").body_bytes == "é".encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_file_body_streamed_base64_encoded(tmp_path: Path, chunk_size):
+    # Given
+    content = bytes(range(256)) * 40
+    (tmp_path / "body.bin").write_bytes(content)
+    response = Response(body=FileBody(tmp_path / "body.bin", chunk_size), mode=Response.Mode.BINARY)
+
+    # When
+    with streaming_structures():
+        streamed = b"".join(iter_dumps({"responses": [response.as_structure()]}))
+
+    # Then
+    expected = {"statusCode": 200, "_mode": "binary", "body": base64.b64encode(content).decode("ascii")}
+    assert loads(streamed) == {"responses": [{"is": expected, "_behaviors": {}}]}
+    assert loads(dumps(response.as_structure()))["is"] == expected
+    assert response.body_bytes == content
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+def test_file_body_streamed_as_text(tmp_path: Path, chunk_size):
+    # Given
+    content = 'sausages é "chips" \\ \n' * 100
+    (tmp_path / "body.txt").write_text(content, encoding="utf-8")
+    response = Response.from_file(tmp_path / "body.txt", status_code=HTTPStatus.CREATED)
+    object.__setattr__(response.http_response, "body", FileBody(tmp_path / "body.txt", chunk_size))
+
+    # When
+    with streaming_structures():
+        streamed = b"".join(iter_dumps({"responses": [response.as_structure()]}, indent=True))
+
+    # Then
+    assert loads(streamed)["responses"][0]["is"]["body"] == content
+    assert loads(streamed)["responses"][0]["is"]["statusCode"] == HTTPStatus.CREATED
+
+
+def test_path_body_only_read_when_streamed(tmp_path: Path):
+    # Given
+    path = tmp_path / "body.txt"
+    response = Response(body=path)
+    with streaming_structures():
+        structure = response.as_structure()
+
+    # When
+    path.write_text("written later", encoding="utf-8")
+
+    # Then
+    assert response.body == FileBody(path)
+    assert loads(b"".join(iter_dumps(structure)))["is"]["body"] == "written later"
+
+
+def test_streaming_body_read_into_plain_structure(tmp_path: Path):
+    # Given
+    path = tmp_path / "body.txt"
+    path.write_text("sausages", encoding="utf-8")
+    imposter = Imposter(Stub(responses=[Response(body=FileBody(path))]))
+    with streaming_structures():
+        imposter.as_structure()
+
+    # When
+    structure = imposter.as_structure()
+
+    # Then
+    assert json.loads(json.dumps(structure))["stubs"][0]["responses"][0]["is"]["body"] == "sausages"
+    assert BaseResponse.from_structure(structure["stubs"][0]["responses"][0]).body == "sausages"
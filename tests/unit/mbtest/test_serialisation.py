@@ -0,0 +1,196 @@
+import json
+import logging
+from http import HTTPStatus
+from json import JSONDecodeError
+from types import MappingProxyType
+
+import pytest
+from brunns.matchers.object import has_identical_properties_to
+from hamcrest import assert_that, empty
+
+from mbtest import serialisation
+from mbtest.imposters import Imposter, Predicate, Response, Stub
+from mbtest.serialisation import iter_json_array
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT = {
+    "protocol": "http",
+    "port": 4545,
+    "numberOfRequests": 3,
+    "stubs": [{"predicates": [{"equals": {"path": '/a]"{'}}], "responses": [{"is": {"body": "[[[{"}}]}],
+    "requests": [
+        {"method": "GET", "path": "/test", "body": 'with "quotes" \\ and ] brackets { é'},
+        {"method": "POST", "path": "/test", "query": {"a": "b"}},
+        17,
+    ],
+    "_links": {"self": {"href": "http://localhost:2525/imposters/4545"}},
+}
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 100_000])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_across_chunk_boundaries(chunk_size, indent):
+    # Given
+    data = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False).encode("utf-8")
+
+    # When
+    actual = list(iter_json_array(chunked(data, chunk_size), "requests"))
+
+    # Then
+    assert actual == DOCUMENT["requests"]
+
+
+NUMBERS = b'{"requests": [1.5, -2.25e-3, 8.9774166715196, 6E+2, 0.1e1, 7]}'
+
+
+@pytest.mark.parametrize("split", range(1, len(NUMBERS)))
+def test_iter_json_array_numbers_split_anywhere(split):
+    # When
+    actual = list(iter_json_array([NUMBERS[:split], NUMBERS[split:]], "requests"))
+
+    # Then
+    assert actual == [1.5, -2.25e-3, 8.9774166715196, 600.0, 1.0, 7]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3])
+def test_iter_json_array_numbers_across_chunk_boundaries(chunk_size):
+    # Given
+    document = b'{"requests": [8.9774166715196, 1.5e10, -3E-2, 42]}'
+
+    # When
+    actual = list(iter_json_array(chunked(document, chunk_size), "requests"))
+
+    # Then
+    assert actual == [8.9774166715196, 1.5e10, -3e-2, 42]
+
+
+def test_iter_json_array_missing_key():
+    data = json.dumps({"stubs": [], "port": 4545}).encode("utf-8")
+
+    assert_that(list(iter_json_array(chunked(data, 3), "requests")), empty())
+
+
+def test_iter_json_array_empty_array():
+    assert_that(list(iter_json_array([b'{"requests" : [ ] }'], "requests")), empty())
+
+
+def test_iter_json_array_stops_at_end_of_array():
+    # Given
+    def chunks():
+        yield b'{"requests": [{"path": "/a"}, true, null, -1.5e3], '
+        msg = "Should not read beyond the requested array."
+        raise AssertionError(msg)
+
+    # When
+    actual = list(iter_json_array(chunks(), "requests"))
+
+    # Then
+    assert actual == [{"path": "/a"}, True, None, -1500.0]
+
+
+def test_iter_json_array_truncated_document():
+    with pytest.raises(JSONDecodeError):
+        list(iter_json_array([b'{"stubs": [{"a": "b"'], "requests"))
+
+
+@pytest.fixture(params=["json", "orjson", "msgspec"])
+def backend(request):
+    pytest.importorskip(request.param)
+    previous = serialisation.use_json_backend().name
+    yield serialisation.use_json_backend(request.param)
+    serialisation.use_json_backend(previous)
+
+
+def test_json_backend_roundtrip(backend):
+    # Given
+    structure = {"statusCode": HTTPStatus.CREATED, "headers": MappingProxyType({"a": "é"}), "body": ("x", 1.5, None)}
+
+    # When
+    compact = serialisation.dumps(structure)
+    indented = serialisation.dumps(structure, indent=True)
+
+    # Then
+    expected = {"statusCode": 201, "headers": {"a": "é"}, "body": ["x", 1.5, None]}
+    assert backend.name in {"json", "orjson", "msgspec"}
+    assert b"\n" not in compact
+    assert b'\n  "statusCode"' in indented
+    assert serialisation.loads(compact) == expected
+    assert serialisation.loads(indented.decode("utf-8")) == expected
+    assert list(iter_json_array([compact], "body")) == expected["body"]
+
+
+def test_json_backend_errors(backend):
+    with pytest.raises(ValueError, match=r".+"):
+        serialisation.loads(b"{nope")
+    with pytest.raises(TypeError):
+        serialisation.dumps({"a": object()})
+    assert backend.name
+
+
+def test_json_backend_used_for_imposter_files(backend, tmp_path):
+    # Given
+    path = tmp_path / "imposter.json"
+    original = Imposter(Stub(Predicate(path="/test"), Response(body="hello")), port=4567)
+
+    # When
+    original.save(path)
+
+    # Then
+    assert_that(Imposter.from_file(path), has_identical_properties_to(original, ignoring=["configuration_url"]))
+    assert json.loads(path.read_text())["port"] == 4567
+    assert backend.name
+
+
+@pytest.mark.parametrize("indent", [False, True])
+@pytest.mark.parametrize(
+    "structure",
+    [
+        DOCUMENT,
+        {},
+        {"stubs": []},
+        {"stubs": [{"n": i, "nested": {"list": [i, "\n"]}} for i in range(2500)], "after": {"a": [1, 2]}},
+    ],
+)
+def test_iter_dumps_matches_dumps(structure, indent):
+    # When
+    actual = b"".join(serialisation.iter_dumps(structure, indent=indent))
+
+    # Then
+    assert actual == serialisation.dumps(structure, indent=indent)
+    assert json.loads(actual) == structure
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 100, 4096])
+def test_iter_array_batches_survive_brackets_and_commas_in_strings(chunk_size):
+    # Given
+    items = [{"id": i, "text": '],{"x": [' if i % 3 else "}, ]", "list": [i, [i]]} for i in range(200)]
+    document = json.dumps({"items": items, "tail": "]}"}).encode("utf-8")
+
+    # When
+    actual = list(iter_json_array(chunked(document, chunk_size), "items"))
+
+    # Then
+    assert actual == items
+
+
+@pytest.mark.parametrize("suffix", [".json", ".json.gz", ".json.zst"])
+@pytest.mark.parametrize("compact", [False, True])
+def test_imposter_files_streamed_and_compressed(tmp_path, suffix, compact):
+    # Given
+    path = tmp_path / f"imposter{suffix}"
+    original = Imposter([Stub(Predicate(path=f"/test/{i}"), Response(body=f"hello {i}")) for i in range(1500)])
+
+    # When
+    original.save(path, compact=compact)
+    loaded = Imposter.from_file(path)
+
+    # Then
+    with serialisation.open_json_file(path, "rb") as file:
+        assert json.loads(file.read()) == json.loads(serialisation.dumps(original.as_structure()))
+    assert loaded.as_structure() == original.as_structure()
+    assert loaded.stubs == original.stubs
@@ -1,15 +1,19 @@
+import base64
 import logging
 from http import HTTPStatus
 from pathlib import Path
 from unittest.mock import patch
 
+import httpx2 as httpx
+import pytest
 from brunns.matchers.mock import call_has_args as with_args
 from brunns.matchers.mock import has_call
 from brunns.matchers.url import is_url
-from hamcrest import assert_that, contains_exactly, contains_string, has_entries, has_length
+from hamcrest import assert_that, calling, contains_exactly, contains_string, has_entries, has_length, raises
 from respx import Router
 
-from mbtest.imposters import Imposter, Response, Stub
+from mbtest.imposters import Imposter, InjectionResponse, Predicate, Response, Stub
+from mbtest.serialisation import dumps, loads
 from mbtest.server import ExecutingMountebankServer, MountebankServer
 
 logger = logging.getLogger(__name__)
@@ -88,3 +92,123 @@ def test_server_non_default_options(httpx2_mock: Router):
             popen,
             has_call(with_args(contains_exactly(contains_string("mb"), "start", "--port", "3456"))),
         )
+
+
+def test_add_imposter_streams_file_bodies(httpx2_mock: Router, tmp_path: Path):
+    # Given
+    server = MountebankServer(port=2525)
+    content = bytes(range(256)) * 100
+    (tmp_path / "body.bin").write_bytes(content)
+    imposter = Imposter(Stub(responses=Response.from_file(tmp_path / "body.bin", mode=Response.Mode.BINARY)))
+    httpx2_mock.post().respond(status_code=HTTPStatus.CREATED, json={"port": 4567})
+
+    # When
+    server.add_impostor(imposter)
+
+    # Then
+    posted = loads(httpx2_mock.calls.last.request.read())
+    assert posted["stubs"][0]["responses"][0]["is"]["body"] == base64.b64encode(content).decode("ascii")
+    assert imposter.port == 4567
+
+
+def test_add_imposter_compacts_definition(httpx2_mock: Router):
+    # Given
+    server = MountebankServer(port=2525)
+    imposter = Imposter(Stub(responses=[Response(body="a"), Response(body="a"), Response(body="b")]))
+    httpx2_mock.post().respond(status_code=HTTPStatus.CREATED, json={"port": 4567})
+
+    # When
+    server.add_impostor(imposter)
+    server.add_impostor(imposter, compact=False)
+
+    # Then
+    compacted, original = (loads(call.request.read())["stubs"] for call in httpx2_mock.calls)
+    assert compacted == [{"responses": [{"is": {"body": "a"}, "_behaviors": {"repeat": 2}}, {"is": {"body": "b"}}]}]
+    assert original == loads(dumps(imposter.as_structure()["stubs"]))
+
+
+def test_imposter_added_in_batches_with_progress(local_server):
+    # Given
+    imposter = Imposter([Stub(Predicate(path=f"/{n}"), Response(body=str(n))) for n in range(25)])
+    progress = []
+
+    # When
+    local_server.add_impostor_in_batches(imposter, batch_size=10, progress=lambda *p: progress.append(p))
+
+    # Then
+    assert progress == [(10, 25), (20, 25), (25, 25)]
+    assert [stub.responses[0].body for stub in imposter.query_all_stubs()] == [str(n) for n in range(25)]
+    assert httpx.get(f"{imposter.url}/24").text == "24"
+    local_server.delete_imposters()
+
+
+def test_batched_upload_resumed_after_failure(local_server):
+    # Given
+    imposter = Imposter([Stub(Predicate(path=f"/{n}"), Response(body=str(n))) for n in range(25)])
+    imposter.stubs[15] = Stub(responses=InjectionResponse(inject="function () { return {}; }"))
+    progress = []
+
+    # When
+    with pytest.raises(httpx.HTTPStatusError):
+        local_server.add_impostor_in_batches(imposter, batch_size=10, progress=lambda *p: progress.append(p))
+    added = len(imposter.query_all_stubs())
+    imposter.stubs[15] = Stub(Predicate(path="/15"), Response(body="15"))
+    local_server.add_impostor_in_batches(imposter, batch_size=10, progress=lambda *p: progress.append(p))
+
+    # Then
+    assert added == 15
+    assert progress == [(10, 25), (15, 25), (25, 25)]
+    assert [stub.responses[0].body for stub in imposter.query_all_stubs()] == [str(n) for n in range(25)]
+    local_server.delete_imposters()
+
+
+def test_stubs_appended_concurrently(local_server):
+    # Given
+    imposter = Imposter([Stub(Predicate(path=f"/{n}"), Response(body=str(n))) for n in range(50)])
+
+    # When
+    local_server.add_impostor_in_batches(imposter, batch_size=5, concurrency=4, order_independent=True)
+
+    # Then
+    assert sorted(int(stub.responses[0].body) for stub in imposter.query_all_stubs()) == list(range(50))
+    local_server.delete_imposters()
+
+
+def test_stubs_only_appended_concurrently_if_order_independent():
+    server = MountebankServer(port=2525)
+    imposter = Imposter([Stub(responses=Response(body=str(n))) for n in range(3)])
+
+    assert_that(
+        calling(server.add_impostor_in_batches).with_args(imposter, concurrency=2),
+        raises(ValueError, "order_independent"),
+    )
+
+
+def test_appended_stub_responses_left_unread(httpx2_mock: Router):
+    # Given
+    server = MountebankServer(port=2525)
+    imposter = Imposter([Stub(responses=Response(body=str(n))) for n in range(3)])
+    appended = UnreadStream()
+    httpx2_mock.post("http://localhost:2525/imposters").respond(status_code=HTTPStatus.CREATED, json={"port": 4567})
+    httpx2_mock.post("http://localhost:2525/imposters/4567/stubs").respond(stream=appended)
+
+    # When
+    server.add_impostor_in_batches(imposter, batch_size=1)
+
+    # Then
+    assert_that(httpx2_mock.calls, has_length(3))
+    assert not appended.read
+    assert appended.closed
+
+
+class UnreadStream(httpx.SyncByteStream):
+    def __init__(self):
+        self.read = False
+        self.closed = False
+
+    def __iter__(self):
+        self.read = True
+        yield b"{}"
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,177 @@
+import logging
+import time
+from http import HTTPStatus
+
+import pytest
+from brunns.matchers.matcher import mismatches_with
+from hamcrest import assert_that, contains_exactly, contains_string, has_length, has_properties, not_
+from yarl import URL
+
+from mbtest.imposters import Imposter, Stub
+from mbtest.imposters.imposters import Address
+from mbtest.matchers import email_sent, had_request
+from mbtest.store import MailStore, RequestDrainer, RequestStore
+from tests.utils.builders import SentEmailFactory
+
+logger = logging.getLogger(__name__)
+
+IMPOSTER_URL = "http://localhost:2525/imposters/4567"
+
+
+def recorded(*paths):
+    return [
+        {"method": "GET", "path": path, "query": {}, "headers": {}, "timestamp": f"2024-03-01T12:00:0{i}.000Z"}
+        for i, path in enumerate(paths)
+    ]
+
+
+def attached_imposter():
+    imposter = Imposter(Stub(), port=4567)
+    imposter.attach("localhost", 4567, URL("http://localhost:2525/imposters"))
+    return imposter
+
+
+def test_store_queries():
+    # Given
+    store = RequestStore()
+    store.add(recorded("/a", "/b", "/a"), imposter=4567)
+    store.add([{"envelopeFrom": "a@example.com", "subject": "Hi", "text": "Hello"}], imposter=5525)
+    emails = RequestStore()
+    emails.add([{"envelopeFrom": "a@example.com", "subject": "Hi", "text": "Hello"}])
+
+    # Then
+    assert_that(store, has_length(4))
+    assert_that(list(store.iter_actual_requests(path="/a")), has_length(2))
+    assert_that(list(store.iter_actual_requests()), has_length(4))
+    assert_that(list(store.iter_actual_requests(method="GET", since="2024-03-01T12:00:01")), has_length(2))
+    assert_that(
+        list(store.iter_actual_requests(until="2024-03-01T12:00:01")), contains_exactly(has_properties(path="/a"))
+    )
+    assert_that(list(store.iter_actual_requests(imposter=5525)), contains_exactly(has_properties(subject="Hi")))
+    assert_that(emails, email_sent().with_subject("Hi"))
+    store.close()
+
+
+def test_drainer_moves_requests_into_store(httpx2_mock):
+    # Given
+    imposter = attached_imposter()
+    get = httpx2_mock.get(IMPOSTER_URL).respond(json={"port": 4567, "stubs": [], "requests": recorded("/a", "/b")})
+    delete = httpx2_mock.delete(f"{IMPOSTER_URL}/savedRequests").respond(status_code=HTTPStatus.OK)
+    drainer = RequestDrainer(imposter, delete=True)
+
+    # When
+    drained = drainer.drain()
+
+    # Then
+    assert drained == 2
+    assert delete.call_count == 1
+
+    # When
+    get.respond(json={"port": 4567, "stubs": [], "requests": recorded("/c")})
+
+    # Then
+    assert_that(drainer, had_request().with_path("/c"))
+    get.respond(json={"port": 4567, "stubs": [], "requests": []})
+    assert_that(drainer, not_(had_request().with_path("/d")))
+    assert_that(drainer.store, has_length(3))
+
+
+def test_had_request_queries_store_indexes():
+    # Given
+    store = RequestStore()
+    store.add(recorded("/a", "/b", "/a"), imposter=4567)
+    store.add([{"envelopeFrom": "a@example.com", "subject": "Hi", "text": "Hello"}], imposter=5525)
+
+    # Then
+    assert_that(store, had_request().with_path("/a").and_method("GET").and_times(2))
+    assert_that(
+        had_request().with_path("/c").and_method("GET"),
+        mismatches_with(
+            store,
+            contains_string("found <0> matching requests: <[]>. All requests: <[HttpRequest(method="),
+        ),
+    )
+    store.close()
+
+
+def test_drainer_drains_incrementally_without_deleting(httpx2_mock):
+    # Given
+    imposter = attached_imposter()
+    get = httpx2_mock.get(IMPOSTER_URL).respond(json={"port": 4567, "stubs": [], "requests": recorded("/a", "/b")})
+    drainer = RequestDrainer(imposter)
+    first = drainer.drain()
+
+    # When
+    get.respond(json={"port": 4567, "stubs": [], "requests": recorded("/a", "/b", "/c")})
+    second = drainer.drain()
+
+    # Then
+    assert (first, second) == (2, 1)
+    assert_that(
+        drainer.store.get_actual_requests(),
+        contains_exactly(has_properties(path="/a"), has_properties(path="/b"), has_properties(path="/c")),
+    )
+
+
+def test_store_reads_and_writes_in_batches():
+    # Given
+    store = RequestStore()
+
+    # When
+    stored = store.add(iter(recorded(*(f"/{n % 3}" for n in range(2500)))))
+
+    # Then
+    assert stored == 2500
+    assert_that(list(store.iter_actual_requests()), has_length(2500))
+    assert_that(list(store.iter_actual_requests(path="/1")), has_length(833))
+    store.close()
+
+
+def test_drainer_runs_in_background(httpx2_mock):
+    # Given
+    imposter = attached_imposter()
+    httpx2_mock.get(IMPOSTER_URL).respond(json={"requests": recorded("/a")})
+    httpx2_mock.delete(f"{IMPOSTER_URL}/savedRequests").respond(status_code=HTTPStatus.OK)
+
+    # When
+    with RequestDrainer(imposter, interval=0.01, delete=True) as drainer:
+        time.sleep(0.1)
+
+    # Then
+    assert len(drainer.store) > 1
+
+
+def test_mail_store_indexed_queries():
+    # Given
+    store = MailStore()
+    alice, bob = Address("alice@example.com", "Alice"), Address("bob@example.com", "Bob")
+    emails = [
+        SentEmailFactory.build(to=[alice], cc=[], bcc=[], subject="Hi"),
+        SentEmailFactory.build(to=[bob], cc=[alice], bcc=[], subject="Hi"),
+        SentEmailFactory.build(to=[bob], cc=[], bcc=[], subject="Bye"),
+    ]
+    for email in emails:
+        store.add(email)
+
+    # Then
+    assert_that(store, has_length(3))
+    assert_that(list(store.iter_sent_email(recipient="ALICE@example.com")), contains_exactly(*emails[:2]))
+    assert_that(list(store.iter_sent_email(recipient="bob@example.com", subject="Hi")), contains_exactly(emails[1]))
+    assert_that(list(store.iter_sent_email(subject="Unknown")), has_length(0))
+    assert_that(store, email_sent().with_subject("Bye").and_recipient("bob@example.com"))
+    assert_that(store, not_(email_sent().with_subject("Bye").and_recipient("alice@example.com")))
+
+
+def test_drainer_raises_background_failure(httpx2_mock):
+    # Given
+    imposter = attached_imposter()
+    httpx2_mock.get(IMPOSTER_URL).respond(content=b'{"requests": [{"path": ')
+    drainer = RequestDrainer(imposter, interval=0.01)
+
+    # When
+    drainer.start()
+    time.sleep(0.1)
+
+    # Then
+    with pytest.raises(ValueError, match="Expecting value"):
+        drainer.stop()
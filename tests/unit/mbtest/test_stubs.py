@@ -1,9 +1,12 @@
 import logging
 
-from hamcrest import assert_that, instance_of
+import pytest
+from hamcrest import assert_that, instance_of, same_instance
 
-from mbtest.imposters import Imposter, InjectionResponse, Stub
-from mbtest.imposters.responses import FaultResponse, TcpResponse
+from mbtest.imposters import Imposter, InjectionResponse, Predicate, Response, Stub
+from mbtest.imposters.base import iter_shared
+from mbtest.imposters.predicates import DEFAULT_PREDICATE
+from mbtest.imposters.responses import DEFAULT_RESPONSE, FaultResponse, TcpResponse
 
 logger = logging.getLogger(__name__)
 
@@ -27,3 +30,33 @@ def test_structure_inject():
     imposter_structure = expected_imposter.as_structure()
     imposter = Imposter.from_structure(imposter_structure)
     assert imposter.port == expected_imposter.port
+
+
+def test_default_stubs_share_defaults_until_accessed():
+    # Given
+    first, second, third = Stub(), Stub(), Stub()
+    second.as_structure()
+    third.as_structure()
+
+    # When
+    first.predicates[0].path = "/darwin"
+    first.responses[0].http_response.status_code = 404
+
+    # Then
+    assert_that(next(iter_shared(second.responses)), same_instance(next(iter_shared(third.responses))))
+    assert_that(next(iter_shared(second.responses)), same_instance(DEFAULT_RESPONSE))
+    assert second.predicates == [Predicate()]
+    assert second.responses == [Response()]
+    assert first.predicates == [Predicate(path="/darwin")]
+    assert first.as_structure()["responses"] == [Response(status_code=404).as_structure()]
+
+
+def test_shared_defaults_cant_be_modified():
+    with pytest.raises(AttributeError, match="Shared default Predicate can't be modified"):
+        DEFAULT_PREDICATE.path = "/darwin"
+
+
+def test_model_objects_are_slotted():
+    stub = Stub(Predicate(path="/darwin") & Predicate(method="GET"), Response(body="sausages"))
+    for obj in [stub, stub.predicates[0], stub.predicates[0].left, stub.responses[0], stub.responses[0].http_response]:
+        assert not hasattr(obj, "__dict__")
@@ -5,7 +5,7 @@ from unittest.mock import patch
 
 import pytest
 
-from mbtest.util import find_mountebank_executable
+from mbtest.util import default_client, find_mountebank_executable
 
 logger = logging.getLogger(__name__)
 
@@ -45,3 +45,18 @@ def test_find_mountebank_install(monkeypatch):
         patch("pathlib.Path.is_file", return_value=True),
     ):
         assert find_mountebank_executable() == user_home / user_bin / linux_mb_name
+
+
+def test_default_client_closed_at_exit():
+    # Given
+    default_client.cache_clear()
+
+    # When
+    with patch("atexit.register") as register:
+        client = default_client()
+
+    # Then
+    register.assert_called_once_with(client.close)
+    assert default_client() is client
+    default_client.cache_clear()
+    client.close()
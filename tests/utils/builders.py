@@ -9,9 +9,11 @@ from yarl import URL
 
 from mbtest.imposters import (
     Copy,
+    DelimitedFraming,
     Imposter,
     InjectionResponse,
     Key,
+    LengthPrefixedFraming,
     Lookup,
     Predicate,
     Proxy,
@@ -61,6 +63,7 @@ class InjectionPredicateFactory(DataclassFactory[InjectionPredicate]): ...
 
 
 class KeyFactory(DataclassFactory[Key]):
+    from_ = Use(fake.word)
     using = Use(_random_using)
     index = Use(lambda: random.randint(0, 50))
 
@@ -125,6 +128,8 @@ class HttpRequestFactory(DataclassFactory[HttpRequest]):
     method = Use(lambda: random.choice(list(Predicate.Method)).name)
     query = Use(dict)
     headers = Use(dict)
+    timestamp = Use(lambda: None)
+    request_from = Use(lambda: None)
 
 
 class SentEmailFactory(DataclassFactory[SentEmail]):
@@ -132,6 +137,8 @@ class SentEmailFactory(DataclassFactory[SentEmail]):
     to = Use(lambda: [AddressFactory.build(), AddressFactory.build()])
     cc = Use(lambda: [AddressFactory.build(), AddressFactory.build()])
     bcc = Use(lambda: [AddressFactory.build(), AddressFactory.build()])
+    timestamp = Use(lambda: None)
+    request_from = Use(lambda: None)
 
 
 class ImposterFactory(DataclassFactory[Imposter]):
@@ -142,6 +149,10 @@ class ImposterFactory(DataclassFactory[Imposter]):
     default_response = Use(lambda: random.choice([None, HttpResponseFactory.build()]))
     key = Use(lambda: None)
     cert = Use(lambda: None)
+    mode = Use(lambda: random.choice([None, *Response.Mode]))
+    end_of_request_resolver = Use(
+        lambda: random.choice([None, DelimitedFraming(b"\r\n"), LengthPrefixedFraming(2, "little")])
+    )
     host = Use(lambda: None)
     server_url = Use(lambda: None)
 